@@ -1,14 +1,13 @@
 import streamlit as st
-import pandas as pd
+
+from analytics.snapshot import load_snapshot_tables
 
 st.set_page_config(page_title="Streamlit BI x Claude Code Starter", layout="wide")
 
 st.title("Streamlit BI x Claude Code Starter")
-@st.cache_data
 def load_data():
-    orders_df = pd.read_csv("sample_data/orders.csv")
-    users_df = pd.read_csv("sample_data/users.csv")
-    return orders_df, users_df
+    tables = load_snapshot_tables()
+    return tables["orders"], tables["users"]
 
 orders_df, users_df = load_data()
 
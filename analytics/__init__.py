@@ -0,0 +1,10 @@
+"""Shared data and analytics helpers for the dashboard pages
+
+Importing the package turns on pandas copy-on-write: the fact tables are
+cached once per process and shared by every session, and filters, column
+selections and derived frames reference their memory until written to, so
+pages never need defensive ``.copy()`` calls.
+"""
+import pandas as pd
+
+pd.set_option("mode.copy_on_write", True)
@@ -0,0 +1,178 @@
+"""Batch precomputation of the standard page reports
+
+Computes the Poor Performance and Category Analysis results for every period
+preset crossed with the category/department (resp. status/gender) filters
+that have data, on a process pool, and writes them to the materialized store
+(see ``analytics.materialized``) under the current data version:
+
+    python -m analytics.batch --workers 4
+
+Run it after each data refresh (e.g. nightly from cron). Pages pick the
+results up on their next run and compute anything missing live.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from analytics import metrics, parallel
+from analytics.facts import build_line_item_index, build_line_items
+from analytics.materialized import MaterializedStore, data_version
+from analytics.periods import LOOKBACK_PRESETS, PERIOD_PRESETS, get_period_dates
+from analytics.sources import TABLES, load_tables, source_from_url
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_ANALYSIS_COLUMNS = ['category', 'department', 'sale_price', 'id_order', 'created_at', 'date', 'category_code',
+                             'department_code']
+
+# Fact tables of the current process; workers inherit them when forked and
+# rebuild them from the source otherwise
+_facts = None
+
+
+def _build_facts(tables):
+    line_items = build_line_items(tables)
+    return {
+        'line_items': line_items,
+        'index': build_line_item_index(line_items),
+        'max_date': line_items['created_at'].max().date(),
+    }
+
+
+def _init_worker(source_url):
+    global _facts
+    # The pool already uses every core, so aggregate each report on one thread
+    parallel.WORKERS = 1
+    if _facts is None:
+        _facts = _build_facts(load_tables(TABLES, source_from_url(source_url)))
+
+
+def poor_performance_report(facts, period, category, department):
+    """Product stats shown by the Poor Performance Analysis page"""
+    filtered_df = metrics.filter_line_items(
+        facts['line_items'],
+        facts['index'],
+        start_date=get_period_dates(period, facts['max_date'])[0],
+        category=category,
+        department=department
+    )
+    return {'product_stats': metrics.product_stats(filtered_df)}
+
+
+def category_analysis_report(facts, period, status, gender):
+    """Category, department and daily sales shown by the Category Analysis page"""
+    start_date, end_date = get_period_dates(period, facts['max_date'])
+    filtered_df = metrics.filter_line_items(
+        facts['line_items'],
+        facts['index'],
+        start_date=start_date,
+        end_date=end_date,
+        status=status,
+        gender=gender,
+        columns=CATEGORY_ANALYSIS_COLUMNS
+    )
+    return {
+        'category_metrics': metrics.category_metrics(filtered_df),
+        'department_metrics': metrics.department_metrics(filtered_df),
+        'daily_category_sales': metrics.daily_category_sales(filtered_df),
+    }
+
+
+REPORTS = {
+    'poor_performance': poor_performance_report,
+    'category_analysis': category_analysis_report,
+}
+
+
+def report_jobs(facts):
+    """(report, params) for every standard filter combination that has data"""
+    index, max_date = facts['index'], facts['max_date']
+
+    for period in LOOKBACK_PRESETS:
+        start_date, _ = get_period_dates(period, max_date)
+        for category in ['All'] + index.options('category'):
+            for department in ['All'] + index.options('department'):
+                if metrics.count_line_items(index, start_date, category=category, department=department):
+                    yield 'poor_performance', {'period': period, 'category': category, 'department': department}
+
+    for period in PERIOD_PRESETS:
+        start_date, end_date = get_period_dates(period, max_date)
+        for status in ['All'] + index.options('status'):
+            for gender in ['All'] + index.options('gender'):
+                if metrics.count_line_items(index, start_date, end_date, status=status, gender=gender):
+                    yield 'category_analysis', {'period': period, 'status': status, 'gender': gender}
+
+
+def _run_job(store, report, params):
+    started = time.perf_counter()
+    for name, df in REPORTS[report](_facts, **params).items():
+        store.write(name, df, **params)
+    return report, params, time.perf_counter() - started
+
+
+def run_batch(tables, workers=None, store_root=None, source_url=None, keep_versions=2):
+    """Precompute all standard reports for ``tables`` and return the run's manifest"""
+    global _facts
+    started = time.perf_counter()
+    store = MaterializedStore(data_version(tables), root=store_root)
+    _facts = _build_facts(tables)
+    jobs = list(report_jobs(_facts))
+    logger.info("Data version %s: %d report jobs", store.version, len(jobs))
+
+    counts = dict.fromkeys(REPORTS, 0)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = (_run_job(store, report, params) for report, params in jobs)
+    else:
+        # Forked workers share the parent's fact tables copy-on-write
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(source_url,))
+        futures = [pool.submit(_run_job, store, report, params) for report, params in jobs]
+        results = (future.result() for future in as_completed(futures))
+
+    try:
+        for done, (report, params, seconds) in enumerate(results, 1):
+            counts[report] += 1
+            logger.debug("%s %s: %.2fs", report, params, seconds)
+            if done % 50 == 0 or done == len(jobs):
+                logger.info("%d/%d reports written", done, len(jobs))
+    finally:
+        if workers != 1:
+            pool.shutdown(cancel_futures=True)
+
+    manifest = {
+        'version': store.version,
+        'code_version': store.code,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'reports': counts,
+        'workers': workers,
+        'seconds': round(time.perf_counter() - started, 1),
+    }
+    store.write_manifest(manifest)
+    removed = store.prune(keep_versions)
+    if removed:
+        logger.info("Removed results for old data or code versions: %s", ", ".join(removed))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the standard dashboard reports")
+    parser.add_argument('--workers', type=int, help="Worker processes (defaults to the CPU count)")
+    parser.add_argument('--source', help="Data source URL (defaults to DATA_SOURCE_URL or sample_data)")
+    parser.add_argument('--store', help="Results directory (defaults to MATERIALIZED_DIR or .cache/materialized)")
+    parser.add_argument('--keep-versions', type=int, default=2, help="Data/code versions to keep in the store")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    tables = load_tables(TABLES, source_from_url(args.source))
+    manifest = run_batch(tables, args.workers, args.store, args.source, args.keep_versions)
+    logger.info("Done in %.1fs: %s", manifest['seconds'], manifest['reports'])
+
+
+if __name__ == '__main__':
+    main()
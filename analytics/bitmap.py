@@ -0,0 +1,203 @@
+"""Bitmap indexes over fact rows for cross-filtering
+
+Each indexed dimension value owns a bitmap of the rows carrying it, so a
+combination of filters is a handful of bitwise ANDs/ORs over ``rows / 64``
+machine words, and "how many rows would remain for each option" is a popcount
+per option instead of a DataFrame filter per option.
+
+Rows must be sorted by the date column: a date range is then a contiguous row
+range, turned into a bitmap with two binary searches.
+"""
+import numpy as np
+import pandas as pd
+
+_ONE = np.uint64(1)
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return int(_BYTE_COUNTS[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+class Bitmap:
+    """Fixed-size set of row positions stored as uint64 words"""
+    __slots__ = ("words", "size")
+
+    def __init__(self, words, size):
+        self.words = words
+        self.size = size
+
+    @staticmethod
+    def _n_words(size):
+        return (size + 63) // 64
+
+    @classmethod
+    def empty(cls, size):
+        return cls(np.zeros(cls._n_words(size), dtype=np.uint64), size)
+
+    @classmethod
+    def full(cls, size):
+        return cls.from_range(0, size, size)
+
+    @classmethod
+    def from_range(cls, start, stop, size):
+        """Rows ``start <= row < stop``"""
+        bitmap = cls.empty(size)
+        if stop <= start:
+            return bitmap
+        first, last = start // 64, (stop - 1) // 64
+        bitmap.words[first:last + 1] = ~np.uint64(0)
+        bitmap.words[first] &= ~np.uint64(0) << np.uint64(start % 64)
+        bitmap.words[last] &= ~np.uint64(0) >> np.uint64(63 - (stop - 1) % 64)
+        return bitmap
+
+    @classmethod
+    def from_positions(cls, positions, size):
+        bitmap = cls.empty(size)
+        positions = np.asarray(positions, dtype=np.uint64)
+        np.bitwise_or.at(bitmap.words, (positions >> np.uint64(6)).astype(np.intp), _ONE << (positions & np.uint64(63)))
+        return bitmap
+
+    @classmethod
+    def from_mask(cls, mask):
+        mask = np.asarray(mask, dtype=bool)
+        packed = np.packbits(mask, bitorder="little")
+        packed = np.pad(packed, (0, cls._n_words(len(mask)) * 8 - len(packed)))
+        return cls(packed.view(np.uint64), len(mask))
+
+    def __and__(self, other):
+        return Bitmap(self.words & other.words, self.size)
+
+    def __or__(self, other):
+        return Bitmap(self.words | other.words, self.size)
+
+    def __iand__(self, other):
+        self.words &= other.words
+        return self
+
+    def __ior__(self, other):
+        self.words |= other.words
+        return self
+
+    def __invert__(self):
+        return Bitmap(~self.words, self.size) & Bitmap.full(self.size)
+
+    def count(self):
+        return _popcount(self.words)
+
+    def to_mask(self):
+        return np.unpackbits(self.words.view(np.uint8), count=self.size, bitorder="little").view(bool)
+
+    def positions(self):
+        """Sorted positions of the set rows"""
+        return np.flatnonzero(self.to_mask())
+
+    def count_at(self, positions):
+        """How many of ``positions`` are set"""
+        positions = np.asarray(positions, dtype=np.uint64)
+        bits = self.words[(positions >> np.uint64(6)).astype(np.intp)] >> (positions & np.uint64(63))
+        return int(np.count_nonzero(bits & _ONE))
+
+
+class BitmapIndex:
+    """Per-value bitmaps for the dimensions of a date-sorted fact table
+
+    Frequent values are stored as dense bitmaps and rare ones as sorted row
+    positions (whichever is smaller), so long-tail dimensions stay compact.
+    """
+
+    def __init__(self, df, dimensions, date_column=None):
+        self.size = len(df)
+        self.dimensions = {}
+        for column in dimensions:
+            self.dimensions[column] = self._index_column(df[column])
+
+        self.days = None
+        if date_column is not None:
+            days = df[date_column].values.astype("datetime64[D]")
+            if not pd.Index(days).is_monotonic_increasing:
+                raise ValueError(f"Rows must be sorted by '{date_column}' to build a date index")
+            self.days = days
+
+    def _index_column(self, values):
+        codes, uniques = pd.factorize(values, sort=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        dense_threshold = self.size // 32
+        entries = {}
+        for code, value in enumerate(uniques):
+            positions = order[bounds[code]:bounds[code + 1]].astype(np.uint32)
+            if len(positions) > dense_threshold:
+                mask = np.zeros(self.size, dtype=bool)
+                mask[positions] = True
+                entries[value] = Bitmap.from_mask(mask)
+            else:
+                entries[value] = positions
+        return entries
+
+    def options(self, dimension):
+        return list(self.dimensions[dimension])
+
+    def value_bitmap(self, dimension, value):
+        entry = self.dimensions[dimension].get(value)
+        if entry is None:
+            return Bitmap.empty(self.size)
+        if isinstance(entry, Bitmap):
+            return Bitmap(entry.words.copy(), self.size)
+        return Bitmap.from_positions(entry, self.size)
+
+    def date_bitmap(self, start=None, end=None):
+        """Rows whose date is within [start, end] (either bound optional)"""
+        lo = 0 if start is None else int(np.searchsorted(self.days, np.datetime64(start, "D"), "left"))
+        hi = self.size if end is None else int(np.searchsorted(self.days, np.datetime64(end, "D"), "right"))
+        return Bitmap.from_range(lo, hi, self.size)
+
+    def select(self, filters=None, date_range=None):
+        """Bitmap of rows matching every filter
+
+        ``filters`` maps a dimension to one value or a list of accepted values;
+        ``date_range`` is a ``(start, end)`` pair of dates or ``None``.
+        """
+        result = self.date_bitmap(*date_range) if date_range else Bitmap.full(self.size)
+        for dimension, accepted in (filters or {}).items():
+            if isinstance(accepted, (list, tuple, set)):
+                matched = Bitmap.empty(self.size)
+                for value in accepted:
+                    matched |= self.value_bitmap(dimension, value)
+            else:
+                matched = self.value_bitmap(dimension, accepted)
+            result &= matched
+        return result
+
+    def option_counts(self, dimension, filters=None, date_range=None):
+        """Matching row count for each value of ``dimension`` under the other filters
+
+        Values left with no rows are dropped, so the result lists exactly the
+        options that still produce data.
+        """
+        others = {k: v for k, v in (filters or {}).items() if k != dimension}
+        base = self.select(others, date_range)
+        counts = {}
+        for value, entry in self.dimensions[dimension].items():
+            if isinstance(entry, Bitmap):
+                counts[value] = _popcount(entry.words & base.words)
+            else:
+                counts[value] = base.count_at(entry)
+        counts = pd.Series(counts, dtype=np.int64, name="count").rename_axis(dimension)
+        return counts[counts > 0]
+
+
+def materialize(df, bitmap, columns=None):
+    """Selected rows of ``df`` restricted to ``columns``
+
+    Only a partial selection copies (just the selected rows of ``columns``);
+    a full selection shares memory with ``df`` under copy-on-write.
+    """
+    frame = df if columns is None else df[columns]
+    if bitmap.count() == bitmap.size:
+        return frame.reset_index(drop=True)
+    return frame.take(bitmap.positions()).reset_index(drop=True)
@@ -0,0 +1,37 @@
+"""Metadata catalog of a data snapshot for building sidebar filters
+
+The catalog holds the date range of each table's ``created_at`` column, so
+pages can bound their date pickers and resolve period presets without
+scanning the fact tables. Filter options and their counts come from the
+bitmap indexes (see ``analytics.bitmap.BitmapIndex.option_counts``), which
+also answer them for the other active filters.
+"""
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+DATE_COLUMNS = {
+    "order_items": "created_at",
+    "orders": "created_at",
+    "users": "created_at",
+}
+
+
+@dataclass
+class Catalog:
+    """Date ranges of a data snapshot"""
+    date_ranges: dict = field(default_factory=dict)
+
+    def date_range(self, table):
+        """(min, max) dates of a table's created_at column"""
+        return self.date_ranges[table]
+
+
+def build_catalog(tables):
+    """Build the catalog from a dict of table name -> DataFrame"""
+    catalog = Catalog()
+    for table, column in DATE_COLUMNS.items():
+        if table in tables:
+            dates = pd.to_datetime(tables[table][column])
+            catalog.date_ranges[table] = (dates.min().date(), dates.max().date())
+    return catalog
@@ -0,0 +1,99 @@
+"""Customer cohorts by first order month
+
+Each customer belongs to the cohort of the month of their first order and to
+one segment (country x traffic source). ``CohortMatrix`` counts, for every
+segment, cohort and months-since-first-order offset, how many customers of
+the cohort ordered in that month. The per-customer activity is only needed
+while building: the distinct (customer, month) pairs are reduced into a
+``segments x cohorts x offsets`` array whose size depends on the number of
+months and segments, not customers, so filtering by country or traffic
+source is a sum over segments.
+"""
+import numpy as np
+import pandas as pd
+
+SEGMENT_DIMENSIONS = ['country', 'traffic_source']
+
+
+class CohortMatrix:
+    """Active customers per segment, first-order month and month offset"""
+
+    def __init__(self, orders, dimensions=SEGMENT_DIMENSIONS):
+        months = orders['year_month']
+        first_month = months.min()
+        n_months = (months.max() - first_month).n + 1
+        self.months = pd.period_range(first_month, periods=n_months, freq='M')
+        month = (months.array.asi8 - first_month.ordinal).astype(np.int32)
+
+        user_codes, users = pd.factorize(orders['user_id'])
+        n_users = len(users)
+
+        # Cohort of each customer: the month of their first order
+        cohort = np.full(n_users, n_months, dtype=np.int32)
+        np.minimum.at(cohort, user_codes, month)
+
+        # Segment of each customer (the values of their first order row)
+        first_rows = np.full(n_users, len(orders), dtype=np.int64)
+        np.minimum.at(first_rows, user_codes, np.arange(len(orders)))
+        grouped = orders[dimensions].iloc[first_rows].groupby(dimensions, sort=True, dropna=False, observed=True)
+        segment_codes = grouped.ngroup().to_numpy()
+        self.segments = grouped.size().index.to_frame(index=False)
+        n_segments = len(self.segments)
+
+        # Distinct active (customer, month) pairs, then counts per cell
+        active = np.unique(user_codes.astype(np.int64) * n_months + month)
+        active_users, active_months = np.divmod(active, n_months)
+        offsets = active_months - cohort[active_users]
+        cells = (segment_codes[active_users] * n_months + cohort[active_users]) * n_months + offsets
+        self.active = np.bincount(cells, minlength=n_segments * n_months * n_months).reshape(
+            n_segments, n_months, n_months
+        )
+
+    def _select(self, filters):
+        mask = np.ones(len(self.segments), dtype=bool)
+        for dimension, accepted in (filters or {}).items():
+            mask &= self.segments[dimension].isin(list(accepted)).to_numpy()
+        return self.active[mask].sum(axis=0)
+
+    def segment_counts(self, dimension, filters=None):
+        """Customers per value of ``dimension`` under the other filters"""
+        sizes = self.active[:, :, 0].sum(axis=1)
+        mask = np.ones(len(self.segments), dtype=bool)
+        for other, accepted in (filters or {}).items():
+            if other != dimension:
+                mask &= self.segments[other].isin(list(accepted)).to_numpy()
+        counts = pd.Series(sizes[mask], index=self.segments.loc[mask, dimension]).groupby(level=0).sum()
+        return counts[counts > 0].rename('count').rename_axis(dimension)
+
+    def active_customers(self, filters=None):
+        """Cohort x months-since-first-order table of active customers
+
+        Offsets past the last month of data are NaN.
+        """
+        table = pd.DataFrame(
+            self._select(filters).astype(float),
+            index=self.months.astype(str).rename('cohort'),
+            columns=pd.RangeIndex(len(self.months), name='months_since_first_order'),
+        )
+        n_months = len(self.months)
+        observed = np.arange(n_months)[None, :] < (n_months - np.arange(n_months))[:, None]
+        return table.where(observed)
+
+    def retention(self, filters=None):
+        """Cohort sizes and the share (%) of each cohort active N months later"""
+        active = self.active_customers(filters)
+        sizes = active[0]
+        retention = active.div(sizes.where(sizes > 0), axis=0) * 100
+        keep = sizes > 0
+        return sizes[keep].rename('customers'), retention[keep]
+
+    def retention_curve(self, filters=None):
+        """Share (%) of customers active N months after their first order
+
+        Each offset averages over the cohorts observed for that long, weighted
+        by cohort size.
+        """
+        active = self.active_customers(filters)
+        sizes = active[0]
+        observed_sizes = active.notna().mul(sizes, axis=0).sum()
+        return (active.sum() / observed_sizes.where(observed_sizes > 0) * 100).rename('retention')
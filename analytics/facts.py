@@ -0,0 +1,77 @@
+"""Fact tables joined from the source tables
+
+``line_items`` is one row per order item with its product and the order's
+gender; ``orders`` is one row per order with the customer's country and
+traffic source. Both are sorted by ``created_at`` so date ranges are
+contiguous row ranges (see ``analytics.bitmap``), and carry the date columns
+the metrics group by (``date``, ``year_month``) so they are derived once per
+snapshot rather than per rerun. The line items' main group keys are also
+factorized once into ``<key>_code`` columns (codes in sorted key order, -1
+where missing) for ``analytics.parallel``.
+"""
+import numpy as np
+import pandas as pd
+
+from analytics.bitmap import BitmapIndex
+
+LINE_ITEM_DIMENSIONS = ['category', 'department', 'status', 'gender']
+LINE_ITEM_GROUP_KEYS = ['category', 'department', 'product_id']
+ORDER_DIMENSIONS = ['country', 'traffic_source']
+ORDER_TIMESTAMPS = ['created_at', 'shipped_at', 'delivered_at', 'returned_at']
+
+
+def build_line_items(tables):
+    """Join order items with products and order gender"""
+    order_items_df = tables["order_items"].copy()
+    order_items_df['created_at'] = pd.to_datetime(order_items_df['created_at'])
+
+    # Merge order items with products
+    merged_df = order_items_df.merge(
+        tables["products"],
+        left_on='product_id',
+        right_on='id',
+        how='left',
+        suffixes=('_order', '_product')
+    )
+
+    # Merge with orders to get gender info
+    merged_df = merged_df.merge(
+        tables["orders"][['order_id', 'gender']],
+        on='order_id',
+        how='left'
+    )
+
+    merged_df['date'] = merged_df['created_at'].dt.normalize()
+    for key in LINE_ITEM_GROUP_KEYS:
+        merged_df[f'{key}_code'] = pd.factorize(merged_df[key], sort=True)[0].astype(np.int32)
+
+    return merged_df.sort_values('created_at', kind='stable', ignore_index=True)
+
+
+def build_orders(tables):
+    """Join orders with the customer's country and traffic source"""
+    orders_df = tables["orders"].copy()
+    for column in ORDER_TIMESTAMPS:
+        orders_df[column] = pd.to_datetime(orders_df[column])
+
+    merged_df = orders_df.merge(
+        tables["users"][['id', 'country', 'traffic_source']],
+        left_on='user_id',
+        right_on='id',
+        how='left',
+        suffixes=('', '_user')
+    )
+
+    # Drop orders whose customer has no country or traffic source
+    merged_df = merged_df.dropna(subset=['country', 'traffic_source'])
+    merged_df['year_month'] = merged_df['created_at'].dt.to_period('M')
+
+    return merged_df.sort_values('created_at', kind='stable', ignore_index=True)
+
+
+def build_line_item_index(line_items):
+    return BitmapIndex(line_items, LINE_ITEM_DIMENSIONS, date_column='created_at')
+
+
+def build_order_index(orders):
+    return BitmapIndex(orders, ORDER_DIMENSIONS, date_column='created_at')
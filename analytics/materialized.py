@@ -0,0 +1,100 @@
+"""Precomputed report results stored on disk
+
+``python -m analytics.batch`` computes the reports for the standard filter
+combinations and writes them here; pages read a result when one exists for
+their current filters and compute it live otherwise.
+
+Results live under ``<root>/<data version>-<code version>/<report>/<key>.parquet``,
+where the data version is a hash of the source tables and the code version a
+hash of the ``analytics`` package (``persistent.code_version``), so results
+computed from other data or by other report code are never served. The root
+defaults to ``MATERIALIZED_DIR`` or ``.cache/materialized``.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from analytics.persistent import code_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = ".cache/materialized"
+
+
+def data_version(tables):
+    """Short hash identifying the contents of the source tables"""
+    digest = hashlib.sha1()
+    for name in sorted(tables):
+        df = tables[name]
+        digest.update(name.encode())
+        digest.update(",".join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def result_key(params):
+    """File name stem for a set of filter parameters"""
+    canonical = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:20]
+
+
+class MaterializedStore:
+    """Read and write report results for one data version and code version"""
+
+    def __init__(self, version, root=None, code=None):
+        self.root = Path(root or os.environ.get("MATERIALIZED_DIR", DEFAULT_STORE_DIR))
+        self.version = version
+        self.code = code or code_version()
+        self.path = self.root / f"{version}-{self.code}"
+
+    def _result_path(self, report, params):
+        return self.path / report / f"{result_key(params)}.parquet"
+
+    def read(self, report, **params):
+        """The stored result for ``params``, or ``None`` if it was not precomputed"""
+        path = self._result_path(report, params)
+        try:
+            return pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable result %s: %s", path, e)
+            return None
+
+    def write(self, report, df, **params):
+        path = self._result_path(report, params)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write under a temporary name so readers never see a partial file
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+
+    def manifest(self):
+        """Summary of the last batch run for this version, if any"""
+        try:
+            return json.loads((self.path / "manifest.json").read_text())
+        except FileNotFoundError:
+            return None
+
+    def write_manifest(self, manifest):
+        self.path.mkdir(parents=True, exist_ok=True)
+        (self.path / "manifest.json").write_text(json.dumps(manifest, indent=2, default=str))
+
+    def prune(self, keep=2):
+        """Delete all but the ``keep`` most recent data/code versions (always keeping this one)"""
+        if not self.root.exists():
+            return []
+        versions = sorted(
+            (p for p in self.root.iterdir() if p.is_dir() and p != self.path),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        removed = versions[max(keep - 1, 0):]
+        for path in removed:
+            shutil.rmtree(path, ignore_errors=True)
+        return [p.name for p in removed]
@@ -0,0 +1,186 @@
+"""Byte-bounded result caches and memory usage reporting
+
+Results computed on the pages are kept in LRU caches bounded by their size
+in bytes (DataFrames are measured with ``memory_usage(deep=True)``, figures by
+their trace data) rather than by entry count:
+
+- ``shared_cache(name)`` is one cache per process, shared by all sessions, of
+  at most ``SHARED_CACHE_MB`` (environment variable, default 256) MiB.
+- ``session_cache(name)`` lives in the session state of the current session,
+  so it is dropped with the session, and holds at most ``SESSION_CACHE_MB``
+  (default 32) MiB per session.
+
+A result larger than its cache's limit is not stored. Hits, misses,
+evictions and rejected results are counted per cache name across the
+process; ``cache_report()`` and ``process_memory()`` feed the debug page.
+"""
+import os
+import sys
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import RLock
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+SHARED_CACHE_BYTES = int(float(os.environ.get('SHARED_CACHE_MB', 256)) * 2**20)
+SESSION_CACHE_BYTES = int(float(os.environ.get('SESSION_CACHE_MB', 32)) * 2**20)
+
+_lock = RLock()
+_stats = {}
+_shared = {}
+_session_caches = {}
+_MISSING = object()
+
+
+def object_bytes(value):
+    """Approximate memory held by a result (frames, arrays, figures, objects with ``nbytes`` and containers of them)"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray) or hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(object_bytes(key) + object_bytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(object_bytes(item) for item in value)
+    if hasattr(value, 'to_plotly_json'):
+        return object_bytes(value.to_plotly_json())
+    return sys.getsizeof(value)
+
+
+@dataclass
+class CacheStats:
+    """Process-wide counters of the caches sharing a name"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    evicted_bytes: int = 0
+    rejected: int = 0
+
+
+class ByteLRU:
+    """Least-recently-used cache holding at most ``max_bytes`` of values"""
+
+    def __init__(self, name, max_bytes):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        with _lock:
+            self.stats = _stats.setdefault(name, CacheStats())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with _lock:
+            if key not in self._entries:
+                self.stats.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return self._entries[key][0]
+
+    def peek(self, key, default=None):
+        """Cached value of ``key`` without counting a hit or refreshing it"""
+        entry = self._entries.get(key)
+        return default if entry is None else entry[0]
+
+    def put(self, key, value):
+        """Store ``value``, evicting the least recently used entries; False if it is too large"""
+        size = object_bytes(value)
+        with _lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                self.stats.rejected += 1
+                return False
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.stats.evictions += 1
+                self.stats.evicted_bytes += evicted
+            return True
+
+    def get_or_compute(self, key, compute):
+        """Cached value of ``key``, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with _lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _discard(self, key):
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+
+
+def shared_cache(name, max_bytes=SHARED_CACHE_BYTES):
+    """The process-wide cache ``name``, shared by all sessions"""
+    with _lock:
+        if name not in _shared:
+            _shared[name] = ByteLRU(name, max_bytes)
+        return _shared[name]
+
+
+def session_cache(name, max_bytes=SESSION_CACHE_BYTES):
+    """The cache ``name`` of the current session, kept in its session state"""
+    cache = st.session_state.get(name)
+    if not isinstance(cache, ByteLRU):
+        cache = ByteLRU(name, max_bytes)
+        st.session_state[name] = cache
+        with _lock:
+            _session_caches.setdefault(name, weakref.WeakSet()).add(cache)
+    return cache
+
+
+def cache_report():
+    """Entries, size, limit and counters of every cache name (session caches summed over live sessions)"""
+    rows = []
+    with _lock:
+        for name, stats in _stats.items():
+            if name in _shared:
+                caches, kind = [_shared[name]], 'shared'
+            else:
+                caches, kind = list(_session_caches.get(name, ())), 'session'
+            rows.append({
+                'cache': name,
+                'kind': kind,
+                'instances': len(caches),
+                'entries': sum(len(cache) for cache in caches),
+                'bytes': sum(cache.bytes for cache in caches),
+                'limit': caches[0].max_bytes if caches else None,
+                **vars(stats),
+            })
+    return pd.DataFrame(rows, columns=[
+        'cache', 'kind', 'instances', 'entries', 'bytes', 'limit',
+        'hits', 'misses', 'evictions', 'evicted_bytes', 'rejected',
+    ])
+
+
+def process_memory():
+    """Current and peak resident set size of this process in bytes (None where /proc is unavailable)"""
+    usage = {'rss': None, 'peak_rss': None}
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                field, _, value = line.partition(':')
+                if field in ('VmRSS', 'VmHWM'):
+                    usage['rss' if field == 'VmRSS' else 'peak_rss'] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return usage
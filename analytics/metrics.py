@@ -0,0 +1,220 @@
+"""Metric computations shared by the pages, the API server and batch jobs
+
+Every function is pure: it takes fact frames (see ``analytics.facts``) or
+filter parameters and returns a DataFrame, with no Streamlit dependency.
+Inputs are never modified, so they can be the shared cached frames.
+
+Money columns hold integer cents (see ``analytics.schema``): sums and
+differences are taken in cents and converted to dollars on output, and
+nothing is rounded here; pages round when formatting for display.
+"""
+import numpy as np
+import pandas as pd
+
+from analytics.bitmap import materialize
+from analytics.parallel import partitioned_agg
+from analytics.schema import dollars
+
+LINE_ITEM_COLUMNS = ['product_id', 'name', 'category', 'brand', 'department', 'cost', 'retail_price',
+                     'id_order', 'sale_price', 'status', 'created_at', 'product_id_code']
+ORDER_COLUMNS = ['order_id', 'status', 'created_at', 'year_month']
+
+
+def filter_line_items(line_items, index, start_date=None, end_date=None, status='All', gender='All',
+                      category='All', department='All', columns=LINE_ITEM_COLUMNS):
+    """Line items matching the filters, with only ``columns`` copied
+
+    ``gender`` takes the order codes ('M' / 'F'); 'All' disables a filter.
+    """
+    selection = _select_line_items(index, start_date, end_date, status, gender, category, department)
+    return materialize(line_items, selection, columns=columns)
+
+
+def count_line_items(index, start_date=None, end_date=None, status='All', gender='All',
+                     category='All', department='All'):
+    """Number of line items matching the filters, without copying any rows"""
+    return _select_line_items(index, start_date, end_date, status, gender, category, department).count()
+
+
+def _select_line_items(index, start_date, end_date, status, gender, category, department):
+    filters = {}
+    for dimension, value in [('status', status), ('gender', gender),
+                             ('category', category), ('department', department)]:
+        if value != 'All':
+            filters[dimension] = value
+    date_range = None if start_date is None and end_date is None else (start_date, end_date)
+    return index.select(filters, date_range)
+
+
+def filter_orders(orders, index, countries=None, traffic_sources=None, columns=ORDER_COLUMNS):
+    """Orders from the given countries and traffic sources (``None`` means all)"""
+    filters = {}
+    if countries is not None:
+        filters['country'] = list(countries)
+    if traffic_sources is not None:
+        filters['traffic_source'] = list(traffic_sources)
+    return materialize(orders, index.select(filters), columns=columns)
+
+
+def monthly_order_metrics(orders):
+    """Monthly order count, cancelled orders and cancel rate"""
+    df = orders.assign(cancelled=orders['status'] == 'Cancelled')
+
+    monthly_stats = df.groupby('year_month').agg({
+        'order_id': 'count',
+        'cancelled': 'sum'
+    }).reset_index()
+
+    monthly_stats.columns = ['year_month', 'total_orders', 'cancelled_orders']
+    monthly_stats['cancel_rate'] = (
+        monthly_stats['cancelled_orders'] / monthly_stats['total_orders'] * 100
+    )
+
+    # Convert Period to str for Plotly
+    monthly_stats['year_month'] = monthly_stats['year_month'].astype(str)
+
+    return monthly_stats
+
+
+def category_metrics(line_items):
+    """Sales, average price, order count and sales share per category"""
+    metrics = partitioned_agg(line_items, 'category', {
+        'sale_price': ['sum', 'mean', 'count'],
+        'id_order': 'count'
+    })
+
+    metrics.columns = ['Total Sales', 'Avg Price', 'Count_1', 'Order Count']
+    metrics = metrics[['Total Sales', 'Avg Price', 'Order Count']]
+    metrics[['Total Sales', 'Avg Price']] = dollars(metrics[['Total Sales', 'Avg Price']])
+    metrics = metrics.sort_values('Total Sales', ascending=False)
+
+    # Add percentage of total sales
+    metrics['Sales %'] = metrics['Total Sales'] / metrics['Total Sales'].sum() * 100
+
+    return metrics
+
+
+def period_category_metrics(line_items, periods):
+    """``category_metrics`` of every period at once, indexed by (period, category)
+
+    ``periods`` is a frame of inclusive ``start`` / ``end`` dates indexed by
+    period name (see ``analytics.periods.resolve_periods``); NaT leaves a side
+    open. The period boundaries split the date axis into disjoint buckets, each
+    row is assigned its bucket, and one ``bincount`` over bucket × category
+    gives the partial sums and counts that every period then adds up from the
+    buckets it covers, so the line items are scanned once however many periods
+    are compared. Categories without rows in a period are left out, as in
+    ``category_metrics``.
+    """
+    days = line_items['date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    starts = periods['start'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    ends = periods['end'].to_numpy().astype('datetime64[D]').astype(np.int64) + 1
+    lowest, highest = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+    starts = np.where(periods['start'].isna(), lowest, starts)
+    ends = np.where(periods['end'].isna(), highest, ends)
+
+    # Bucket k holds the days in [boundaries[k - 1], boundaries[k])
+    boundaries = np.unique(np.concatenate([starts, ends]))
+    boundaries = boundaries[(boundaries != lowest) & (boundaries != highest)]
+    buckets = np.searchsorted(boundaries, days, side='right')
+    bucket_lows = np.concatenate([[lowest], boundaries])
+    bucket_highs = np.concatenate([boundaries, [highest]])
+    covers = (bucket_lows >= starts[:, None]) & (bucket_highs <= ends[:, None])
+
+    codes, categories = pd.factorize(line_items['category'], sort=True)
+    prices = line_items['sale_price'].to_numpy(dtype=float)
+    priced = ~np.isnan(prices)
+    keep = codes >= 0
+    cells = buckets[keep] * len(categories) + codes[keep]
+    shape = (len(boundaries) + 1, len(categories))
+
+    def totals(weights=None):
+        counts = np.bincount(cells, weights, minlength=shape[0] * shape[1]).reshape(shape)
+        return covers.astype(float) @ counts
+
+    rows = totals()
+    sales = totals(np.where(priced, prices, 0)[keep])
+    price_counts = totals(priced[keep].astype(float))
+    order_counts = totals(line_items['id_order'].notna().to_numpy()[keep].astype(float))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        metrics = pd.DataFrame({
+            'Total Sales': dollars(sales.ravel()),
+            'Avg Price': dollars(sales / price_counts).ravel(),
+            'Order Count': order_counts.ravel().astype(np.int64),
+        }, index=pd.MultiIndex.from_product([periods.index, categories], names=['period', 'category']))
+    metrics = metrics[rows.ravel() > 0]
+
+    # Sort categories by sales within each period, keeping the periods' order
+    period_order = metrics.index.get_level_values('period').map(
+        {period: position for position, period in enumerate(periods.index)})
+    metrics = (metrics.assign(_period=period_order)
+               .sort_values(['_period', 'Total Sales'], ascending=[True, False])
+               .drop(columns='_period'))
+    period_sales = metrics.groupby(level='period', sort=False)['Total Sales'].transform('sum')
+    metrics['Sales %'] = metrics['Total Sales'] / period_sales * 100
+    return metrics
+
+
+def department_metrics(line_items):
+    """Sales and order count per department"""
+    metrics = partitioned_agg(line_items, 'department', {
+        'sale_price': 'sum',
+        'id_order': 'count'
+    })
+    metrics.columns = ['Total Sales', 'Order Count']
+    metrics['Total Sales'] = dollars(metrics['Total Sales'])
+    return metrics.sort_values('Total Sales', ascending=False)
+
+
+def daily_category_sales(line_items, categories=None):
+    """Daily sales of the given categories (all of them by default)"""
+    trend_df = line_items if categories is None else line_items[line_items['category'].isin(categories)]
+    daily = partitioned_agg(trend_df, ['date', 'category'], {'sale_price': 'sum'}).reset_index()
+    daily['sale_price'] = dollars(daily['sale_price'])
+    return daily
+
+
+def product_stats(line_items):
+    """Sales count, revenue, returns and profitability per product"""
+    attributes = ['name', 'category', 'brand', 'department', 'cost', 'retail_price']
+    line_items = line_items.assign(returned=line_items['status'] == 'Returned')
+    stats = partitioned_agg(line_items, 'product_id', {
+        **dict.fromkeys(attributes, 'first'),  # Constant per product
+        'id_order': 'count',  # Total orders
+        'sale_price': 'sum',   # Total revenue
+        'returned': 'sum'  # Return count
+    }).dropna(subset=attributes).reset_index()
+
+    stats.columns = ['product_id', 'name', 'category', 'brand', 'department', 'cost', 'retail_price', 'total_sales_count', 'total_revenue', 'return_count']
+
+    # Calculate additional metrics, in cents: total profit is exact
+    revenue, cost, count = stats['total_revenue'], stats['cost'], stats['total_sales_count']
+    avg_sale_price = revenue / count
+    stats['return_rate'] = stats['return_count'] / count * 100
+    stats['avg_sale_price'] = dollars(avg_sale_price)
+    stats['profit_per_item'] = dollars(avg_sale_price - cost)
+    stats['total_profit'] = dollars(revenue - cost * count)
+    stats['profit_margin'] = (avg_sale_price - cost) / avg_sale_price * 100
+    stats[['cost', 'retail_price', 'total_revenue']] = dollars(stats[['cost', 'retail_price', 'total_revenue']])
+
+    # Fill NaN values
+    return stats.fillna(0)
+
+
+def return_rates_by(product_stats, key, min_sales=0):
+    """Return rate per ``key`` (e.g. 'category' or 'brand'), highest first"""
+    returns = partitioned_agg(product_stats, key, {
+        'return_count': 'sum',
+        'total_sales_count': 'sum'
+    }).reset_index()
+    returns['return_rate'] = returns['return_count'] / returns['total_sales_count'] * 100
+    returns = returns[returns['total_sales_count'] >= min_sales]
+    return returns.sort_values('return_rate', ascending=False)
+
+
+def profit_by_category(product_stats):
+    """Total profit per category, lowest first"""
+    return partitioned_agg(product_stats, 'category', {
+        'total_profit': 'sum'
+    }).reset_index().sort_values('total_profit', ascending=True)
@@ -0,0 +1,136 @@
+"""Partitioned group-by aggregation on integer group codes
+
+Group keys are mapped to integer codes once: the fact tables carry a
+precomputed ``<key>_code`` column for their main group keys (see
+``analytics.facts``), and any other key is factorized once per call. Sums
+and counts are then ``np.bincount`` calls over the codes, which run without
+the GIL and without hashing a single string.
+
+Tables of at least ``PARALLEL_MIN_ROWS`` rows are split into contiguous row
+ranges whose partial sums are added up. The ranges run on one thread pool
+shared by the whole process, so concurrent sessions queue for the same
+``WORKERS`` threads instead of each starting their own. The worker count
+comes from the ``ANALYTICS_WORKERS`` environment variable (default: the CPU
+count, ``1`` aggregates every table on the calling thread).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+PARALLEL_MIN_ROWS = 1_000_000
+
+WORKERS = int(os.environ.get("ANALYTICS_WORKERS", 0)) or os.cpu_count() or 1
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _executor():
+    """The process-wide thread pool, sized by ``WORKERS`` when first used"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(WORKERS, thread_name_prefix='analytics')
+        return _pool
+
+
+def group_codes(df, by):
+    """Integer group code of every row (-1 where a key is missing) and the number of codes
+
+    Codes follow the sorted order of the keys, as ``groupby`` does.
+    """
+    codes, n_groups = None, 1
+    for key in [by] if isinstance(by, str) else by:
+        if f'{key}_code' in df:
+            key_codes = df[f'{key}_code'].to_numpy().astype(np.int64)
+            size = int(key_codes.max()) + 1 if len(key_codes) else 0
+        else:
+            key_codes, uniques = pd.factorize(df[key], sort=True)
+            size = len(uniques)
+        missing = key_codes < 0 if codes is None else (codes < 0) | (key_codes < 0)
+        codes = key_codes if codes is None else codes * size + key_codes
+        codes[missing] = -1
+        n_groups *= size
+    if n_groups > 2 * len(df) + 1024:
+        # Sparse combinations of several keys: renumber the ones that occur
+        present = codes >= 0
+        uniques, codes[present] = np.unique(codes[present], return_inverse=True)
+        n_groups = len(uniques)
+    return codes, n_groups
+
+
+def _partial(codes, values, n_groups, start, stop):
+    """First row, and sums and non-missing counts of ``values``, per group over rows [start, stop)"""
+    rows = np.arange(start, stop)
+    part = codes[start:stop]
+    valid = part >= 0
+    rows, part = rows[valid], part[valid]
+    first = np.full(n_groups, len(codes))
+    np.minimum.at(first, part, rows)
+    sums, counts = {}, {}
+    for column, (data, present) in values.items():
+        data, present = data[start:stop][valid], present[start:stop][valid]
+        sums[column] = np.bincount(part, np.where(present, data, 0), minlength=n_groups)
+        counts[column] = np.bincount(part[present], minlength=n_groups)
+    return first, sums, counts
+
+
+def partitioned_agg(df, by, aggregations, workers=None):
+    """``df.groupby(by).agg(aggregations)`` computed with ``bincount`` over row partitions
+
+    ``aggregations`` maps a column to 'sum', 'count', 'mean' or 'first', or to
+    a list of them, as in ``DataFrame.agg``; the result has the same index and
+    columns. 'first' is the value in the group's first row, meant for
+    attributes that are constant within a group (missing values included).
+    """
+    workers = workers or WORKERS
+    specs = {column: [funcs] if isinstance(funcs, str) else list(funcs) for column, funcs in aggregations.items()}
+    codes, n_groups = group_codes(df, by)
+
+    # Numeric columns to sum and count, as float64 with their non-missing mask
+    values = {}
+    for column, funcs in specs.items():
+        if set(funcs) - {'first'}:
+            data = df[column].to_numpy()
+            present = ~pd.isna(data)
+            values[column] = (data.astype(np.float64) if data.dtype.kind in 'biuf' else present.astype(np.float64),
+                              present)
+
+    if workers > 1 and len(df) >= PARALLEL_MIN_ROWS:
+        bounds = [len(df) * i // workers for i in range(workers + 1)]
+        partials = list(_executor().map(lambda i: _partial(codes, values, n_groups, bounds[i], bounds[i + 1]),
+                                        range(workers)))
+    else:
+        partials = [_partial(codes, values, n_groups, 0, len(df))]
+    first = np.minimum.reduce([partial[0] for partial in partials])
+    sums = {column: sum(partial[1][column] for partial in partials) for column in values}
+    counts = {column: sum(partial[2][column] for partial in partials) for column in values}
+
+    groups = first < len(df)
+    first_rows = first[groups]
+    keys = [by] if isinstance(by, str) else list(by)
+    labels = [df[key].to_numpy()[first_rows] for key in keys]
+    index = (pd.Index(labels[0], name=keys[0]) if isinstance(by, str)
+             else pd.MultiIndex.from_arrays(labels, names=keys))
+
+    nested = any(not isinstance(funcs, str) for funcs in aggregations.values())
+    result = {}
+    for column, funcs in specs.items():
+        integral = df[column].dtype.kind in 'biu'
+        for func in funcs:
+            if func == 'first':
+                aggregated = df[column].to_numpy()[first_rows]
+            elif func == 'count':
+                aggregated = counts[column][groups].astype(np.int64)
+            elif func == 'mean':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    aggregated = sums[column][groups] / counts[column][groups]
+            else:
+                aggregated = sums[column][groups]
+                if integral:
+                    aggregated = aggregated.astype(np.int64)
+            result[(column, func) if nested else column] = aggregated
+    return pd.DataFrame(result, index=index)
@@ -0,0 +1,63 @@
+"""Analysis period presets"""
+import re
+
+import numpy as np
+import pandas as pd
+
+PERIOD_PRESETS = ["All Time", "Last 7 Days", "Last 30 Days", "This Month", "Last Month",
+                  "This Quarter", "Last Quarter", "This Year", "Last Year"]
+
+# Every preset of the pages, for comparing periods side by side
+COMPARE_PRESETS = ["Last 7 Days", "Last 30 Days", "Last 60 Days", "Last 90 Days", "This Month", "Last Month",
+                   "This Quarter", "Last Quarter", "This Year", "Last Year", "All Time"]
+
+_CALENDAR_MONTHS = {'Month': 1, 'Quarter': 3, 'Year': 12}
+
+
+def _preset_rule(period_type):
+    """(kind, size, units back) of a preset: N-day windows, calendar units in months, or open"""
+    calendar = re.fullmatch(r"(This|Last) (Month|Quarter|Year)", period_type)
+    if calendar:
+        return 'calendar', _CALENDAR_MONTHS[calendar.group(2)], int(calendar.group(1) == "Last")
+    days = re.fullmatch(r"Last (\d+) Days", period_type)
+    if days:
+        return 'days', int(days.group(1)), 0
+    return 'all', 0, 0
+
+
+def resolve_periods(reference_date, presets=PERIOD_PRESETS):
+    """Inclusive start and end dates of each preset relative to ``reference_date``
+
+    All presets are resolved together with datetime64 arithmetic. Returns a
+    DataFrame indexed by preset with ``start`` / ``end`` columns; both are NaT
+    for "All Time" (and any other preset without a fixed window).
+    """
+    kind, size, back = (np.array(values) for values in zip(*map(_preset_rule, presets)))
+    today = np.datetime64(reference_date, 'D')
+    month = today.astype('datetime64[M]').astype(np.int64)
+
+    # Calendar units: month index of the unit's first month, stepped back for "Last ..."
+    unit = np.maximum(size, 1)
+    first_month = (month // unit - back) * unit
+    calendar_start = first_month.astype('datetime64[M]').astype('datetime64[D]')
+    calendar_end = np.where(
+        back > 0, (first_month + unit).astype('datetime64[M]').astype('datetime64[D]') - 1, today
+    )
+
+    not_a_time = np.datetime64('NaT', 'D')
+    start = np.select([kind == 'calendar', kind == 'days'], [calendar_start, today - (size - 1)], not_a_time)
+    end = np.select([kind == 'calendar', kind == 'days'], [calendar_end, np.full(len(kind), today)], not_a_time)
+    return pd.DataFrame({'start': start.astype('datetime64[ns]'), 'end': end.astype('datetime64[ns]')},
+                        index=pd.Index(presets, name='period'))
+
+
+def get_period_dates(period_type, reference_date):
+    """Calculate start and end dates based on period type"""
+    bounds = resolve_periods(reference_date, [period_type]).iloc[0]
+    if pd.isna(bounds['start']):
+        return None, None
+    return bounds['start'].date(), bounds['end'].date()
+
+
+# Presets of the Poor Performance Analysis page, resolved like every other preset
+LOOKBACK_PRESETS = ["All Time", "Last 30 Days", "Last 60 Days", "Last 90 Days"]
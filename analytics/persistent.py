@@ -0,0 +1,291 @@
+"""On-disk cache of expensive results, persisted across server restarts
+
+Streamlit's caches live in process memory, so every deploy or restart
+recomputes the snapshot, the fact frames, their indexes and the page results
+from scratch. ``PersistentCache`` keeps them on disk as pickles, addressed by a
+hash of:
+
+- the result name and parameters,
+- a fingerprint of the data it was computed from (the data version, or the
+  source files' sizes and modification times), and
+- ``code_version()``, a hash of the ``analytics`` package source, and
+  ``source_version(compute)``, a hash of the file defining the function that
+  computes the result (a page script, for results computed on a page),
+
+so a result is only reused for the same data and the same code; entries for
+old data or code are never read again and age out. The cache holds at most
+``DISK_CACHE_MB`` (environment variable, default 1024) MiB under
+``DISK_CACHE_DIR`` (default ``.cache/results``), evicting the least recently
+used entries; ``DISK_CACHE_MB=0`` disables it. Each process keeps a running
+total of the bytes it stored since it last listed the directory, and only
+lists it again (evicting down to ``EVICT_TARGET`` of the limit) once that
+total passes the limit, so the cache can briefly exceed the limit by what
+other processes stored in the meantime.
+
+Several server processes can share the directory: entries are written under
+a temporary name and renamed into place, so readers never see a partial
+file, and a per-entry lock file makes one process compute a missing entry
+while the others wait for it and read it (POSIX only; elsewhere the entries
+may occasionally be computed twice). Eviction also deletes the lock files
+of entries no longer on disk, unless a process holds them, so keys of old
+data or code do not leave lock files behind.
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from analytics.memory import CacheStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".cache/results"
+DISK_CACHE_BYTES = int(float(os.environ.get('DISK_CACHE_MB', 1024)) * 2**20)
+
+# Temporary files older than this are left over from a crashed writer
+STALE_TMP_SECONDS = 3600
+
+# Eviction frees space down to this fraction of the limit, so the directory
+# is not listed again on every write once the cache is full
+EVICT_TARGET = 0.8
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=1)
+def code_version():
+    """Short hash of the ``analytics`` package source"""
+    digest = hashlib.sha1()
+    for path in sorted(Path(__file__).resolve().parent.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+@lru_cache(maxsize=64)
+def _file_version(path, mtime_ns, size):
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()[:16]
+
+
+def source_version(func):
+    """Short hash of the source file defining ``func`` (page scripts change without a restart)"""
+    code = getattr(getattr(func, 'func', func), '__code__', None)
+    if code is None:
+        return None
+    try:
+        stat = os.stat(code.co_filename)
+    except OSError:
+        return None
+    return _file_version(code.co_filename, stat.st_mtime_ns, stat.st_size)
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on ``path`` across processes (a no-op without ``fcntl``)"""
+    if fcntl is None:
+        yield
+        return
+    while True:
+        lock_file = open(path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Eviction may have deleted the file while we waited: lock the one now at ``path``
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                current = None
+            if current is not None and os.path.samestat(current, os.fstat(lock_file.fileno())):
+                break
+        except BaseException:
+            lock_file.close()
+            raise
+        lock_file.close()
+    with lock_file:
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _remove_lock(path):
+    """Delete the lock file ``path`` unless a process holds it; whether it was deleted"""
+    if fcntl is None:
+        return False
+    try:
+        lock_file = open(path, 'rb')
+    except FileNotFoundError:
+        return False
+    with lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        # Deleted while locked, so a process waiting on it retries on a new file
+        path.unlink(missing_ok=True)
+        return True
+
+
+class PersistentCache:
+    """Size-bounded, content-addressed pickle store shared by processes"""
+
+    def __init__(self, root=None, max_bytes=DISK_CACHE_BYTES):
+        self.root = Path(root or os.environ.get('DISK_CACHE_DIR', DEFAULT_CACHE_DIR))
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._stats_lock = Lock()
+        # Bytes on disk as of the last listing plus what this process stored since
+        self._estimated_bytes = None
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _count(self, counter, amount=1):
+        with self._stats_lock:
+            setattr(self.stats, counter, getattr(self.stats, counter) + amount)
+
+    def key(self, name, fingerprint, params, compute=None):
+        """Hash addressing the result ``name`` for ``params`` on data ``fingerprint``, computed by ``compute``"""
+        canonical = json.dumps([name, fingerprint, code_version(), source_version(compute), params],
+                               sort_keys=True, default=str)
+        return hashlib.sha1(canonical.encode()).hexdigest()
+
+    def _path(self, key):
+        return self.root / key[:2] / f"{key}.pkl"
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return _MISSING
+        except Exception as e:
+            logger.warning("Ignoring unreadable cache entry %s: %s", path, e)
+            return _MISSING
+        # The modification time orders entries for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def _write(self, path, value):
+        """Store ``value`` at ``path`` and return its size; None if it is larger than the whole cache"""
+        # Write under a temporary name so readers never see a partial file
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = tmp.stat().st_size
+            if size > self.max_bytes:
+                tmp.unlink()
+                return None
+            os.replace(tmp, path)
+            return size
+        except Exception as e:
+            # A full disk or an unpicklable value only costs the persistence
+            logger.warning("Could not persist %s: %s", path.name, e)
+            tmp.unlink(missing_ok=True)
+            return None
+
+    def get_or_compute(self, name, fingerprint, compute, **params):
+        """The stored result, computing and storing it on a miss
+
+        While one process computes an entry, others asking for the same entry
+        wait for it instead of computing it again.
+        """
+        if not self.enabled:
+            return compute()
+        key = self.key(name, fingerprint, params, compute)
+        path = self._path(key)
+        value = self._read(path)
+        if value is not _MISSING:
+            self._count('hits')
+            return value
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _file_lock(path.with_suffix('.lock')):
+            value = self._read(path)
+            if value is not _MISSING:
+                self._count('hits')
+                return value
+            self._count('misses')
+            value = compute()
+            size = self._write(path, value)
+        if size is None:
+            self._count('rejected')
+        else:
+            self._stored(size)
+        return value
+
+    def _stored(self, size):
+        """Account for a new entry, evicting once the running total passes the limit"""
+        with self._stats_lock:
+            if self._estimated_bytes is not None:
+                self._estimated_bytes += size
+            full = self._estimated_bytes is None or self._estimated_bytes > self.max_bytes
+        if full:
+            self.evict()
+
+    def _entries(self):
+        """(path, size, mtime) of every entry, oldest first, removing stale temporary files"""
+        entries = []
+        now = time.time()
+        for path in self.root.glob('*/*'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.suffix == '.pkl':
+                entries.append((path, stat.st_size, stat.st_mtime))
+            elif path.suffix == '.tmp' and now - stat.st_mtime > STALE_TMP_SECONDS:
+                path.unlink(missing_ok=True)
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self):
+        """List the cache and, if it is over ``max_bytes``, delete the least recently used entries
+
+        Entries are deleted until the cache is down to ``EVICT_TARGET`` of the
+        limit. Lock files without an entry are deleted too, except those a
+        process holds while computing the entry.
+        """
+        if not self.root.exists():
+            return
+        with _file_lock(self.root / '.evict.lock'):
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            if total > self.max_bytes:
+                for path, size, _ in entries:
+                    if total <= self.max_bytes * EVICT_TARGET:
+                        break
+                    path.unlink(missing_ok=True)
+                    total -= size
+                    self._count('evictions')
+                    self._count('evicted_bytes', size)
+            for lock in self.root.glob('*/*.lock'):
+                if not lock.with_suffix('.pkl').exists():
+                    _remove_lock(lock)
+        with self._stats_lock:
+            self._estimated_bytes = total
+
+    def usage(self):
+        """Number of entries and bytes on disk"""
+        entries = self._entries() if self.root.exists() else []
+        return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+
+@lru_cache(maxsize=1)
+def persistent_cache():
+    """The process's persistent cache, configured from the environment"""
+    return PersistentCache()
@@ -0,0 +1,68 @@
+"""Compact column types of the source tables
+
+The sources deliver money as float64 dollars (often float32 artifacts such as
+5.949999809265137) and every id and count as int64. ``apply_schema`` converts
+them once, when the tables are loaded:
+
+- money (``MONEY_COLUMNS``) becomes integer cents, int32 when the values fit,
+  so sums and differences are exact and no metric needs to round its inputs;
+- ids become int32 when they fit, and small counts the narrowest integer type.
+
+Metrics do their arithmetic on cents and convert results back to dollars with
+``dollars``; rounding to two decimals is left to the display format. Columns
+with missing values are kept as floats (money still in cents), since numpy
+integers have no NaN.
+"""
+import numpy as np
+import pandas as pd
+
+CENTS = 100
+
+MONEY_COLUMNS = ['sale_price', 'cost', 'retail_price']
+
+TABLE_SCHEMA = {
+    'orders': {'order_id': 'id', 'user_id': 'id', 'num_of_item': 'count'},
+    'users': {'id': 'id', 'age': 'count'},
+    'order_items': {'id': 'id', 'order_id': 'id', 'user_id': 'id', 'product_id': 'id', 'inventory_item_id': 'id',
+                    'sale_price': 'money'},
+    'products': {'id': 'id', 'cost': 'money', 'retail_price': 'money', 'distribution_center_id': 'count'},
+}
+
+_INT32 = np.iinfo(np.int32)
+
+
+def _fits_int32(values):
+    return len(values) == 0 or (values.min() >= _INT32.min and values.max() <= _INT32.max)
+
+
+def to_cents(values):
+    """Dollar amounts as integer cents (int32 when they fit, float where values are missing)"""
+    cents = np.rint(pd.Series(values, dtype=np.float64) * CENTS)
+    if cents.isna().any():
+        return cents
+    return cents.astype(np.int32 if _fits_int32(cents) else np.int64)
+
+
+def dollars(cents):
+    """Cents (scalars, arrays or Series) as float dollars"""
+    return cents / CENTS
+
+
+def _compact(values, kind):
+    if kind == 'money':
+        return to_cents(values)
+    if values.isna().any() or not pd.api.types.is_integer_dtype(values):
+        return values
+    if kind == 'id':
+        return values.astype(np.int32) if _fits_int32(values) else values
+    return pd.to_numeric(values, downcast='integer')
+
+
+def apply_schema(tables, schema=TABLE_SCHEMA):
+    """Copies of the source tables with the compact column types"""
+    compacted = {}
+    for name, df in tables.items():
+        columns = {column: _compact(df[column], kind)
+                   for column, kind in schema.get(name, {}).items() if column in df}
+        compacted[name] = df.assign(**columns) if columns else df
+    return compacted
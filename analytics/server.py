@@ -0,0 +1,178 @@
+"""Local HTTP/JSON endpoint serving the dashboard metrics
+
+Run it next to (or instead of) the Streamlit app:
+
+    python -m analytics.server --port 8600
+
+Endpoints (all GET, parameters are optional query strings):
+
+- ``/monthly_metrics?country=Japan&country=Spain&traffic_source=Search``
+- ``/category_metrics?period=Last Month&status=Complete&gender=F``
+- ``/department_metrics`` (same parameters as ``/category_metrics``)
+- ``/product_stats?start_date=2025-04-01&category=Jeans&department=Men``
+- ``/health``
+
+``period`` accepts the presets of ``analytics.periods.COMPARE_PRESETS`` and is
+resolved against the latest date in the data; ``start_date`` / ``end_date`` (ISO
+dates) override it. Responses are ``{"columns": [...], "data": [...]}`` and
+are cached in memory per distinct query. Unknown endpoints answer 404, invalid
+parameters 400, and failures while computing a metric 500 (with the traceback
+in the server log).
+"""
+import argparse
+import json
+import logging
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from urllib.parse import parse_qs, urlsplit
+
+from analytics import metrics
+from analytics.facts import build_line_item_index, build_line_items, build_order_index, build_orders
+from analytics.periods import COMPARE_PRESETS, get_period_dates
+from analytics.sources import TABLES, load_tables, source_from_url
+
+logger = logging.getLogger(__name__)
+
+
+class QueryError(ValueError):
+    """A query parameter is invalid"""
+
+
+class MetricsService:
+    """Answers metric queries from fact tables loaded once at startup"""
+
+    def __init__(self, tables, cache_size=256):
+        self.line_items = build_line_items(tables)
+        self.line_item_index = build_line_item_index(self.line_items)
+        self.orders = build_orders(tables)
+        self.order_index = build_order_index(self.orders)
+        self.max_date = self.line_items['created_at'].max().date()
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = Lock()
+        self.endpoints = {
+            'monthly_metrics': self.monthly_metrics,
+            'category_metrics': self.category_metrics,
+            'department_metrics': self.department_metrics,
+            'product_stats': self.product_stats,
+        }
+
+    def _date_range(self, params):
+        period = _single(params, 'period', 'All Time')
+        if period not in COMPARE_PRESETS:
+            raise QueryError(f"Unknown period '{period}', expected one of: {', '.join(COMPARE_PRESETS)}")
+        start_date, end_date = get_period_dates(period, self.max_date)
+        try:
+            if 'start_date' in params:
+                start_date = date.fromisoformat(_single(params, 'start_date'))
+            if 'end_date' in params:
+                end_date = date.fromisoformat(_single(params, 'end_date'))
+        except ValueError as e:
+            raise QueryError(str(e)) from e
+        return start_date, end_date
+
+    def _line_items(self, params):
+        start_date, end_date = self._date_range(params)
+        return metrics.filter_line_items(
+            self.line_items,
+            self.line_item_index,
+            start_date,
+            end_date,
+            status=_single(params, 'status', 'All'),
+            gender=_single(params, 'gender', 'All'),
+            category=_single(params, 'category', 'All'),
+            department=_single(params, 'department', 'All'),
+        )
+
+    def monthly_metrics(self, params):
+        return metrics.monthly_order_metrics(metrics.filter_orders(
+            self.orders,
+            self.order_index,
+            countries=params.get('country'),
+            traffic_sources=params.get('traffic_source'),
+        ))
+
+    def category_metrics(self, params):
+        return metrics.category_metrics(self._line_items(params)).reset_index()
+
+    def department_metrics(self, params):
+        return metrics.department_metrics(self._line_items(params)).reset_index()
+
+    def product_stats(self, params):
+        return metrics.product_stats(self._line_items(params))
+
+    def query(self, endpoint, params):
+        """JSON bytes for a known endpoint, served from the response cache when possible"""
+        key = (endpoint, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        df = self.endpoints[endpoint](params)
+        body = df.to_json(orient='split', index=False, date_format='iso').encode()
+
+        with self._lock:
+            self._cache[key] = body
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return body
+
+
+def _single(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def make_handler(service):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            endpoint = url.path.strip('/')
+            if endpoint == 'health':
+                return self._send(200, b'{"status": "ok"}')
+            if endpoint not in service.endpoints:
+                return self._send(404, json.dumps({'error': f"Unknown endpoint '{endpoint}'"}).encode())
+            try:
+                body = service.query(endpoint, parse_qs(url.query))
+            except QueryError as e:
+                return self._send(400, json.dumps({'error': str(e)}).encode())
+            except Exception:
+                logger.exception("Failed to compute %s", self.path)
+                return self._send(500, json.dumps({'error': f"Failed to compute '{endpoint}'"}).encode())
+            self._send(200, body)
+
+        def _send(self, status, body):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.info("%s - %s", self.address_string(), format % args)
+
+    return MetricsHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve dashboard metrics as JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--source', help="Data source URL (defaults to DATA_SOURCE_URL or sample_data)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service = MetricsService(load_tables(TABLES, source_from_url(args.source)))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    logger.info("Serving metrics on http://%s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+"""Streaming sketches for approximate top-N, distinct counts and quantiles
+
+All sketches are fed in vectorized batches (one NumPy pass per chunk of line
+items), have a fixed memory footprint independent of the number of rows, and
+can be merged, so they can be maintained incrementally at ingest time and
+queried in constant time. Each sketch reports its own error bound.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from analytics.schema import dollars
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def hash_values(values):
+    """Hash an array-like of keys to uint64"""
+    values = np.asarray(values)
+    if values.dtype.kind in "OUS":
+        values = values.astype(object)
+    return pd.util.hash_array(values)
+
+
+class SpaceSaving:
+    """Space-saving heavy hitters over a weighted stream
+
+    Tracks at most ``capacity`` keys. Every reported count overestimates the
+    true weight by at most its own ``error``, which is bounded by
+    total weight / capacity. Only the heaviest keys can be answered: a key
+    lighter than that bound may be missing, so rankings of the tail (the
+    least selling brands, say) must be computed exactly.
+    """
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0.0
+
+    @classmethod
+    def for_top(cls, n, relative_error):
+        """Sketch answering the top ``n`` keys with counts within ``relative_error`` of the total weight"""
+        return cls(max(n, int(np.ceil(1 / relative_error))))
+
+    def update(self, keys, weights=None):
+        keys = pd.Series(np.asarray(keys))
+        if keys.empty:
+            return
+        weights = pd.Series(np.ones(len(keys)) if weights is None else np.asarray(weights, dtype=np.float64))
+        # Pre-aggregate the batch so the Python loop runs once per distinct key
+        batch = weights.groupby(keys.values, sort=False).sum()
+        for key, weight in batch.sort_values(ascending=False).items():
+            self._offer(key, float(weight))
+        self.total += float(batch.sum())
+
+    def _offer(self, key, weight):
+        if key in self.counts:
+            self.counts[key] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0.0
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[key] = floor + weight
+            self.errors[key] = floor
+
+    def top(self, n=10):
+        """Top ``n`` keys as a frame of key, count, error and a guaranteed flag"""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        rows = []
+        for i, (key, count) in enumerate(ranked[:n]):
+            next_count = ranked[i + 1][1] if i + 1 < len(ranked) else 0.0
+            error = self.errors[key]
+            rows.append({
+                "key": key,
+                "count": count,
+                "error": error,
+                "guaranteed": count - error >= next_count,
+            })
+        return pd.DataFrame(rows, columns=["key", "count", "error", "guaranteed"])
+
+    def error_bound(self):
+        """Maximum overcount of any reported key"""
+        return self.total / self.capacity
+
+    @property
+    def relative_error(self):
+        """``error_bound`` as a fraction of the total weight"""
+        return 1 / self.capacity
+
+    def _floor(self):
+        """Upper bound on the weight of any key the sketch does not track"""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0.0
+
+    def merge(self, other):
+        """Combine with a sketch of another stream, keeping the heaviest ``capacity`` keys
+
+        A key tracked by only one side may have weighed up to the other side's
+        floor there, so that floor is added to its count and its error.
+        """
+        floor, other_floor = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for key in self.counts.keys() | other.counts.keys():
+            counts[key] = self.counts.get(key, floor) + other.counts.get(key, other_floor)
+            errors[key] = self.errors.get(key, floor) + other.errors.get(key, other_floor)
+        kept = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+        self.counts = {key: counts[key] for key in kept}
+        self.errors = {key: errors[key] for key in kept}
+        self.total += other.total
+        return self
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2**precision registers"""
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values):
+        values = np.asarray(values)
+        if len(values) == 0:
+            return
+        hashes = hash_values(values)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        # Sentinel bit keeps the rank finite when the remaining bits are all zero
+        rest = ((hashes << np.uint64(self.precision)) & _MASK64) | np.uint64(1 << (self.precision - 1))
+        rank = _leading_zeros(rest) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def count(self):
+        """Estimated number of distinct values"""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)
+        return float(raw)
+
+    @property
+    def relative_error(self):
+        """Standard error of the estimate"""
+        return 1.04 / np.sqrt(self.m)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Can only merge HyperLogLogs with the same precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+
+def _leading_zeros(x):
+    """Vectorized count of leading zero bits in uint64 values"""
+    x = x.copy()
+    zeros = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = x < np.uint64(1 << (64 - shift))
+        zeros += shift * empty
+        x = np.where(empty, x << np.uint64(shift), x)
+    zeros += x == 0
+    return zeros
+
+
+class TDigest:
+    """Merging t-digest for quantiles and histograms of a numeric stream"""
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def total(self):
+        return float(self.weights.sum())
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(values)
+        values = values[keep]
+        if len(values) == 0:
+            return
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)[keep]
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, weights]))
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        # k1 scale function: small clusters at the tails, larger in the middle
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        cluster = np.floor(k - k.min()).astype(np.intp)
+        cluster_weights = np.bincount(cluster, weights=weights)
+        occupied = cluster_weights > 0
+        self.means = (np.bincount(cluster, weights=means * weights)[occupied] / cluster_weights[occupied])
+        self.weights = cluster_weights[occupied]
+
+    def _points(self):
+        cumulative = np.cumsum(self.weights) - self.weights / 2
+        x = np.concatenate([[self.min], self.means, [self.max]])
+        rank = np.concatenate([[0.0], cumulative, [self.total]])
+        return x, rank
+
+    def quantile(self, q):
+        """Approximate value at quantile(s) ``q`` in [0, 1]"""
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        x, rank = self._points()
+        return np.interp(np.asarray(q) * self.total, rank, x)
+
+    def cdf(self, values):
+        """Approximate fraction of the stream at or below ``values``"""
+        if not len(self.means):
+            return np.zeros(np.shape(values))
+        x, rank = self._points()
+        return np.interp(values, x, rank) / self.total
+
+    def histogram(self, bins=30, value_range=None):
+        """Approximate histogram counts and bin edges"""
+        low, high = value_range or (self.min, self.max)
+        edges = np.linspace(low, high, bins + 1)
+        return np.diff(self.cdf(edges)) * self.total, edges
+
+    def rank_error(self):
+        """Upper bound on the quantile (rank) error as a fraction of the stream"""
+        return float(self.weights.max() / self.total) if len(self.weights) else 0.0
+
+    def merge(self, other):
+        if len(other.means):
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        return self
+
+
+def merged_digest(digests, min_key=0, compression=100):
+    """Merge the bucketed digests whose key is at least ``min_key``"""
+    result = TDigest(compression)
+    for key, digest in digests.items():
+        if key >= min_key:
+            result.merge(digest)
+    return result
+
+
+# Top-N answered by the heavy-hitter sketches, and their error as a fraction of the total
+TOP_N = 10
+TOP_N_RELATIVE_ERROR = 0.001
+
+# Dimensions whose sales and order counts are sketched
+SKETCH_DIMENSIONS = ("category", "department")
+
+
+def _top_sketch():
+    return SpaceSaving.for_top(TOP_N, TOP_N_RELATIVE_ERROR)
+
+
+@dataclass
+class SalesSketches:
+    """Heavy-hitter sketches of sales and order counts per dimension, and distinct counts"""
+    sales: dict = field(default_factory=dict)
+    orders: dict = field(default_factory=dict)
+    distinct: dict = field(default_factory=dict)
+    rows: int = 0
+
+    def update(self, chunk, dimensions=SKETCH_DIMENSIONS,
+               distinct_columns=("product_id", "order_id", "user_id", "brand")):
+        sales = np.nan_to_num(dollars(chunk["sale_price"].to_numpy(dtype=np.float64)))
+        ordered = chunk["id_order"].notna().to_numpy(dtype=np.float64)
+        for dimension in dimensions:
+            keep = chunk[dimension].notna().to_numpy()
+            keys = chunk[dimension].to_numpy()[keep]
+            self.sales.setdefault(dimension, _top_sketch()).update(keys, sales[keep])
+            self.orders.setdefault(dimension, _top_sketch()).update(keys, ordered[keep])
+        for column in distinct_columns:
+            if column in chunk:
+                self.distinct.setdefault(column, HyperLogLog()).update(chunk[column].values)
+        self.rows += len(chunk)
+
+    def summary(self, dimension):
+        """Approximate ``metrics.category_metrics`` / ``department_metrics`` columns per tracked value
+
+        Sales and order counts are the sketches' overestimates; the average
+        price is their ratio.
+        """
+        sales = pd.Series(self.sales[dimension].counts, dtype=np.float64)
+        orders = pd.Series(self.orders[dimension].counts, dtype=np.float64).reindex(sales.index, fill_value=0)
+        summary = pd.DataFrame({
+            "Total Sales": sales,
+            "Avg Price": sales / orders.where(orders > 0),
+            "Order Count": orders.round().astype(np.int64),
+        }).rename_axis(dimension).sort_values("Total Sales", ascending=False)
+        summary["Sales %"] = summary["Total Sales"] / self.sales[dimension].total * 100
+        return summary
+
+
+def build_sales_sketches(df, chunk_size=1_000_000):
+    """Stream line items through the sales sketches chunk by chunk"""
+    sketches = SalesSketches()
+    for start in range(0, len(df), chunk_size):
+        sketches.update(df.iloc[start:start + chunk_size])
+    return sketches
+
+
+def build_product_digests(product_stats, max_sales=20, compression=100):
+    """t-digests of return rate and profit margin bucketed by sales count
+
+    Products are bucketed by ``min(total_sales_count, max_sales)`` so the
+    "minimum sales" sliders can be answered by merging buckets.
+    """
+    buckets = product_stats["total_sales_count"].clip(upper=max_sales)
+    digests = {"return_rate": {}, "profit_margin": {}}
+    for key, group in product_stats.groupby(buckets):
+        for metric, by_bucket in digests.items():
+            digest = TDigest(compression)
+            digest.update(group[metric].values)
+            by_bucket[int(key)] = digest
+    return digests
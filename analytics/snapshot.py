@@ -0,0 +1,144 @@
+"""Cached data snapshot shared by all pages
+
+Functions decorated with ``st.cache_data`` / ``st.cache_resource`` in this
+module are shared across pages, so the source tables are fetched, joined and
+indexed once per process. The tables, fact frames and indexes are cached as
+resources, which hands every rerun the same object instead of a copy, and must
+be treated as read-only (with copy-on-write, derived frames are safe to modify).
+
+Each loader also goes through the persistent cache (see
+``analytics.persistent``), keyed by the data version and the code version, so
+after a restart the snapshot and everything derived from it are read from
+disk instead of being fetched and rebuilt. The source tables and the data
+version are keyed by the source fingerprint, when the source can provide one
+without fetching the tables.
+"""
+import streamlit as st
+
+from analytics.catalog import build_catalog
+from analytics.cohorts import CohortMatrix
+from analytics.facts import build_line_item_index, build_line_items, build_order_index, build_orders
+from analytics.fulfillment import LatencyHistograms
+from analytics.materialized import MaterializedStore, data_version, result_key
+from analytics.memory import shared_cache
+from analytics.persistent import persistent_cache, source_version
+from analytics.metrics import product_stats
+from analytics.sketches import build_product_digests, build_sales_sketches
+from analytics.sources import TABLES, load_tables, source_fingerprint
+from analytics.timeseries import DailyCube
+from analytics.velocity import ProductDailySales
+
+
+def _persisted(name, build):
+    """``build()`` read from the persistent cache when it was stored for the same data and code"""
+    return persistent_cache().get_or_compute(name, load_data_version(), build)
+
+
+@st.cache_data
+def load_source_fingerprint():
+    """Fingerprint of the source tables, or None if the source needs a fetch to tell"""
+    return source_fingerprint(TABLES)
+
+
+@st.cache_resource(show_spinner="Loading data...")
+def load_snapshot_tables():
+    """Load the source tables as a dict of DataFrames"""
+    fingerprint = load_source_fingerprint()
+    if fingerprint is None:
+        return load_tables(TABLES)
+    return persistent_cache().get_or_compute('snapshot_tables', fingerprint, lambda: load_tables(TABLES))
+
+
+@st.cache_data
+def load_catalog():
+    """Date ranges of the snapshot"""
+    return _persisted('catalog', lambda: build_catalog(load_snapshot_tables()))
+
+
+@st.cache_resource
+def load_line_items():
+    """Order items joined with products and order gender, sorted by date"""
+    return _persisted('line_items', lambda: build_line_items(load_snapshot_tables()))
+
+
+@st.cache_resource
+def load_orders():
+    """Orders joined with customer country and traffic source, sorted by date"""
+    return _persisted('orders', lambda: build_orders(load_snapshot_tables()))
+
+
+@st.cache_resource
+def load_line_item_index():
+    """Bitmap indexes over the line items"""
+    return _persisted('line_item_index', lambda: build_line_item_index(load_line_items()))
+
+
+@st.cache_resource
+def load_order_index():
+    """Bitmap indexes over the orders"""
+    return _persisted('order_index', lambda: build_order_index(load_orders()))
+
+
+@st.cache_resource
+def load_daily_cube():
+    """Prefix sums of daily line-item sales and counts per category/department/status/gender"""
+    return _persisted('daily_cube', lambda: DailyCube(load_line_items()))
+
+
+@st.cache_resource
+def load_cohorts():
+    """Active customers per country/traffic source, first-order month and month offset"""
+    return _persisted('cohorts', lambda: CohortMatrix(load_orders()))
+
+
+@st.cache_resource
+def load_latency_histograms():
+    """Ship, delivery and return latency histograms per month/country/status"""
+    return _persisted('latency_histograms', lambda: LatencyHistograms(load_orders()))
+
+
+@st.cache_resource
+def load_product_daily_sales():
+    """Sparse product x day item counts over all line items"""
+    return _persisted('product_daily_sales', lambda: ProductDailySales(load_line_items()))
+
+
+@st.cache_data
+def load_sales_sketches():
+    """Heavy-hitter and distinct-count sketches over all line items"""
+    return _persisted('sales_sketches', lambda: build_sales_sketches(load_line_items()))
+
+
+@st.cache_data
+def load_product_digests():
+    """t-digests of all-time product return rates and profit margins"""
+    return _persisted('product_digests', lambda: build_product_digests(product_stats(load_line_items())))
+
+
+@st.cache_data
+def load_data_version():
+    """Hash of the source tables, keying precomputed results"""
+    fingerprint = load_source_fingerprint()
+    if fingerprint is None:
+        return data_version(load_snapshot_tables())
+    return persistent_cache().get_or_compute(
+        'data_version', fingerprint, lambda: data_version(load_snapshot_tables()))
+
+
+@st.cache_resource
+def load_materialized_store():
+    """Precomputed report results for the current data version"""
+    return MaterializedStore(load_data_version())
+
+
+def load_live_result(report, compute, **params):
+    """A report computed on the page, shared by all sessions until evicted from the live results cache
+
+    Results missing from memory are read from the persistent cache before
+    being computed, so they survive restarts.
+    """
+    version = load_data_version()
+    # Page scripts are reloaded when edited, so their version is part of the key
+    key = (report, version, source_version(compute), result_key(params))
+    return shared_cache('live_results').get_or_compute(
+        key, lambda: persistent_cache().get_or_compute(report, version, compute, **params))
@@ -0,0 +1,405 @@
+"""Pluggable data sources for the dashboard tables
+
+A source fetches a named table (``orders``, ``users``, ``order_items``,
+``products``) as a DataFrame. Fetches are coroutines so several tables can be
+loaded concurrently with ``load_tables``; blocking I/O runs on worker threads
+and network sources reuse pooled connections, retry transient failures and
+keep an on-disk copy of what they downloaded.
+
+The source is picked from the ``DATA_SOURCE_URL`` environment variable:
+
+- a directory path (default ``sample_data``) reads ``<table>.csv`` files
+- ``http://`` / ``https://`` reads ``<url>/<table>.csv`` objects, e.g. from a
+  MinIO/S3-compatible bucket with path-style URLs or any static file server
+- ``sqlite:///path/to/file.db`` runs ``SELECT * FROM <table>``
+"""
+import asyncio
+import hashlib
+import http.client
+import io
+import logging
+import os
+import queue
+import sqlite3
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from analytics.schema import apply_schema
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE_URL = "sample_data"
+DEFAULT_CACHE_DIR = ".cache/sources"
+
+TABLES = ["orders", "users", "order_items", "products"]
+
+# Messages of driver OperationalErrors that go away on their own (a locked or
+# busy database, a dropped or refused connection); others, such as a missing
+# table or a syntax error, fail the same way on every attempt
+TRANSIENT_SQL_ERRORS = ("locked", "busy", "timeout", "timed out", "connection", "could not connect",
+                        "server closed", "disk i/o error")
+
+
+class SourceError(Exception):
+    """A table could not be fetched and retrying will not help"""
+
+
+class TransientSourceError(OSError):
+    """A fetch failed in a way that is worth retrying"""
+
+
+async def _with_retries(fetch, retries, backoff, retry_on):
+    """Await ``fetch()`` and retry with exponential backoff on ``retry_on``"""
+    for attempt in range(retries + 1):
+        try:
+            return await fetch()
+        except retry_on as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            logger.warning("Fetch failed (%s), retrying in %.1fs", e, delay)
+            await asyncio.sleep(delay)
+
+
+class DataSource:
+    """Base class for sources that fetch tables as DataFrames"""
+
+    pool_size = 8
+    _limit_loop = None
+
+    def _limit(self):
+        """Semaphore bounding concurrent fetches on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._limit_loop is not loop:
+            self._limit_loop = loop
+            self._semaphore = asyncio.Semaphore(self.pool_size)
+        return self._semaphore
+
+    async def fetch(self, table):
+        raise NotImplementedError
+
+    async def probe(self, table):
+        """Check that ``table`` can be fetched without fetching it; its size in bytes when known"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def fingerprint(self, tables):
+        """Cheap identifier of the current contents of ``tables``, or ``None`` if unknown without fetching"""
+        return None
+
+    def describe(self):
+        return type(self).__name__
+
+
+class LocalFileSource(DataSource):
+    """Read ``<root>/<table>.csv`` files"""
+
+    def __init__(self, root=DEFAULT_SOURCE_URL):
+        self.root = Path(root)
+
+    async def fetch(self, table):
+        return await asyncio.to_thread(pd.read_csv, self.root / f"{table}.csv")
+
+    async def probe(self, table):
+        try:
+            return (await asyncio.to_thread(os.stat, self.root / f"{table}.csv")).st_size
+        except FileNotFoundError as e:
+            raise SourceError(f"{table}: {e}") from e
+
+    def fingerprint(self, tables):
+        """Hash of the files' paths, sizes and modification times"""
+        digest = hashlib.sha1()
+        for table in tables:
+            path = (self.root / f"{table}.csv").resolve()
+            stat = path.stat()
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()[:16]
+
+    def describe(self):
+        return f"Local files ({self.root}/)"
+
+
+class _ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP connections to one host"""
+
+    def __init__(self, scheme, host, port, size, timeout):
+        self._factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._factory(self._host, self._port, timeout=self._timeout)
+
+    def release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+class ObjectStoreSource(DataSource):
+    """Read ``<base_url>/<table>.csv`` over HTTP(S)
+
+    Works against S3-compatible stores (MinIO, S3 with path-style URLs) for
+    public or pre-authorised buckets, and plain HTTP file servers. Downloads
+    are cached on disk and revalidated with ETags; if the store is unreachable
+    after all retries, the cached copy is served instead.
+    """
+
+    def __init__(self, base_url, pool_size=8, retries=3, backoff=0.5, timeout=30,
+                 cache_dir=DEFAULT_CACHE_DIR, headers=None):
+        parts = urlsplit(base_url.rstrip("/"))
+        self.base_url = base_url.rstrip("/")
+        self._path = parts.path
+        self._pool = _ConnectionPool(parts.scheme, parts.hostname, parts.port, pool_size, timeout)
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.headers = dict(headers or {})
+
+    def _cache_paths(self, table):
+        key = hashlib.sha1(f"{self.base_url}/{table}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.csv", self.cache_dir / f"{key}.etag"
+
+    def _get(self, table):
+        """Blocking GET of one object, returning the CSV bytes"""
+        headers = dict(self.headers)
+        cached = None
+        if self.cache_dir:
+            cached, etag_path = self._cache_paths(table)
+            if cached.exists() and etag_path.exists():
+                headers["If-None-Match"] = etag_path.read_text()
+
+        conn = self._pool.acquire()
+        try:
+            conn.request("GET", f"{self._path}/{table}.csv", headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise TransientSourceError(f"{table}: {e}") from e
+        self._pool.release(conn)
+
+        if response.status == 304:
+            return cached.read_bytes()
+        if response.status == 429 or response.status >= 500:
+            raise TransientSourceError(f"{table}: HTTP {response.status}")
+        if response.status != 200:
+            raise SourceError(f"{table}: HTTP {response.status} from {self.base_url}")
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            cached.write_bytes(body)
+            etag = response.getheader("ETag")
+            if etag:
+                etag_path.write_text(etag)
+            else:
+                etag_path.unlink(missing_ok=True)
+        return body
+
+    def _head(self, table):
+        """Blocking HEAD of one object, returning its Content-Length"""
+        conn = self._pool.acquire()
+        try:
+            conn.request("HEAD", f"{self._path}/{table}.csv", headers=self.headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise TransientSourceError(f"{table}: {e}") from e
+        self._pool.release(conn)
+
+        if response.status == 429 or response.status >= 500:
+            raise TransientSourceError(f"{table}: HTTP {response.status}")
+        if response.status != 200:
+            raise SourceError(f"{table}: HTTP {response.status} from {self.base_url}")
+        length = response.getheader("Content-Length")
+        return int(length) if length else None
+
+    async def fetch(self, table):
+        async with self._limit():
+            try:
+                body = await _with_retries(
+                    lambda: asyncio.to_thread(self._get, table), self.retries, self.backoff, TransientSourceError
+                )
+            except TransientSourceError:
+                if not self.cache_dir or not self._cache_paths(table)[0].exists():
+                    raise
+                logger.warning("%s unreachable, serving cached copy of %s", self.base_url, table)
+                body = self._cache_paths(table)[0].read_bytes()
+        return await asyncio.to_thread(pd.read_csv, io.BytesIO(body))
+
+    async def probe(self, table):
+        async with self._limit():
+            return await asyncio.to_thread(self._head, table)
+
+    def close(self):
+        self._pool.close()
+
+    def describe(self):
+        return f"Object store ({self.base_url})"
+
+
+def _is_transient_sql_error(error, conn):
+    """Whether a query error on ``conn`` is worth retrying"""
+    # pandas wraps driver errors, so look at the cause as well
+    cause = error.__cause__ or error
+    if not isinstance(cause, getattr(conn, "OperationalError", OSError)):
+        return False
+    message = str(cause).lower()
+    return any(pattern in message for pattern in TRANSIENT_SQL_ERRORS)
+
+
+class SQLSource(DataSource):
+    """Run ``SELECT * FROM <table>`` through a DB-API 2.0 connection pool
+
+    ``connect`` is a zero-argument callable returning a new connection. The
+    connections are used from worker threads, so drivers with thread checks
+    must allow that (e.g. ``sqlite3.connect(path, check_same_thread=False)``).
+    Results are cached on disk for ``cache_ttl`` seconds when set.
+    """
+
+    def __init__(self, connect, pool_size=4, retries=3, backoff=0.5, query="SELECT * FROM {table}",
+                 cache_dir=DEFAULT_CACHE_DIR, cache_ttl=None, name="SQL"):
+        self._connect = connect
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.query = query
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_ttl = cache_ttl
+        self.name = name
+
+    def _cache_path(self, table):
+        key = hashlib.sha1(f"{self.name}/{self.query.format(table=table)}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.parquet"
+
+    def _read(self, table, probe=False):
+        """Blocking query on a pooled connection; ``probe`` only checks that it runs, reading no rows"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        query = self.query.format(table=table)
+        if probe:
+            query = f"SELECT * FROM ({query}) AS probe LIMIT 0"
+        try:
+            df = pd.read_sql_query(query, conn)
+        except Exception as e:
+            if _is_transient_sql_error(e, conn):
+                conn.close()
+                raise TransientSourceError(f"{table}: {e}") from e
+            self._release(conn)
+            raise SourceError(f"{table}: {e}") from e
+        self._release(conn)
+        return df
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    async def fetch(self, table):
+        if self.cache_dir and self.cache_ttl:
+            path = self._cache_path(table)
+            if path.exists() and time.time() - path.stat().st_mtime < self.cache_ttl:
+                return await asyncio.to_thread(pd.read_parquet, path)
+
+        async with self._limit():
+            df = await _with_retries(
+                lambda: asyncio.to_thread(self._read, table), self.retries, self.backoff, TransientSourceError
+            )
+
+        if self.cache_dir and self.cache_ttl:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(df.to_parquet, self._cache_path(table))
+        return df
+
+    async def probe(self, table):
+        async with self._limit():
+            await asyncio.to_thread(self._read, table, True)
+        return None
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+    def describe(self):
+        return f"SQL ({self.name})"
+
+
+def source_from_url(url=None):
+    """Create a data source from a URL, defaulting to ``DATA_SOURCE_URL``"""
+    url = url or os.environ.get("DATA_SOURCE_URL", DEFAULT_SOURCE_URL)
+    cache_dir = os.environ.get("DATA_CACHE_DIR", DEFAULT_CACHE_DIR)
+    scheme = urlsplit(url).scheme
+    if scheme in ("http", "https"):
+        return ObjectStoreSource(url, cache_dir=cache_dir)
+    if scheme == "sqlite":
+        path = url[len("sqlite:///"):]
+        return SQLSource(lambda: sqlite3.connect(path, check_same_thread=False), cache_dir=cache_dir, name=path)
+    return LocalFileSource(url)
+
+
+async def fetch_tables(source, tables):
+    """Fetch several tables concurrently"""
+    frames = await asyncio.gather(*(source.fetch(table) for table in tables))
+    return dict(zip(tables, frames))
+
+
+async def _probe_all(source, tables):
+    return await asyncio.gather(*(source.probe(table) for table in tables), return_exceptions=True)
+
+
+def probe_tables(tables, source=None):
+    """Probe ``tables`` concurrently: each table's size in bytes (``None`` if unknown) or the error raised"""
+    owned = source is None
+    source = source or source_from_url()
+    try:
+        return dict(zip(tables, asyncio.run(_probe_all(source, tables))))
+    finally:
+        if owned:
+            source.close()
+
+
+def source_fingerprint(tables, source=None):
+    """Fingerprint of ``tables`` in ``source`` (or the configured one), ``None`` if it needs a fetch"""
+    owned = source is None
+    source = source or source_from_url()
+    try:
+        return source.fingerprint(tables)
+    finally:
+        if owned:
+            source.close()
+
+
+def load_tables(tables, source=None):
+    """Load ``tables`` from ``source`` (or the configured one) with overlapping I/O
+
+    The tables come back with the compact column types of ``analytics.schema``
+    (money in integer cents, narrow integer ids and counts).
+    """
+    owned = source is None
+    source = source or source_from_url()
+    try:
+        return apply_schema(asyncio.run(fetch_tables(source, tables)))
+    finally:
+        if owned:
+            source.close()
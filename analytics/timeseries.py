@@ -0,0 +1,129 @@
+"""Daily pre-aggregated measures with prefix sums for time-window queries
+
+A ``DailyCube`` holds, for every day and every combination of the indexed
+dimensions (e.g. category x department x status x gender), the running total
+of each measure since the first day. The total over any window is then the
+difference of two rows, so period totals, prior-period comparisons, rolling
+sums and cumulative series never rescan the line items. Money measures are
+summed in integer cents, so the prefix sums and their differences are exact,
+and converted to dollars on output.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from analytics.schema import CENTS, MONEY_COLUMNS
+
+CUBE_DIMENSIONS = ['category', 'department', 'status', 'gender']
+CUBE_MEASURES = {'sales': ('sale_price', 'sum'), 'items': ('id_order', 'count')}
+
+
+def previous_period(start_date, end_date):
+    """The window of the same length ending the day before ``start_date``"""
+    length = end_date - start_date + timedelta(days=1)
+    return start_date - length, start_date - timedelta(days=1)
+
+
+class DailyCube:
+    """Prefix sums of daily measures per dimension combination"""
+
+    def __init__(self, df, dimensions=CUBE_DIMENSIONS, measures=CUBE_MEASURES, date_column='date'):
+        days = df[date_column].values.astype('datetime64[D]')
+        self.first_day = days.min()
+        self.days = np.arange(self.first_day, days.max() + np.timedelta64(1, 'D'))
+
+        # One column per distinct combination of the dimensions
+        grouped = df.groupby(dimensions, sort=True, dropna=False, observed=True)
+        group_ids = grouped.ngroup().to_numpy()
+        self.groups = grouped.size().index.to_frame(index=False)
+        n_days, n_groups = len(self.days), len(self.groups)
+        cells = (days - self.first_day).astype(np.int64) * n_groups + group_ids
+
+        self.prefix = {}
+        self.divisor = {}
+        for name, (column, func) in measures.items():
+            self.divisor[name] = CENTS if column in MONEY_COLUMNS else 1
+            values = df[column]
+            if func == 'sum':
+                daily = np.bincount(cells, weights=values.fillna(0).to_numpy(dtype=float), minlength=n_days * n_groups)
+            elif func == 'count':
+                daily = np.bincount(cells[values.notna().to_numpy()], minlength=n_days * n_groups).astype(float)
+            else:
+                raise ValueError(f"Unsupported measure function '{func}'")
+            prefix = np.zeros((n_days + 1, n_groups))
+            np.cumsum(daily.reshape(n_days, n_groups), axis=0, out=prefix[1:])
+            self.prefix[name] = prefix
+
+    def _row(self, day, end=False):
+        """Prefix row for the start (or just past the end) of ``day``, clipped to the data"""
+        position = int((np.datetime64(day, 'D') - self.first_day).astype(np.int64)) + (1 if end else 0)
+        return min(max(position, 0), len(self.days))
+
+    def _bounds(self, start_date, end_date):
+        lo = 0 if start_date is None else self._row(start_date)
+        hi = len(self.days) if end_date is None else self._row(end_date, end=True)
+        return lo, max(hi, lo)
+
+    def _columns(self, filters, by):
+        """Group columns matching ``filters``, and their ``by`` labels"""
+        mask = np.ones(len(self.groups), dtype=bool)
+        for dimension, accepted in (filters or {}).items():
+            accepted = accepted if isinstance(accepted, (list, tuple, set)) else [accepted]
+            mask &= self.groups[dimension].isin(accepted).to_numpy()
+        labels = self.groups.loc[mask, by] if by else None
+        return np.flatnonzero(mask), labels
+
+    def _collapse(self, rows, columns, labels):
+        """Sum the selected group columns of 2-D ``rows``, per ``by`` label when given"""
+        selected = rows[:, columns]
+        if labels is None:
+            return selected.sum(axis=1)
+        return pd.DataFrame(selected.T, index=labels.to_numpy()).groupby(level=0, sort=True).sum().T
+
+    def totals(self, start_date=None, end_date=None, filters=None, by=None):
+        """Measure totals over [start_date, end_date] (a Series, or a DataFrame per ``by`` value)"""
+        lo, hi = self._bounds(start_date, end_date)
+        columns, labels = self._columns(filters, by)
+        totals = {}
+        for name, prefix in self.prefix.items():
+            collapsed = self._collapse((prefix[hi] - prefix[lo])[np.newaxis], columns, labels) / self.divisor[name]
+            totals[name] = collapsed[0] if labels is None else collapsed.iloc[0]
+        if by is None:
+            return pd.Series(totals)
+        return pd.DataFrame(totals).rename_axis(by)
+
+    def covers(self, start_date):
+        """Whether the data reaches back to ``start_date``"""
+        return np.datetime64(start_date, 'D') >= self.first_day
+
+    def series(self, measure, start_date=None, end_date=None, filters=None, by=None, window=1, cumulative=False):
+        """Daily values of a measure over [start_date, end_date]
+
+        ``window`` > 1 gives trailing rolling sums (reaching back before
+        ``start_date`` where data exists); ``cumulative`` gives running totals
+        from ``start_date``. Returns a DataFrame indexed by date with one
+        column per ``by`` value, or a single ``measure`` column.
+        """
+        lo, hi = self._bounds(start_date, end_date)
+        prefix = self.prefix[measure]
+        ends = np.arange(lo + 1, hi + 1)
+        if cumulative:
+            starts = np.full(len(ends), lo)
+        else:
+            starts = np.maximum(ends - window, 0)
+        columns, labels = self._columns(filters, by)
+        values = self._collapse(prefix[ends] - prefix[starts], columns, labels) / self.divisor[measure]
+        index = pd.DatetimeIndex(self.days[lo:hi], name='date')
+        if labels is None:
+            return pd.DataFrame({measure: values}, index=index)
+        values.index = index
+        values.columns.name = by
+        return values
+
+
+def percent_change(current, previous):
+    """Relative change formatted for ``st.metric`` deltas, or ``None`` without a base"""
+    if not previous:
+        return None
+    return f"{(current / previous - 1) * 100:+.1f}%"
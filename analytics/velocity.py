@@ -0,0 +1,125 @@
+"""Product x day sales counts for trend, streak and velocity detection
+
+``ProductDailySales`` holds how many items of each product sold on each day
+as a sparse matrix in compressed-row form: per product, the sorted day
+offsets with sales and the count on each of them. Only days with sales are
+stored, so the size grows with the number of (product, day) pairs that
+occurred, never with products x days (500k SKUs over three years would be
+over 500 million dense cells). Offsets and counts use the smallest unsigned
+integer type that holds them.
+
+Any date window is answered from the matrix with ``bincount`` over the stored
+entries (sales, velocity, least-squares trend, first vs second half of the
+window, zero-sale streaks), without grouping the line items again.
+"""
+import numpy as np
+import pandas as pd
+
+PRODUCT_COLUMNS = ['product_id', 'name', 'category', 'brand', 'department']
+
+
+class ProductDailySales:
+    """Sparse daily item counts per product"""
+
+    def __init__(self, line_items, product_columns=PRODUCT_COLUMNS, date_column='date'):
+        sold = line_items[line_items['id_order'].notna() & line_items['product_id'].notna()]
+        self.products = (sold[product_columns].drop_duplicates('product_id')
+                         .sort_values('product_id', ignore_index=True))
+        product_ids = self.products['product_id'].to_numpy()
+
+        days = sold[date_column].to_numpy().astype('datetime64[D]')
+        self.first_day = days.min() if len(days) else np.datetime64('NaT', 'D')
+        self.n_days = int((days.max() - self.first_day).astype(np.int64)) + 1 if len(days) else 0
+
+        # Distinct (product, day) cells in row-major order, with their item counts
+        rows = np.searchsorted(product_ids, sold['product_id'].to_numpy())
+        offsets = (days - self.first_day).astype(np.int64)
+        cells, counts = np.unique(rows * max(self.n_days, 1) + offsets, return_counts=True)
+        cell_rows, cell_days = np.divmod(cells, max(self.n_days, 1))
+
+        self.indptr = np.searchsorted(cell_rows, np.arange(len(product_ids) + 1))
+        self.days = cell_days.astype(np.min_scalar_type(max(self.n_days - 1, 0)))
+        self.counts = counts.astype(np.min_scalar_type(counts.max() if len(counts) else 0))
+
+    @property
+    def nbytes(self):
+        """Bytes held by the sparse matrix (the product attributes are shared with the line items)"""
+        return self.indptr.nbytes + self.days.nbytes + self.counts.nbytes
+
+    def _window(self, start_date, end_date):
+        """Day offsets of [start_date, end_date], clipped to the data"""
+        start = 0 if start_date is None else int((np.datetime64(start_date, 'D') - self.first_day).astype(np.int64))
+        end = self.n_days - 1 if end_date is None else int(
+            (np.datetime64(end_date, 'D') - self.first_day).astype(np.int64))
+        return max(start, 0), min(end, self.n_days - 1)
+
+    def _entries(self, start, end):
+        """Rows, window-relative days and counts of the stored entries within [start, end]"""
+        rows = np.repeat(np.arange(len(self.products)), np.diff(self.indptr))
+        inside = (self.days >= start) & (self.days <= end)
+        return rows[inside], self.days[inside].astype(np.int64) - start, self.counts[inside].astype(np.float64)
+
+    def window_stats(self, start_date=None, end_date=None):
+        """Sales, velocity, trend and zero-sale streaks of every product over [start_date, end_date]
+
+        - ``sales``: items sold in the window; ``velocity``: items per day
+        - ``trend``: least-squares slope of the daily counts, in items per day per 30 days
+        - ``early_sales`` / ``late_sales``: items sold in the first and last half of
+          the window, and ``change_pct`` between them (NaN without early sales)
+        - ``longest_gap``: longest run of days without sales inside the window
+        - ``days_since_sale``: days from the last sale up to the window end (NaN if
+          the product never sold by then)
+        """
+        n = len(self.products)
+        start, end = self._window(start_date, end_date)
+        length = max(end - start + 1, 0)
+        rows, days, counts = self._entries(start, end)
+
+        sales = np.bincount(rows, counts, minlength=n)
+        center = (length - 1) / 2
+        spread = length * (length ** 2 - 1) / 12
+        slope = np.bincount(rows, (days - center) * counts, minlength=n) / spread if spread else np.zeros(n)
+        half = length // 2
+        early = np.bincount(rows[days < half], counts[days < half], minlength=n)
+        late = np.bincount(rows[days >= length - half], counts[days >= length - half], minlength=n)
+
+        # Entries are sorted by product, then day: gaps are differences within a product
+        longest = np.full(n, length, dtype=np.int64)
+        if len(rows):
+            firsts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            lasts = np.r_[firsts[1:] - 1, len(rows) - 1]
+            longest[rows[firsts]] = np.maximum(days[firsts], length - 1 - days[lasts])
+            same = rows[1:] == rows[:-1]
+            np.maximum.at(longest, rows[1:][same], (days[1:] - days[:-1] - 1)[same])
+
+        # Last sale on or before the window end, looking back past the window start
+        # (days are sorted within a product, so it is the last of its entries up to ``end``)
+        up_to_end = np.r_[0, np.cumsum(self.days <= end)]
+        sold = up_to_end[self.indptr[1:]] - up_to_end[self.indptr[:-1]]
+        last_sale = np.where(sold > 0, self.days[np.maximum(self.indptr[:-1] + sold - 1, 0)].astype(np.int64), -1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats = pd.DataFrame({
+                'sales': sales.astype(np.int64),
+                'velocity': sales / length if length else np.zeros(n),
+                'trend': slope * 30,
+                'early_sales': early.astype(np.int64),
+                'late_sales': late.astype(np.int64),
+                'change_pct': np.where(early > 0, (late - early) / early * 100, np.nan),
+                'longest_gap': longest,
+                'days_since_sale': np.where(last_sale >= 0, end - last_sale, np.nan),
+            }, index=pd.Index(self.products['product_id'], name='product_id'))
+        return stats
+
+    def daily(self, product_ids, start_date=None, end_date=None):
+        """Dense daily item counts of a few products over the window, one column per product"""
+        start, end = self._window(start_date, end_date)
+        dates = pd.date_range(self.first_day + np.timedelta64(start, 'D'), periods=max(end - start + 1, 0),
+                              name='date')
+        positions = np.searchsorted(self.products['product_id'].to_numpy(), product_ids)
+        dense = np.zeros((len(dates), len(positions)), dtype=np.int64)
+        for column, row in enumerate(positions):
+            days = self.days[self.indptr[row]:self.indptr[row + 1]].astype(np.int64)
+            inside = (days >= start) & (days <= end)
+            dense[days[inside] - start, column] = self.counts[self.indptr[row]:self.indptr[row + 1]][inside]
+        return pd.DataFrame(dense, index=dates, columns=list(product_ids))
@@ -0,0 +1,114 @@
+"""Start the dashboard with the shared snapshot already loaded
+
+A plain ``streamlit run Home.py`` imports the chart libraries and loads the
+data snapshot lazily: the first session pays for loading and indexing the
+tables, and the first visit to each page pays for its imports and derived
+structures. This launcher does that work once, before the server starts
+accepting connections, and then runs Streamlit in the same process, so the
+``st.cache_resource`` entries filled here are the ones every session uses:
+
+    python -m analytics.warmup [streamlit run options, e.g. --server.port 8501]
+
+The server (and its ``/_stcore/health`` readiness endpoint) only comes up
+once the warm-up is done, so a pod reported ready serves its first session
+from memory. ``--no-warmup`` starts the server directly.
+"""
+import argparse
+import importlib
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from streamlit import config
+from streamlit.web import bootstrap, cli
+
+logger = logging.getLogger(__name__)
+
+APP_SCRIPT = Path(__file__).resolve().parent.parent / 'Home.py'
+
+# Modules the page scripts import on their first run
+WARM_IMPORTS = ['plotly.express', 'plotly.graph_objects', 'analytics.snapshot']
+
+# Cached loaders shared by the pages, in dependency order; the source tables
+# are only loaded if something has to be rebuilt (see ``analytics.persistent``)
+WARM_LOADERS = [
+    'load_data_version',
+    'load_line_items',
+    'load_orders',
+    'load_line_item_index',
+    'load_order_index',
+    'load_catalog',
+    'load_daily_cube',
+    'load_cohorts',
+    'load_latency_histograms',
+    'load_product_daily_sales',
+    'load_materialized_store',
+]
+
+
+@contextmanager
+def _quiet_streamlit_logs():
+    """Silence the "no runtime" warnings of caches used outside a session"""
+    loggers = [logging.getLogger(name) for name in list(logging.root.manager.loggerDict)
+               if name.startswith('streamlit')]
+    levels = [logger.level for logger in loggers]
+    direct_execution_warning = config.get_option('global.showWarningOnDirectExecution')
+    for logger in loggers:
+        logger.setLevel(logging.ERROR)
+    config.set_option('global.showWarningOnDirectExecution', False)
+    try:
+        yield
+    finally:
+        for logger, level in zip(loggers, levels):
+            logger.setLevel(level)
+        config.set_option('global.showWarningOnDirectExecution', direct_execution_warning)
+
+
+def warm_up(imports=WARM_IMPORTS, loaders=WARM_LOADERS):
+    """Import the page dependencies and fill the snapshot caches
+
+    Returns the seconds spent on each step, keyed by module or loader name.
+    """
+    timings = {}
+    with _quiet_streamlit_logs():
+        for module in imports:
+            started = time.perf_counter()
+            importlib.import_module(module)
+            timings[module] = time.perf_counter() - started
+
+        # The caches are process-wide: calling the loaders outside a session
+        # stores the results the sessions will hit
+        snapshot = importlib.import_module('analytics.snapshot')
+        for name in loaders:
+            started = time.perf_counter()
+            getattr(snapshot, name)()
+            timings[name] = time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the data caches, then run the dashboard")
+    parser.add_argument('--no-warmup', action='store_true', help="Start the server without preloading")
+    args, streamlit_args = parser.parse_known_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    run_args = [str(APP_SCRIPT), *streamlit_args]
+    if not args.no_warmup:
+        # Apply the config flags first, as ``streamlit run`` does, so the
+        # caches are set up with the configuration the server will use
+        flags = cli.main_run.make_context('run', list(run_args)).params
+        bootstrap.load_config_options({name: value for name, value in flags.items()
+                                       if name not in ('target', 'args')})
+        started = time.perf_counter()
+        timings = warm_up()
+        logger.info("Warmed up in %.1fs: %s", time.perf_counter() - started,
+                    ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+
+    sys.argv = ['streamlit', 'run', *run_args]
+    sys.exit(cli.main())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Helpers for sidebar filters whose options depend on other filters
+
+When the valid options of a widget change, Streamlit treats it as a new
+widget and falls back to its default. These helpers write the current
+selection of a keyed widget back to session state before it is created, so
+the new widget starts from it as long as it is still a valid option. The
+widgets must be created with ``key=`` and without ``index``/``default``:
+passing the remembered value as the default would itself change the widget
+on the next run and drop the user's next change.
+"""
+import streamlit as st
+
+
+def with_counts(counts, total=None, all_label="All"):
+    """format_func showing each option with its row count"""
+    def format_option(value):
+        if value == all_label and total is not None:
+            return f"{value} ({total:,})"
+        if value in counts:
+            return f"{value} ({counts[value]:,})"
+        return str(value)
+    return format_option
+
+
+def keep_valid_choice(key, options, default=0):
+    """Keep the keyed selectbox/radio ``key`` on its value while it is still an option"""
+    previous = st.session_state.get(key)
+    st.session_state[key] = previous if previous in options else options[default]
+
+
+def keep_valid_selection(key, options, default):
+    """Keep the keyed multiselect ``key`` on its selection, restricted to ``options``"""
+    previous = st.session_state.get(key, default)
+    st.session_state[key] = [value for value in previous if value in options]
+
+
+def keep_widget_state(defaults):
+    """Keep the values of keyed widgets that are not rendered on every run
+
+    Streamlit drops the state of a widget that is skipped in a run (e.g. in a
+    view that is not shown). Writing the values back each run keeps them, and
+    sets ``defaults`` for widgets that have not been used yet; such widgets
+    must be created without a ``value``/``index`` argument.
+    """
+    for key, default in defaults.items():
+        st.session_state[key] = st.session_state.get(key, default)
@@ -0,0 +1,12 @@
+"""The page scripts of the app, for the benchmarks and tests that run every page"""
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The debug page reads a missing file on purpose to demonstrate error handling
+SKIPPED_PAGES = ['pages/debug.py']
+
+PAGES = ['Home.py'] + [
+    path.relative_to(ROOT).as_posix() for path in sorted((ROOT / 'pages').glob('*.py'))
+    if path.relative_to(ROOT).as_posix() not in SKIPPED_PAGES
+]
@@ -0,0 +1,319 @@
+"""Concurrent dashboard sessions against local Streamlit servers
+
+Generates a synthetic dataset (``benchmarks/synthetic_data.py``), starts one
+or more servers on it through ``analytics.warmup``, and drives concurrent
+sessions over Streamlit's websocket protocol, the same messages a browser
+exchanges, so every session shares the server's caches as real users do.
+Each session lands on Home, then repeatedly either switches page or changes
+a random filter on the current page (period, category, status, countries,
+thresholds, ...), pausing ``--think`` seconds (±50%) between actions.
+
+    python benchmarks/load_test.py --orders 200000 --sessions 20 --duration 60 [--servers 2]
+
+Reports the rerun latency percentiles (p50/p95/p99) overall, per page and
+per action, the throughput, and the CPU and resident memory of each server
+process and of the load generator itself. Linux only (reads ``/proc``).
+Run from the repository root.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+from synthetic_data import generate_tables, write_tables
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WIDGET_TYPES = ('selectbox', 'multiselect', 'radio', 'slider', 'checkbox')
+SKIPPED_PAGES = ('debug',)
+NAVIGATE_PROBABILITY = 0.25
+FINISHED = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+
+class Session:
+    """One dashboard session: a websocket connection and the widget values the user set"""
+
+    def __init__(self, url, rng):
+        self.url = url
+        self.rng = rng
+        self.connection = None
+        self.pages = {}
+        self.page = ''
+        self.widgets = {}
+        self.states = {}
+
+    async def connect(self):
+        self.connection = await websocket_connect(
+            self.url, subprotocols=['streamlit'], max_message_size=1024 * 2**20
+        )
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    async def rerun(self):
+        """Run the current page with the widget values set so far; seconds and error messages"""
+        message = BackMsg()
+        message.rerun_script.page_script_hash = self.page
+        message.rerun_script.widget_states.widgets.extend(self.states.values())
+        started = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+
+        widgets, errors = {}, []
+        while True:
+            raw = await self.connection.read_message()
+            if raw is None:
+                raise ConnectionError("Server closed the connection")
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof('type')
+            if kind == 'navigation':
+                self.pages = {page.page_name: page.page_script_hash for page in forward.navigation.app_pages}
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type in WIDGET_TYPES and not getattr(element, element_type).disabled:
+                    widgets[getattr(element, element_type).id] = (element_type, getattr(element, element_type))
+                elif element_type == 'exception':
+                    errors.append(element.exception.message)
+            elif kind == 'script_finished':
+                if forward.script_finished not in FINISHED:
+                    errors.append(ForwardMsg.ScriptFinishedStatus.Name(forward.script_finished))
+                break
+        seconds = time.perf_counter() - started
+
+        # As in the browser, values of widgets that are gone are dropped
+        self.widgets = widgets
+        self.states = {widget_id: state for widget_id, state in self.states.items() if widget_id in widgets}
+        return seconds, errors
+
+    async def open_page(self, name):
+        self.page = self.pages.get(name, '')
+        self.states = {}
+        return await self.rerun()
+
+    def change_filter(self):
+        """Set a random widget of the current page to a random value; the widget label"""
+        widget_id = self.rng.choice(list(self.widgets))
+        widget_type, widget = self.widgets[widget_id]
+        state = WidgetState(id=widget_id)
+        if widget_type == 'selectbox' and widget.options:
+            state.string_value = self.rng.choice(widget.options)
+        elif widget_type == 'radio' and widget.options:
+            state.int_value = self.rng.randrange(len(widget.options))
+        elif widget_type == 'multiselect' and widget.options:
+            count = self.rng.randint(1, min(5, len(widget.options)))
+            state.string_array_value.data[:] = self.rng.sample(list(widget.options), count)
+        elif widget_type == 'slider' and widget.data_type in (widget.INT, widget.FLOAT):
+            steps = int((widget.max - widget.min) / widget.step) if widget.step else 0
+            values = sorted(widget.min + self.rng.randint(0, steps) * widget.step for _ in widget.default)
+            state.double_array_value.data[:] = values
+        elif widget_type == 'checkbox':
+            previous = self.states.get(widget_id)
+            state.bool_value = not (previous.bool_value if previous is not None else widget.default)
+        else:
+            return None
+        self.states[widget_id] = state
+        return widget.label
+
+
+async def run_session(url, seed, deadline, think, pages, samples, start_delay):
+    """Land on Home, then switch pages or change filters until ``deadline``"""
+    rng = random.Random(seed)
+    await asyncio.sleep(start_delay)
+    session = Session(url, rng)
+    try:
+        await session.connect()
+        seconds, errors = await session.rerun()
+        samples.append(('Home', 'open page', seconds, errors))
+        while time.monotonic() < deadline:
+            await asyncio.sleep(think * rng.uniform(0.5, 1.5))
+            current = next((name for name, page in session.pages.items() if page == session.page), 'Home')
+            if not session.widgets or rng.random() < NAVIGATE_PROBABILITY:
+                current = rng.choice([name for name in pages if name != current] or pages)
+                action = 'open page'
+                seconds, errors = await session.open_page(current)
+            else:
+                label = session.change_filter()
+                if label is None:
+                    continue
+                action = 'change filter'
+                seconds, errors = await session.rerun()
+            samples.append((current, action, seconds, errors))
+    except (OSError, ConnectionError) as e:
+        samples.append(('-', 'connection', 0.0, [str(e)]))
+    finally:
+        session.close()
+
+
+def process_usage(pid):
+    """Total CPU seconds and resident bytes of a process, from /proc"""
+    with open(f'/proc/{pid}/stat') as stat:
+        fields = stat.read().rsplit(')', 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    with open(f'/proc/{pid}/statm') as statm:
+        rss = int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    return cpu, rss
+
+
+async def monitor(pids, interval, usage):
+    """Sample CPU time and RSS of each process every ``interval`` seconds"""
+    while True:
+        now = time.monotonic()
+        for name, pid in pids.items():
+            try:
+                usage[name].append((now, *process_usage(pid)))
+            except OSError:
+                pass
+        await asyncio.sleep(interval)
+
+
+def start_servers(count, base_port, data_dir, store_dir, warm):
+    """Launch ``count`` servers on consecutive ports and wait until they report healthy"""
+    env = dict(os.environ, DATA_SOURCE_URL=str(data_dir), MATERIALIZED_DIR=str(store_dir))
+    servers = []
+    for port in range(base_port, base_port + count):
+        command = [sys.executable, '-m', 'analytics.warmup', '--server.port', str(port),
+                   '--server.headless', 'true', '--browser.gatherUsageStats', 'false',
+                   '--server.fileWatcherType', 'none']
+        if not warm:
+            command.insert(3, '--no-warmup')
+        with open(Path(data_dir) / f'server-{port}.log', 'w') as log:
+            servers.append((port, subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)))
+
+    for port, process in servers:
+        started = time.monotonic()
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server on port {port} exited, see {data_dir}/server-{port}.log")
+            try:
+                with urllib.request.urlopen(f'http://localhost:{port}/_stcore/health', timeout=1) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                pass
+            if time.monotonic() - started > 600:
+                raise TimeoutError(f"Server on port {port} did not become healthy")
+            time.sleep(0.5)
+        print(f"Server on port {port} ready in {time.monotonic() - started:.1f}s (pid {process.pid})")
+    return servers
+
+
+def percentiles(values):
+    if not values:
+        return "-"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return f"{len(values):6d} {p50:8.0f} {p95:8.0f} {p99:8.0f}"
+
+
+def report(samples, usage, elapsed):
+    latencies = [seconds for _, _, seconds, errors in samples if not errors]
+    errors = [(page, error) for page, _, _, page_errors in samples for error in page_errors]
+    print(f"\n{len(samples):,} reruns in {elapsed:.1f}s: {len(samples) / elapsed:.2f} reruns/s, "
+          f"{len(errors)} errors")
+
+    print(f"\n{'Latency (ms)':44s} {'count':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s}")
+    print(f"{'all':44s} {percentiles(latencies)}")
+    groups = defaultdict(list)
+    for page, action, seconds, page_errors in samples:
+        if not page_errors:
+            groups[f"{page} / {action}"].append(seconds)
+    for name in sorted(groups):
+        print(f"{name:44s} {percentiles(groups[name])}")
+
+    print(f"\n{'Process':44s} {'CPU avg':>8s} {'CPU max':>8s} {'RSS last':>9s} {'RSS peak':>9s}")
+    for name, points in usage.items():
+        if len(points) < 2:
+            continue
+        times, cpu, rss = (np.array(values) for values in zip(*points))
+        busy = np.diff(cpu) / np.diff(times) * 100
+        print(f"{name:44s} {(cpu[-1] - cpu[0]) / (times[-1] - times[0]) * 100:7.0f}% {busy.max():7.0f}% "
+              f"{rss[-1] / 2**20:6.0f} MiB {rss.max() / 2**20:6.0f} MiB")
+
+    for page, error in errors[:10]:
+        print(f"error on {page}: {error.splitlines()[0] if error else error}")
+
+
+async def load_test(urls, pids, args, pages):
+    samples, usage = [], defaultdict(list)
+    sampler = asyncio.ensure_future(monitor(pids, args.sample_interval, usage))
+    started = time.monotonic()
+    deadline = started + args.ramp + args.duration
+    await asyncio.gather(*(
+        run_session(urls[i % len(urls)], args.seed + i, deadline, args.think, pages, samples,
+                    args.ramp * i / max(1, args.sessions))
+        for i in range(args.sessions)
+    ))
+    sampler.cancel()
+    report(samples, usage, time.monotonic() - started)
+
+
+async def page_names(url):
+    """Pages of the app, from the navigation message of a first session"""
+    session = Session(url, random.Random())
+    await session.connect()
+    try:
+        await session.rerun()
+    finally:
+        session.close()
+    return list(session.pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10, help="Concurrent sessions")
+    parser.add_argument('--duration', type=float, default=60, help="Seconds of load after the ramp-up")
+    parser.add_argument('--ramp', type=float, default=5, help="Seconds over which sessions start")
+    parser.add_argument('--think', type=float, default=1.0, help="Mean pause between actions (seconds)")
+    parser.add_argument('--servers', type=int, default=1, help="Server processes to start")
+    parser.add_argument('--port', type=int, default=8700, help="Port of the first server")
+    parser.add_argument('--url', action='append', help="Use a running server (ws://host:port/_stcore/stream) "
+                                                       "instead of starting one; repeatable")
+    parser.add_argument('--orders', type=int, default=100_000, help="Synthetic orders to generate")
+    parser.add_argument('--data', help="Dataset directory (generated when missing)")
+    parser.add_argument('--no-warmup', action='store_true', help="Start servers without the warm-up")
+    parser.add_argument('--pages', nargs='*', help="Page names to visit (default: all but debug)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sample-interval', type=float, default=0.5, help="Seconds between CPU/RSS samples")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data or ROOT / '.cache' / 'synthetic' / f'{args.orders}-{args.seed}')
+    if not (data_dir / 'order_items.csv').exists():
+        started = time.perf_counter()
+        write_tables(generate_tables(args.orders, args.seed), data_dir)
+        print(f"Generated {args.orders:,} synthetic orders in {data_dir} ({time.perf_counter() - started:.1f}s)")
+
+    servers = []
+    try:
+        if args.url:
+            urls = args.url
+        else:
+            servers = start_servers(args.servers, args.port, data_dir, data_dir / 'materialized', not args.no_warmup)
+            urls = [f'ws://localhost:{port}/_stcore/stream' for port, _ in servers]
+        pids = {f'server :{port}': process.pid for port, process in servers}
+        pids['load generator'] = os.getpid()
+
+        pages = args.pages or [name for name in asyncio.run(page_names(urls[0])) if name not in SKIPPED_PAGES]
+        print(f"{args.sessions} sessions for {args.duration:.0f}s on {len(urls)} server(s), pages: {', '.join(pages)}")
+        asyncio.run(load_test(urls, pids, args, pages))
+    finally:
+        for _, process in servers:
+            process.terminate()
+        for _, process in servers:
+            process.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Import time and first-render time of each page in a fresh process
+
+Reports what a cold pod pays before serving: the modules each page's imports
+load in a fresh interpreter (``python -X importtime``, self time summed per
+top-level package), then the first render of every page in a new process,
+once as a plain ``streamlit run`` would do it and once after
+``analytics.warmup.warm_up`` has preloaded the imports and the snapshot.
+
+    python benchmarks/startup.py [--top 5] [PAGE ...]
+
+Run from the repository root.
+"""
+import argparse
+import ast
+import json
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from app_pages import PAGES, ROOT
+
+sys.path.insert(0, str(ROOT))
+
+
+def page_imports(page):
+    """The top-level import statements of a page script"""
+    tree = ast.parse((ROOT / page).read_text(encoding='utf-8'))
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_times(code):
+    """Seconds spent importing each top-level package when running ``code`` in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    packages = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us) / 1e6
+    return packages
+
+
+def first_renders(pages, warm):
+    """Warm-up and first-render seconds of ``pages`` in a fresh process"""
+    command = [sys.executable, str(Path(__file__).resolve()), '--render', *pages]
+    if warm:
+        command.append('--warm')
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def render(pages, warm):
+    """Body of the ``--render`` child process: prints the timings as JSON"""
+    started = time.perf_counter()
+    if warm:
+        from analytics.warmup import warm_up
+        warm_up()
+    timings = {'warm-up': time.perf_counter() - started}
+
+    from streamlit.testing.v1 import AppTest
+
+    for page in pages:
+        page_started = time.perf_counter()
+        app = AppTest.from_file(str(ROOT / page), default_timeout=300).run()
+        if app.exception:
+            raise RuntimeError(f"{page}: {app.exception[0].value}")
+        timings[page] = time.perf_counter() - page_started
+    timings['total'] = time.perf_counter() - started
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pages', nargs='*', default=PAGES)
+    parser.add_argument('--top', type=int, default=5, help="Packages to list per page")
+    parser.add_argument('--render', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--warm', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.render:
+        render(args.pages, args.warm)
+        return
+
+    print("Import time per page (fresh interpreter, self time per package)")
+    for page in args.pages:
+        packages = import_times(page_imports(page))
+        top = ", ".join(f"{name} {seconds * 1000:,.0f}" for name, seconds in packages.most_common(args.top))
+        print(f"{page:40s} {sum(packages.values()) * 1000:7,.0f} ms  ({top})")
+
+    cold = first_renders(args.pages, warm=False)
+    warm = first_renders(args.pages, warm=True)
+    print("\nFirst render per page (fresh process, pages visited in order)")
+    print(f"{'':40s} {'cold':>8s} {'warm':>8s}")
+    for step in ['warm-up', *args.pages, 'total']:
+        print(f"{step:40s} {cold[step]:7.2f}s {warm[step]:7.2f}s")
+
+
+if __name__ == '__main__':
+    main()
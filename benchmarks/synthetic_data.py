@@ -0,0 +1,183 @@
+"""Synthetic orders, users, order items and products at any scale
+
+Generates the four source tables with the columns of ``sample_data/`` and
+distributions close to it (order status mix, items per order, ship, delivery
+and return delays, category and price mix), so the pages can be loaded and
+benchmarked with far more rows than the sample:
+
+    python benchmarks/synthetic_data.py --orders 1000000 --out .cache/synthetic/1m
+    DATA_SOURCE_URL=.cache/synthetic/1m streamlit run Home.py
+
+The output is deterministic for a given ``--seed``.
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STATUSES = {'Shipped': 0.30, 'Complete': 0.25, 'Processing': 0.20, 'Cancelled': 0.15, 'Returned': 0.10}
+ITEMS_PER_ORDER = {1: 0.70, 2: 0.20, 3: 0.05, 4: 0.05}
+CATEGORIES = {
+    'Intimates': 1940, 'Jeans': 1703, 'Tops & Tees': 1613, 'Fashion Hoodies & Sweatshirts': 1569,
+    'Sleep & Lounge': 1534, 'Swim': 1530, 'Sweaters': 1503, 'Shorts': 1496, 'Accessories': 1311,
+    'Active': 1209, 'Outerwear & Coats': 1204, 'Underwear': 971, 'Pants': 922, 'Socks': 790,
+    'Dresses': 787, 'Maternity': 729, 'Suits & Sport Coats': 652, 'Plus': 613, 'Socks & Hosiery': 535,
+    'Pants & Capris': 497, 'Leggings': 481, 'Blazers & Jackets': 456, 'Skirts': 277, 'Suits': 163,
+    'Jumpsuits & Rompers': 128, 'Clothing Sets': 27,
+}
+COUNTRIES = {
+    'China': 0.34, 'United States': 0.22, 'Brasil': 0.15, 'South Korea': 0.05, 'France': 0.05,
+    'United Kingdom': 0.05, 'Germany': 0.04, 'Spain': 0.04, 'Japan': 0.02, 'Australia': 0.02,
+    'Belgium': 0.01, 'Poland': 0.005, 'Colombia': 0.003, 'Austria': 0.002,
+}
+TRAFFIC_SOURCES = {'Search': 0.70, 'Organic': 0.15, 'Facebook': 0.06, 'Email': 0.05, 'Display': 0.04}
+# Uniform delays between order steps, in hours
+SHIP_HOURS, DELIVERY_HOURS, RETURN_HOURS = 72, 120, 72
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _choice(rng, weights, size):
+    values = list(weights)
+    p = np.array(list(weights.values()), dtype=float)
+    return np.array(values, dtype=object)[rng.choice(len(values), size=size, p=p / p.sum())]
+
+
+def _timestamps(values):
+    """Format datetime64 values like the sample CSVs, leaving NaT empty"""
+    return pd.Series(values).dt.strftime(TIMESTAMP_FORMAT)
+
+
+def generate_products(rng, n_products):
+    categories = _choice(rng, CATEGORIES, n_products)
+    retail_price = np.round(np.clip(rng.lognormal(np.log(42), 0.75, n_products), 0.49, 999.0), 2)
+    ids = np.arange(1, n_products + 1)
+    return pd.DataFrame({
+        'id': ids,
+        'cost': retail_price * rng.uniform(0.33, 0.67, n_products),
+        'category': categories,
+        'name': [f"{category} Item {i}" for category, i in zip(categories, ids)],
+        'brand': [f"Brand {b:04d}" for b in rng.integers(1, max(2, n_products // 10), n_products)],
+        'retail_price': retail_price,
+        'department': rng.choice(['Women', 'Men'], n_products, p=[0.53, 0.47]),
+        'sku': [f"{v:032X}" for v in rng.integers(0, 2**63, n_products)],
+        'distribution_center_id': rng.integers(1, 11, n_products),
+    })
+
+
+def generate_users(rng, n_users, start):
+    genders = rng.choice(['M', 'F'], n_users)
+    signup = start - pd.to_timedelta(rng.integers(0, 3 * 365 * 24 * 3600, n_users), unit='s')
+    return pd.DataFrame({
+        'id': np.arange(1, n_users + 1),
+        'first_name': 'First',
+        'last_name': 'Last',
+        'email': [f"user{i}@example.com" for i in range(1, n_users + 1)],
+        'age': rng.integers(12, 71, n_users),
+        'gender': genders,
+        'state': 'State',
+        'street_address': 'Street',
+        'postal_code': '00000',
+        'city': 'City',
+        'country': _choice(rng, COUNTRIES, n_users),
+        'latitude': rng.uniform(-60, 70, n_users).round(6),
+        'longitude': rng.uniform(-180, 180, n_users).round(6),
+        'traffic_source': _choice(rng, TRAFFIC_SOURCES, n_users),
+        'created_at': _timestamps(signup.values),
+        'user_geom': '',
+    })
+
+
+def generate_orders(rng, n_orders, users, start, end):
+    user_rows = rng.integers(0, len(users), n_orders)
+    status = _choice(rng, STATUSES, n_orders)
+    span = int((end - start).total_seconds())
+    created = np.sort(start.to_datetime64() + rng.integers(0, span, n_orders).astype('timedelta64[s]'))
+
+    def after(base, hours, mask):
+        values = base + (rng.uniform(0, hours, n_orders) * 3600).astype('timedelta64[s]')
+        return np.where(mask, values, np.datetime64('NaT'))
+
+    shipped = after(created, SHIP_HOURS, np.isin(status, ['Shipped', 'Complete', 'Returned']))
+    delivered = after(shipped, DELIVERY_HOURS, np.isin(status, ['Complete', 'Returned']))
+    returned = after(delivered, RETURN_HOURS, status == 'Returned')
+    return pd.DataFrame({
+        'order_id': np.arange(1, n_orders + 1),
+        'user_id': users['id'].to_numpy()[user_rows],
+        'status': status,
+        'gender': users['gender'].to_numpy()[user_rows],
+        'created_at': created,
+        'returned_at': returned,
+        'shipped_at': shipped,
+        'delivered_at': delivered,
+        'num_of_item': _choice(rng, ITEMS_PER_ORDER, n_orders).astype(int),
+    })
+
+
+def generate_order_items(rng, orders, products):
+    rows = np.repeat(np.arange(len(orders)), orders['num_of_item'].to_numpy())
+    items = orders.iloc[rows].reset_index(drop=True)
+    # Product popularity is skewed: a small share of products sells most items
+    popularity = rng.pareto(1.5, len(products)) + 0.05
+    product_rows = rng.choice(len(products), size=len(items), p=popularity / popularity.sum())
+    return pd.DataFrame({
+        'id': np.arange(1, len(items) + 1),
+        'order_id': items['order_id'],
+        'user_id': items['user_id'],
+        'product_id': products['id'].to_numpy()[product_rows],
+        'inventory_item_id': np.arange(1, len(items) + 1),
+        'status': items['status'],
+        'created_at': items['created_at'],
+        'shipped_at': items['shipped_at'],
+        'delivered_at': items['delivered_at'],
+        'returned_at': items['returned_at'],
+        'sale_price': products['retail_price'].to_numpy()[product_rows],
+    })
+
+
+def generate_tables(n_orders, seed=0, start='2025-01-01', end='2025-07-15', n_products=None):
+    """The four source tables as DataFrames, with timestamps formatted like the CSVs"""
+    rng = np.random.default_rng(seed)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    products = generate_products(rng, n_products or max(1_000, min(n_orders * 2 // 3, 200_000)))
+    users = generate_users(rng, max(1, int(n_orders / 1.3)), start)
+    orders = generate_orders(rng, n_orders, users, start, end)
+    order_items = generate_order_items(rng, orders, products)
+    users = users[users['id'].isin(orders['user_id'])].reset_index(drop=True)
+
+    timestamps = ['created_at', 'shipped_at', 'delivered_at', 'returned_at']
+    for table in (orders, order_items):
+        for column in timestamps:
+            table[column] = _timestamps(table[column].to_numpy())
+    return {'orders': orders, 'users': users, 'order_items': order_items, 'products': products}
+
+
+def write_tables(tables, directory):
+    """Write each table as ``<name>.csv`` under ``directory``"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, table in tables.items():
+        table.to_csv(directory / f"{name}.csv", index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=100_000)
+    parser.add_argument('--products', type=int, help="Products in the catalog (scales with orders by default)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', default='2025-01-01', help="First order date")
+    parser.add_argument('--end', default='2025-07-15', help="Last order date")
+    parser.add_argument('--out', required=True, help="Output directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    tables = generate_tables(args.orders, args.seed, args.start, args.end, args.products)
+    write_tables(tables, args.out)
+    sizes = ", ".join(f"{name} {len(table):,}" for name, table in tables.items())
+    print(f"Wrote {sizes} rows to {args.out} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
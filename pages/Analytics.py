@@ -1,35 +1,19 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from analytics import metrics
+from analytics.snapshot import load_live_result, load_order_index, load_orders
+from analytics.widgets import keep_valid_selection, with_counts
+
 st.set_page_config(page_title="Order Analytics", layout="wide")
 
 st.title("Order Analytics")
 
-@st.cache_data
 def load_analysis_data():
     try:
-        orders_df = pd.read_csv("sample_data/orders.csv")
-        users_df = pd.read_csv("sample_data/users.csv")
-
-        # 日付型への変換
-        orders_df['created_at'] = pd.to_datetime(orders_df['created_at'])
-        users_df['created_at'] = pd.to_datetime(users_df['created_at'])
-
-        # ordersとusersを結合（国・トラフィックソース情報取得のため）
-        merged_df = orders_df.merge(
-            users_df[['id', 'country', 'traffic_source']],
-            left_on='user_id',
-            right_on='id',
-            how='left',
-            suffixes=('', '_user')
-        )
-
-        # 結合後の欠損値を削除
-        merged_df = merged_df.dropna(subset=['country', 'traffic_source'])
-
-        return merged_df
+        # 全ページ共通のスナップショットから orders と users の結合済みデータを取得
+        return load_orders(), load_order_index()
     except FileNotFoundError:
         st.error("データファイルが見つかりません。sample_data/ディレクトリを確認してください。")
         st.stop()
@@ -39,65 +23,59 @@ def load_analysis_data():
 
 def calculate_monthly_metrics(df):
     try:
-        # データフレームのコピーを作成
-        df = df.copy()
-        # 年月カラム追加
-        df['year_month'] = df['created_at'].dt.to_period('M')
-
-        # 月別集計
-        monthly_stats = df.groupby('year_month').agg({
-            'order_id': 'count',
-            'status': lambda x: (x == 'Cancelled').sum()
-        }).reset_index()
-
-        monthly_stats.columns = ['year_month', 'total_orders', 'cancelled_orders']
-        monthly_stats['cancel_rate'] = (
-            monthly_stats['cancelled_orders'] / monthly_stats['total_orders'] * 100
-        )
-
-        # Period型を文字列に変換（Plotly用）
-        monthly_stats['year_month'] = monthly_stats['year_month'].astype(str)
-
-        return monthly_stats
+        return metrics.monthly_order_metrics(df)
     except Exception as e:
         st.error(f"月次集計エラー: {str(e)}")
         st.stop()
 
 # データ読み込み
-merged_df = load_analysis_data()
+merged_df, filter_index = load_analysis_data()
 
 # サイドバーフィルタ
 st.sidebar.header("Filters")
 
 # 国別フィルタ
-all_countries = sorted(merged_df['country'].unique())
+country_counts = filter_index.option_counts('country')
+all_countries = country_counts.index.tolist()
 selected_countries = st.sidebar.multiselect(
     "Select Countries",
     options=all_countries,
-    default=all_countries[:5] if len(all_countries) >= 5 else all_countries
+    default=all_countries[:5] if len(all_countries) >= 5 else all_countries,
+    format_func=with_counts(country_counts)
 )
 
 # トラフィックソース別フィルタ
-all_traffic_sources = sorted(merged_df['traffic_source'].unique())
+# 選択中の国にデータがあるトラフィックソースのみ表示
+traffic_counts = filter_index.option_counts('traffic_source', {'country': selected_countries})
+all_traffic_sources = traffic_counts.index.tolist()
+keep_valid_selection('analytics_traffic_sources', all_traffic_sources, all_traffic_sources)
 selected_traffic_sources = st.sidebar.multiselect(
     "Select Traffic Sources",
     options=all_traffic_sources,
-    default=all_traffic_sources
+    format_func=with_counts(traffic_counts),
+    key='analytics_traffic_sources'
 )
 
-# フィルタ適用
-filtered_df = merged_df[
-    (merged_df['country'].isin(selected_countries)) &
-    (merged_df['traffic_source'].isin(selected_traffic_sources))
-]
+# フィルタ適用（ビットマップの積で行を選択し、必要なカラムだけを一度だけコピー）
+filtered_df = metrics.filter_orders(
+    merged_df,
+    filter_index,
+    countries=selected_countries,
+    traffic_sources=selected_traffic_sources
+)
 
 # フィルタリング後の空データチェック
 if filtered_df.empty:
     st.warning("選択された条件に該当するデータがありません。フィルタを調整してください。")
     st.stop()
 
-# 月次集計実行
-monthly_stats = calculate_monthly_metrics(filtered_df)
+# 月次集計実行（全セッション共有・再起動後はディスクから読み込み）
+monthly_stats = load_live_result(
+    'monthly_order_metrics',
+    lambda: calculate_monthly_metrics(filtered_df),
+    countries=sorted(selected_countries),
+    traffic_sources=sorted(selected_traffic_sources)
+)
 
 # メインエリア表示
 st.subheader("Monthly Order Trends")
@@ -202,8 +180,7 @@ st.plotly_chart(fig_combined, use_container_width=True)
 
 # 4. 月次データテーブル
 st.subheader("Monthly Summary Data")
-display_stats = monthly_stats.copy()
-display_stats['cancel_rate'] = display_stats['cancel_rate'].round(2)
+display_stats = monthly_stats.round({'cancel_rate': 2})
 display_stats.columns = ['Month', 'Total Orders', 'Cancelled Orders', 'Cancel Rate (%)']
 
 st.dataframe(
@@ -1,77 +1,24 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+
+from analytics import metrics
+from analytics.periods import COMPARE_PRESETS, get_period_dates, resolve_periods
+from analytics.sketches import TOP_N
+from analytics.snapshot import (
+    load_catalog, load_daily_cube, load_line_item_index, load_line_items, load_live_result,
+    load_materialized_store, load_sales_sketches
+)
+from analytics.timeseries import percent_change, previous_period
+from analytics.widgets import keep_valid_choice, with_counts
 
 st.set_page_config(page_title="Category Analysis", layout="wide")
 
 st.title("📊 Product Category Sales Analysis")
 
-@st.cache_data
-def load_data():
-    """Load order items, products, and orders data"""
-    order_items_df = pd.read_csv("sample_data/order_items.csv")
-    products_df = pd.read_csv("sample_data/products.csv")
-    orders_df = pd.read_csv("sample_data/orders.csv")
-
-    # Merge order items with products to get category information
-    merged_df = order_items_df.merge(
-        products_df[['id', 'category', 'name', 'brand', 'department']],
-        left_on='product_id',
-        right_on='id',
-        how='left'
-    )
-
-    # Merge with orders to get gender information
-    merged_df = merged_df.merge(
-        orders_df[['order_id', 'gender']],
-        on='order_id',
-        how='left'
-    )
-
-    # Convert date columns to datetime
-    merged_df['created_at'] = pd.to_datetime(merged_df['created_at'])
-
-    return merged_df, products_df
-
-def get_period_dates(period_type, reference_date):
-    """Calculate start and end dates based on period type"""
-    if period_type == "Last 7 Days":
-        end_date = reference_date
-        start_date = end_date - timedelta(days=6)
-    elif period_type == "Last 30 Days":
-        end_date = reference_date
-        start_date = end_date - timedelta(days=29)
-    elif period_type == "This Month":
-        start_date = reference_date.replace(day=1)
-        end_date = reference_date
-    elif period_type == "Last Month":
-        first_day_this_month = reference_date.replace(day=1)
-        end_date = first_day_this_month - timedelta(days=1)
-        start_date = end_date.replace(day=1)
-    elif period_type == "This Quarter":
-        quarter = (reference_date.month - 1) // 3
-        start_date = datetime(reference_date.year, quarter * 3 + 1, 1).date()
-        end_date = reference_date
-    elif period_type == "Last Quarter":
-        first_day_this_quarter = datetime(reference_date.year, ((reference_date.month - 1) // 3) * 3 + 1, 1).date()
-        end_date = first_day_this_quarter - timedelta(days=1)
-        quarter = (end_date.month - 1) // 3
-        start_date = datetime(end_date.year, quarter * 3 + 1, 1).date()
-    elif period_type == "This Year":
-        start_date = datetime(reference_date.year, 1, 1).date()
-        end_date = reference_date
-    elif period_type == "Last Year":
-        start_date = datetime(reference_date.year - 1, 1, 1).date()
-        end_date = datetime(reference_date.year - 1, 12, 31).date()
-    else:  # All Time
-        return None, None
-
-    return start_date, end_date
-
 # Load data
-merged_df, products_df = load_data()
+merged_df = load_line_items()
+catalog = load_catalog()
+filter_index = load_line_item_index()
 
 # Sidebar filters
 st.sidebar.header("Filters")
@@ -85,9 +32,8 @@ period_type = st.sidebar.selectbox(
     index=0
 )
 
-# Get min and max dates from data
-min_date = merged_df['created_at'].min().date()
-max_date = merged_df['created_at'].max().date()
+# Get min and max dates from the catalog
+min_date, max_date = catalog.date_range('order_items')
 
 # Calculate date range based on period type
 if period_type == "Custom Range":
@@ -116,54 +62,102 @@ st.sidebar.divider()
 
 # Status filter
 st.sidebar.subheader("🔍 Status Filter")
-status_options = ['All'] + list(merged_df['status'].unique())
-selected_status = st.sidebar.selectbox("Order Status", status_options)
+period_range = None if period_type == "All Time" else (start_date, end_date)
+status_counts = filter_index.option_counts('status', date_range=period_range)
+status_options = ['All'] + status_counts.index.tolist()
+keep_valid_choice('category_status', status_options)
+selected_status = st.sidebar.selectbox(
+    "Order Status",
+    status_options,
+    format_func=with_counts(status_counts, total=status_counts.sum()),
+    key='category_status'
+)
 
 st.sidebar.divider()
 
 # Gender filter
 st.sidebar.subheader("👥 Gender Filter")
+status_filter = {} if selected_status == 'All' else {'status': selected_status}
+gender_counts = filter_index.option_counts('gender', status_filter, period_range)
+gender_counts = gender_counts.rename(index={'M': 'Male', 'F': 'Female'})
+gender_options = ["All"] + [g for g in ["Male", "Female"] if g in gender_counts]
+keep_valid_choice('category_gender', gender_options)
 selected_gender = st.sidebar.radio(
     "Select Gender",
-    options=["All", "Male", "Female"],
-    index=0,
-    horizontal=True
+    options=gender_options,
+    format_func=with_counts(gender_counts, total=gender_counts.sum()),
+    horizontal=True,
+    key='category_gender'
 )
 
-# Apply filters
-filtered_df = merged_df.copy()
-
-# Apply status filter
-if selected_status != 'All':
-    filtered_df = filtered_df[filtered_df['status'] == selected_status]
-
-# Apply gender filter
-if selected_gender == "Male":
-    filtered_df = filtered_df[filtered_df['gender'] == 'M']
-elif selected_gender == "Female":
-    filtered_df = filtered_df[filtered_df['gender'] == 'F']
+st.sidebar.divider()
 
-# Apply date filter
-if period_type != "All Time":
-    filtered_df = filtered_df[
-        (filtered_df['created_at'].dt.date >= start_date) &
-        (filtered_df['created_at'].dt.date <= end_date)
-    ]
-
-# Calculate category metrics
-category_metrics = filtered_df.groupby('category').agg({
-    'sale_price': ['sum', 'mean', 'count'],
-    'id_x': 'count'
-}).round(2)
-
-category_metrics.columns = ['Total Sales', 'Avg Price', 'Count_1', 'Order Count']
-category_metrics = category_metrics[['Total Sales', 'Avg Price', 'Order Count']]
-category_metrics = category_metrics.sort_values('Total Sales', ascending=False)
-
-# Add percentage of total sales
-category_metrics['Sales %'] = (
-    category_metrics['Total Sales'] / category_metrics['Total Sales'].sum() * 100
-).round(2)
+# Approximate mode
+st.sidebar.subheader("⚡ Performance")
+approximate_mode = st.sidebar.toggle(
+    "Approximate mode",
+    help="Answer the category and department summaries and distinct counts from streaming sketches "
+         "(unfiltered data only)"
+)
+use_sketches = (
+    approximate_mode and period_type == "All Time" and selected_status == 'All' and selected_gender == "All"
+)
+if approximate_mode and not use_sketches:
+    st.sidebar.caption("Filters are active, so exact results are shown.")
+
+gender_codes = {"All": "All", "Male": "M", "Female": "F"}
+filter_args = dict(
+    start_date=start_date if period_range else None,
+    end_date=end_date if period_range else None,
+    status=selected_status,
+    gender=gender_codes[selected_gender]
+)
+record_count = metrics.count_line_items(filter_index, **filter_args)
+
+# Use the batch job's results for preset periods when available
+precomputed = None
+if period_type != "Custom Range" and not use_sketches:
+    store = load_materialized_store()
+    params = dict(period=period_type, status=selected_status, gender=gender_codes[selected_gender])
+    precomputed = {
+        name: store.read(name, **params)
+        for name in ['category_metrics', 'department_metrics', 'daily_category_sales']
+    }
+    if any(result is None for result in precomputed.values()):
+        precomputed = None
+
+def compute_results():
+    # Apply status, gender and date filters in one pass over the bitmap index
+    filtered_df = metrics.filter_line_items(
+        merged_df,
+        filter_index,
+        columns=['category', 'department', 'sale_price', 'id_order', 'created_at', 'date', 'category_code',
+                 'department_code'],
+        **filter_args
+    )
+    return {
+        'category_metrics': metrics.category_metrics(filtered_df),
+        'department_metrics': metrics.department_metrics(filtered_df),
+        'daily_category_sales': metrics.daily_category_sales(filtered_df),
+    }
+
+if use_sketches:
+    # The sketches replace the aggregation over the line items; daily trends come from the daily cube
+    sketches = load_sales_sketches()
+    results = {
+        'category_metrics': sketches.summary('category'),
+        'department_metrics': sketches.summary('department'),
+        'daily_category_sales': None,
+    }
+    st.sidebar.caption("≈ Summaries answered from sketches.")
+elif precomputed is None:
+    # Computed here, and shared with other sessions through the live results cache
+    results = load_live_result('category_analysis', compute_results, **filter_args)
+else:
+    results = precomputed
+    st.sidebar.caption("⚡ Served from precomputed results.")
+category_metrics = results['category_metrics']
+dept_metrics = results['department_metrics']
 
 # Display period summary
 filter_info = f"**Gender:** {selected_gender}"
@@ -172,9 +166,30 @@ if selected_status != 'All':
 
 if period_type != "All Time":
     total_days = (end_date - start_date).days + 1
-    st.info(f"📅 **Analysis Period:** {period_type} ({start_date} to {end_date}) - {total_days} days | **Records:** {len(filtered_df):,} orders | {filter_info}")
+    st.info(f"📅 **Analysis Period:** {period_type} ({start_date} to {end_date}) - {total_days} days | **Records:** {record_count:,} orders | {filter_info}")
 else:
-    st.info(f"📅 **Analysis Period:** {period_type} | **Records:** {len(filtered_df):,} orders | {filter_info}")
+    st.info(f"📅 **Analysis Period:** {period_type} | **Records:** {record_count:,} orders | {filter_info}")
+
+# Changes against the previous period of the same length, answered from the
+# daily cube's prefix sums instead of filtering the line items again
+daily_cube = load_daily_cube()
+cube_filters = {dimension: value for dimension, value in
+                [('status', selected_status), ('gender', gender_codes[selected_gender])] if value != 'All'}
+total_sales = category_metrics['Total Sales'].sum()
+total_orders = category_metrics['Order Count'].sum()
+sales_delta = categories_delta = orders_delta = aov_delta = None
+previous_start = None
+if period_range is not None:
+    previous_start, previous_end = previous_period(start_date, end_date)
+if previous_start is not None and daily_cube.covers(previous_start):
+    previous = daily_cube.totals(previous_start, previous_end, cube_filters, by='category')
+    previous = previous[previous['items'] > 0]
+    previous_sales, previous_orders = previous['sales'].sum(), previous['items'].sum()
+    sales_delta = percent_change(total_sales, previous_sales)
+    categories_delta = len(category_metrics) - len(previous)
+    orders_delta = percent_change(total_orders, previous_orders)
+    if total_orders and previous_orders:
+        aov_delta = percent_change(total_sales / total_orders, previous_sales / previous_orders)
 
 # Overview metrics
 col1, col2, col3, col4 = st.columns(4)
@@ -182,27 +197,34 @@ col1, col2, col3, col4 = st.columns(4)
 with col1:
     st.metric(
         "Total Sales",
-        f"${category_metrics['Total Sales'].sum():,.2f}"
+        f"${total_sales:,.2f}",
+        delta=sales_delta
     )
 
 with col2:
     st.metric(
         "Total Categories",
-        len(category_metrics)
+        len(category_metrics),
+        delta=categories_delta
     )
 
 with col3:
     st.metric(
         "Total Orders",
-        f"{category_metrics['Order Count'].sum():,.0f}"
+        f"{total_orders:,.0f}",
+        delta=orders_delta
     )
 
 with col4:
     st.metric(
         "Avg Order Value",
-        f"${category_metrics['Total Sales'].sum() / category_metrics['Order Count'].sum():.2f}"
+        f"${total_sales / total_orders:.2f}",
+        delta=aov_delta
     )
 
+if sales_delta is not None:
+    st.caption(f"Changes compared with the previous period ({previous_start} to {previous_end})")
+
 st.divider()
 
 # Display category metrics table
@@ -224,7 +246,7 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("Top 10 Categories by Sales")
-    top_10_categories = category_metrics.head(10)
+    top_10_categories = category_metrics.head(TOP_N)
 
     fig_bar = px.bar(
         top_10_categories.reset_index(),
@@ -238,6 +260,19 @@ with col1:
     )
     fig_bar.update_layout(yaxis={'categoryorder': 'total ascending'})
     st.plotly_chart(fig_bar, use_container_width=True)
+    if use_sketches:
+        distinct = sketches.distinct
+        category_sales = sketches.sales['category']
+        top_sketched = category_sales.top(TOP_N)
+        st.caption(
+            f"≈ Approximate: sales overestimated by at most ${top_sketched['error'].max():,.2f} per category "
+            f"(bound ${category_sales.error_bound():,.2f}, "
+            f"{category_sales.relative_error * 100:.1f}% of total sales), ranking "
+            f"{'guaranteed' if top_sketched['guaranteed'].all() else 'not guaranteed'} | "
+            f"~{distinct['product_id'].count():,.0f} products, ~{distinct['order_id'].count():,.0f} orders, "
+            f"~{distinct['user_id'].count():,.0f} customers "
+            f"(±{distinct['product_id'].relative_error * 100:.1f}%)"
+        )
 
 with col2:
     st.subheader("Sales Distribution by Category")
@@ -297,25 +332,37 @@ st.divider()
 st.header("Sales Trends Over Time")
 
 # Allow user to select categories for trend analysis
-all_categories = sorted(filtered_df['category'].unique())
+all_categories = sorted(category_metrics.index)
 selected_categories = st.multiselect(
     "Select categories to compare (max 5)",
     all_categories,
     default=list(category_metrics.head(5).index)
 )
 
-if selected_categories:
-    trend_df = filtered_df[filtered_df['category'].isin(selected_categories)].copy()
-    trend_df['date'] = trend_df['created_at'].dt.date
+trend_windows = {"Daily": 1, "7-Day Rolling": 7, "30-Day Rolling": 30, "Cumulative": None}
+trend_type = st.radio("Show", list(trend_windows), horizontal=True)
 
-    daily_sales = trend_df.groupby(['date', 'category'])['sale_price'].sum().reset_index()
+if selected_categories:
+    if trend_type != "Daily" or use_sketches:
+        # Rolling and cumulative sums are differences of the daily cube's prefix sums
+        trend = daily_cube.series(
+            'sales', start_date, end_date, cube_filters, by='category',
+            window=trend_windows[trend_type] or 1, cumulative=trend_type == "Cumulative"
+        )
+        daily_sales = (
+            trend[[c for c in selected_categories if c in trend.columns]]
+            .melt(ignore_index=False, value_name='sale_price').reset_index()
+        )
+    else:
+        daily_sales = results['daily_category_sales']
+        daily_sales = daily_sales[daily_sales['category'].isin(selected_categories)].reset_index(drop=True)
 
     fig_trend = px.line(
         daily_sales,
         x='date',
         y='sale_price',
         color='category',
-        title='Daily Sales Trend by Category',
+        title=f'{trend_type} Sales Trend by Category',
         labels={'sale_price': 'Sales ($)', 'date': 'Date', 'category': 'Category'}
     )
     fig_trend.update_layout(hovermode='x unified')
@@ -328,13 +375,6 @@ st.divider()
 # Department analysis
 st.header("Department Analysis")
 
-dept_metrics = filtered_df.groupby('department').agg({
-    'sale_price': 'sum',
-    'id_x': 'count'
-}).round(2)
-dept_metrics.columns = ['Total Sales', 'Order Count']
-dept_metrics = dept_metrics.sort_values('Total Sales', ascending=False)
-
 col1, col2 = st.columns(2)
 
 with col1:
@@ -368,3 +408,52 @@ st.dataframe(
     }),
     use_container_width=True
 )
+
+st.divider()
+
+# Every preset period side by side, from one pass over the filtered line items
+st.header("Compare All Periods")
+st.caption(f"Status and gender filters apply; periods end on {max_date}.")
+
+def compute_period_metrics():
+    period_df = metrics.filter_line_items(
+        merged_df,
+        filter_index,
+        columns=['category', 'sale_price', 'id_order', 'date'],
+        status=selected_status,
+        gender=gender_codes[selected_gender]
+    )
+    return metrics.period_category_metrics(period_df, resolve_periods(max_date, COMPARE_PRESETS))
+
+period_metrics = load_live_result(
+    'period_category_metrics', compute_period_metrics,
+    status=selected_status, gender=gender_codes[selected_gender]
+)
+
+compare_formats = {'Total Sales': '${:,.2f}', 'Avg Price': '${:.2f}', 'Order Count': '{:,.0f}', 'Sales %': '{:.2f}%'}
+compare_metric = st.radio("Metric", list(compare_formats), horizontal=True, key='category_compare_metric')
+
+if period_metrics.empty:
+    st.info("No sales match the selected filters.")
+else:
+    compared_periods = [p for p in COMPARE_PRESETS if p in period_metrics.index.get_level_values('period')]
+    comparison = (
+        period_metrics[compare_metric].unstack('period')
+        .reindex(columns=compared_periods)
+        .sort_values(compared_periods[-1], ascending=False)
+    )
+
+    fig_compare = px.imshow(
+        comparison,
+        aspect='auto',
+        color_continuous_scale='Blues',
+        title=f'{compare_metric} by Category and Period',
+        labels={'x': 'Period', 'y': 'Category', 'color': compare_metric}
+    )
+    fig_compare.update_layout(height=max(400, 24 * len(comparison)))
+    st.plotly_chart(fig_compare, use_container_width=True)
+
+    st.dataframe(
+        comparison.style.format(compare_formats[compare_metric], na_rep='-'),
+        use_container_width=True
+    )
@@ -0,0 +1,133 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+from analytics.snapshot import load_cohorts
+from analytics.widgets import keep_valid_selection, with_counts
+
+st.set_page_config(page_title="Cohort Retention", layout="wide")
+
+st.title("👥 Customer Cohort Retention")
+st.markdown("Customers grouped by the month of their first order, and the share who order again in later months")
+
+# Load data
+cohorts = load_cohorts()
+
+# Sidebar filters
+st.sidebar.header("Filters")
+
+# Country filter (counts are customers)
+country_counts = cohorts.segment_counts('country')
+all_countries = country_counts.index.tolist()
+selected_countries = st.sidebar.multiselect(
+    "Select Countries",
+    options=all_countries,
+    default=all_countries,
+    format_func=with_counts(country_counts)
+)
+
+# Traffic source filter: only sources with customers in the selected countries
+traffic_counts = cohorts.segment_counts('traffic_source', {'country': selected_countries})
+all_traffic_sources = traffic_counts.index.tolist()
+keep_valid_selection('cohort_traffic_sources', all_traffic_sources, all_traffic_sources)
+selected_traffic_sources = st.sidebar.multiselect(
+    "Select Traffic Sources",
+    options=all_traffic_sources,
+    format_func=with_counts(traffic_counts),
+    key='cohort_traffic_sources'
+)
+
+st.sidebar.divider()
+
+show_counts = st.sidebar.toggle("Show customer counts instead of percentages")
+
+# Slice the precomputed cohort matrix: a sum over the selected segments
+filters = {'country': selected_countries, 'traffic_source': selected_traffic_sources}
+cohort_sizes, retention = cohorts.retention(filters)
+
+if cohort_sizes.empty:
+    st.warning("No customers match the selected filters. Please adjust the filters.")
+    st.stop()
+
+active_customers = cohorts.active_customers(filters).loc[retention.index]
+retention_curve = cohorts.retention_curve(filters)
+
+# Overview metrics
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric("Customers", f"{cohort_sizes.sum():,.0f}")
+
+with col2:
+    st.metric("Cohorts", len(cohort_sizes))
+
+with col3:
+    month_1 = retention_curve.get(1)
+    st.metric(
+        "Month 1 Retention",
+        f"{month_1:.2f}%" if pd.notna(month_1) else "-",
+        help="Share of customers who ordered again in the month after their first order"
+    )
+
+with col4:
+    month_3 = retention_curve.get(3)
+    st.metric(
+        "Month 3 Retention",
+        f"{month_3:.2f}%" if pd.notna(month_3) else "-",
+        help="Share of customers who ordered three months after their first order"
+    )
+
+st.divider()
+
+# Cohort heatmap
+st.header("Retention by Cohort")
+
+heatmap_values = active_customers if show_counts else retention
+fig_heatmap = px.imshow(
+    heatmap_values,
+    text_auto='.0f' if show_counts else '.1f',
+    aspect='auto',
+    color_continuous_scale='Blues',
+    labels={
+        'x': 'Months Since First Order',
+        'y': 'First Order Month',
+        'color': 'Customers' if show_counts else 'Retention (%)'
+    },
+    title='Active Customers by Cohort' if show_counts else 'Retention Rate by Cohort (%)'
+)
+fig_heatmap.update_xaxes(side='top', dtick=1)
+st.plotly_chart(fig_heatmap, use_container_width=True)
+
+col1, col2 = st.columns(2)
+
+with col1:
+    # Average retention curve (excluding month 0, which is always 100%)
+    curve = retention_curve.iloc[1:].dropna().reset_index()
+    fig_curve = px.line(
+        curve,
+        x='months_since_first_order',
+        y='retention',
+        title='Average Retention Curve',
+        labels={'months_since_first_order': 'Months Since First Order', 'retention': 'Retention (%)'},
+        markers=True
+    )
+    st.plotly_chart(fig_curve, use_container_width=True)
+
+with col2:
+    fig_sizes = px.bar(
+        cohort_sizes.reset_index(),
+        x='cohort',
+        y='customers',
+        title='New Customers per Cohort',
+        labels={'cohort': 'First Order Month', 'customers': 'Customers'},
+        color='customers',
+        color_continuous_scale='Blues'
+    )
+    st.plotly_chart(fig_sizes, use_container_width=True)
+
+# Cohort table
+st.subheader("Cohort Data")
+cohort_table = heatmap_values.round(2)
+cohort_table.columns = [f"Month {offset}" for offset in cohort_table.columns]
+cohort_table.insert(0, 'Customers', cohort_sizes)
+st.dataframe(cohort_table, use_container_width=True)
@@ -0,0 +1,166 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+
+from analytics.fulfillment import LATENCIES
+from analytics.snapshot import load_latency_histograms
+from analytics.widgets import keep_valid_selection, with_counts
+
+st.set_page_config(page_title="Fulfillment", layout="wide")
+
+st.title("🚚 Fulfillment Latency Analysis")
+st.markdown("How long orders take to ship, to be delivered and to come back")
+
+# Load data
+histograms = load_latency_histograms()
+
+# Sidebar filters
+st.sidebar.header("Filters")
+
+# Country filter
+country_counts = histograms.segment_counts('country')
+all_countries = country_counts.index.tolist()
+selected_countries = st.sidebar.multiselect(
+    "Select Countries",
+    options=all_countries,
+    default=all_countries,
+    format_func=with_counts(country_counts)
+)
+
+# Status filter: only statuses with orders in the selected countries
+status_counts = histograms.segment_counts('status', {'country': selected_countries})
+all_statuses = status_counts.index.tolist()
+keep_valid_selection('fulfillment_statuses', all_statuses, all_statuses)
+selected_statuses = st.sidebar.multiselect(
+    "Select Order Status",
+    options=all_statuses,
+    format_func=with_counts(status_counts),
+    key='fulfillment_statuses'
+)
+
+filters = {'country': selected_countries, 'status': selected_statuses}
+
+# Overview: median and 90th percentile of each step
+summaries = {name: histograms.summary(name, filters).iloc[0] for name in LATENCIES}
+
+if all(summary['count'] == 0 for summary in summaries.values()):
+    st.warning("No shipped orders match the selected filters. Please adjust the filters.")
+    st.stop()
+
+def format_hours(hours):
+    if pd.isna(hours):
+        return "-"
+    return f"{hours:.1f} h" if hours < 48 else f"{hours / 24:.1f} days"
+
+cols = st.columns(len(LATENCIES))
+for col, (name, (_, _, label)) in zip(cols, LATENCIES.items()):
+    summary = summaries[name]
+    with col:
+        st.metric(
+            f"Median {label}",
+            format_hours(summary['p50']),
+            help=f"P90 {format_hours(summary['p90'])} | P99 {format_hours(summary['p99'])} | "
+                 f"{summary['count']:,.0f} orders"
+        )
+
+bin_widths = ", ".join(f"{LATENCIES[name][2]} {hours} h" for name, hours in histograms.bin_hours.items())
+st.caption(f"Percentiles are read from hour histograms and are accurate to one bin ({bin_widths}).")
+
+st.divider()
+
+# Latency step to analyze
+selected_latency = st.radio(
+    "Fulfillment Step",
+    list(LATENCIES),
+    format_func=lambda name: LATENCIES[name][2],
+    horizontal=True
+)
+step_label = LATENCIES[selected_latency][2]
+
+# Distribution
+st.header("Latency Distribution")
+
+counts = histograms.histogram(selected_latency, filters)
+edges = histograms.edges[selected_latency]
+distribution = pd.DataFrame({
+    'hours': (edges[:-1] + edges[1:]) / 2,
+    'orders': counts
+})
+distribution = distribution[distribution['hours'] <= edges[counts.nonzero()[0].max() + 1]] if counts.any() else distribution
+
+fig_dist = px.bar(
+    distribution,
+    x='hours',
+    y='orders',
+    title=f'{step_label} Time Distribution',
+    labels={'hours': 'Hours', 'orders': 'Number of Orders'},
+    color_discrete_sequence=['#4A90E2']
+)
+fig_dist.update_layout(bargap=0)
+summary = summaries[selected_latency]
+for percentile, color in [('p50', '#2ECC71'), ('p90', '#F39C12'), ('p99', '#E74C3C')]:
+    if pd.notna(summary[percentile]):
+        fig_dist.add_vline(x=summary[percentile], line_dash='dash', line_color=color,
+                           annotation_text=percentile.upper(), annotation_position='top')
+st.plotly_chart(fig_dist, use_container_width=True)
+
+# Percentiles by month
+st.header("Latency Percentiles by Month")
+
+by_month = histograms.summary(selected_latency, filters, by='year_month')
+by_month = by_month[by_month['count'] > 0]
+by_month.index = by_month.index.astype(str)
+monthly = by_month[['p50', 'p90', 'p99']].reset_index().melt(
+    id_vars='year_month', var_name='percentile', value_name='hours'
+)
+
+fig_month = px.line(
+    monthly,
+    x='year_month',
+    y='hours',
+    color='percentile',
+    title=f'{step_label} Percentiles by Month',
+    labels={'year_month': 'Month', 'hours': 'Hours', 'percentile': 'Percentile'},
+    markers=True
+)
+st.plotly_chart(fig_month, use_container_width=True)
+
+col1, col2 = st.columns(2)
+
+with col1:
+    # Percentiles by country
+    by_country = histograms.summary(selected_latency, filters, by='country')
+    by_country = by_country[by_country['count'] > 0].sort_values('p50', ascending=False)
+
+    fig_country = px.bar(
+        by_country[['p50', 'p90']].reset_index().melt(id_vars='country', var_name='percentile', value_name='hours'),
+        x='hours',
+        y='country',
+        color='percentile',
+        barmode='group',
+        orientation='h',
+        title=f'{step_label} by Country',
+        labels={'hours': 'Hours', 'country': 'Country', 'percentile': 'Percentile'}
+    )
+    fig_country.update_layout(yaxis={'categoryorder': 'total ascending'})
+    st.plotly_chart(fig_country, use_container_width=True)
+
+with col2:
+    # All steps by status
+    st.subheader("Latency by Order Status")
+    status_table = pd.concat(
+        {LATENCIES[name][2]: histograms.summary(name, filters, by='status') for name in LATENCIES},
+        names=['step']
+    ).reset_index()
+    status_table = status_table[status_table['count'] > 0]
+    st.dataframe(
+        status_table.style.format({
+            'count': '{:,.0f}',
+            'mean': '{:.1f} h',
+            'p50': '{:.1f} h',
+            'p90': '{:.1f} h',
+            'p99': '{:.1f} h'
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
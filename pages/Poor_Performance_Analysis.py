@@ -1,107 +1,383 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from analytics import metrics
+from analytics.memory import session_cache
+from analytics.periods import LOOKBACK_PRESETS, get_period_dates
+from analytics.sketches import merged_digest
+from analytics.snapshot import (
+    load_catalog, load_line_item_index, load_line_items, load_live_result, load_materialized_store,
+    load_product_daily_sales, load_product_digests
+)
+from analytics.widgets import keep_valid_choice, keep_widget_state, with_counts
 
 st.set_page_config(page_title="Poor Performance Analysis", layout="wide")
 
 st.title("📉 Poor Performance Product Analysis")
 st.markdown("**Phase 1**: Low Sales & Return Rate Analysis")
 
-@st.cache_data
-def load_data():
-    """Load all necessary data"""
-    order_items_df = pd.read_csv("sample_data/order_items.csv")
-    products_df = pd.read_csv("sample_data/products.csv")
-    orders_df = pd.read_csv("sample_data/orders.csv")
-
-    # Convert date columns
-    order_items_df['created_at'] = pd.to_datetime(order_items_df['created_at'])
-
-    # Merge order items with products
-    merged_df = order_items_df.merge(
-        products_df,
-        left_on='product_id',
-        right_on='id',
-        how='left',
-        suffixes=('_order', '_product')
+def digest_histogram(digest, nbins, title, x_label, color):
+    """Bar chart of an approximate histogram read from a t-digest"""
+    counts, edges = digest.histogram(nbins)
+    fig = px.bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        title=f"{title} ≈ ±{digest.rank_error() * 100:.1f}% rank error",
+        labels={'x': x_label, 'y': 'Number of Products'},
+        color_discrete_sequence=[color]
+    )
+    fig.update_layout(bargap=0)
+    return fig
+
+def view_results(view, filter_key, params, compute):
+    """Results of an analysis view, recomputed only when its inputs change"""
+    cache = session_cache('poor_view_results')
+    key = (filter_key, params)
+    cached = cache.get(view)
+    if cached is None or cached[0] != key:
+        cached = (key, compute())
+        cache.put(view, cached)
+    return cached[1]
+
+def computed_results(view, filter_key):
+    """Results of a view computed under the current filters, if it was opened and is still cached"""
+    cached = session_cache('poor_view_results').peek(view)
+    if cached is not None and cached[0][0] == filter_key:
+        return cached[1]
+    return None
+
+def low_sales_analysis(product_stats, sales_threshold, sort_by):
+    """Products at or below the sales threshold, with their charts"""
+    # Filter low sales products
+    low_sales_df = product_stats[product_stats['total_sales_count'] <= sales_threshold]
+
+    # Sort based on selection
+    if sort_by == "Lowest Sales Count":
+        low_sales_df = low_sales_df.sort_values('total_sales_count', ascending=True)
+    elif sort_by == "Highest Return Rate":
+        low_sales_df = low_sales_df.sort_values('return_rate', ascending=False)
+    elif sort_by == "Lowest Profit":
+        low_sales_df = low_sales_df.sort_values('total_profit', ascending=True)
+    else:  # Lowest Revenue
+        low_sales_df = low_sales_df.sort_values('total_revenue', ascending=True)
+
+    # Category breakdown
+    category_low_sales = low_sales_df.groupby('category').size().reset_index(name='count').sort_values('count', ascending=False).head(10)
+
+    fig_cat = px.bar(
+        category_low_sales,
+        x='count',
+        y='category',
+        orientation='h',
+        title='Top 10 Categories with Most Low-Sales Products',
+        labels={'count': 'Number of Products', 'category': 'Category'},
+        color='count',
+        color_continuous_scale='Reds'
+    )
+    fig_cat.update_layout(yaxis={'categoryorder': 'total ascending'})
+
+    # Brand breakdown
+    brand_low_sales = low_sales_df.groupby('brand').size().reset_index(name='count').sort_values('count', ascending=False).head(10)
+
+    fig_brand = px.bar(
+        brand_low_sales,
+        x='count',
+        y='brand',
+        orientation='h',
+        title='Top 10 Brands with Most Low-Sales Products',
+        labels={'count': 'Number of Products', 'brand': 'Brand'},
+        color='count',
+        color_continuous_scale='Oranges'
+    )
+    fig_brand.update_layout(yaxis={'categoryorder': 'total ascending'})
+
+    # Sales distribution
+    fig_dist = px.histogram(
+        low_sales_df,
+        x='total_sales_count',
+        nbins=20,
+        title=f'Distribution of Sales Count (Products with ≤{sales_threshold} sales)',
+        labels={'total_sales_count': 'Sales Count', 'count': 'Number of Products'},
+        color_discrete_sequence=['#FF6B6B']
+    )
+
+    return {'df': low_sales_df, 'fig_cat': fig_cat, 'fig_brand': fig_brand, 'fig_dist': fig_dist}
+
+def return_rate_analysis(product_stats, min_sales_for_return, return_threshold, use_sketches):
+    """Products with a high return rate, with their charts"""
+    # Filter products with sufficient sales and high return rate
+    high_return_df = product_stats[
+        (product_stats['total_sales_count'] >= min_sales_for_return) &
+        (product_stats['return_rate'] >= return_threshold)
+    ]
+
+    high_return_df = high_return_df.sort_values('return_rate', ascending=False)
+
+    # Category return rate
+    category_returns = metrics.return_rates_by(product_stats, 'category').head(10)
+
+    fig_cat_return = px.bar(
+        category_returns,
+        x='return_rate',
+        y='category',
+        orientation='h',
+        title='Top 10 Categories by Return Rate',
+        labels={'return_rate': 'Return Rate (%)', 'category': 'Category'},
+        color='return_rate',
+        color_continuous_scale='Reds'
+    )
+    fig_cat_return.update_layout(yaxis={'categoryorder': 'total ascending'})
+
+    # Brand return rate
+    brand_returns = metrics.return_rates_by(product_stats, 'brand', min_sales=20).head(10)  # Filter brands with enough sales
+
+    fig_brand_return = px.bar(
+        brand_returns,
+        x='return_rate',
+        y='brand',
+        orientation='h',
+        title='Top 10 Brands by Return Rate (min 20 sales)',
+        labels={'return_rate': 'Return Rate (%)', 'brand': 'Brand'},
+        color='return_rate',
+        color_continuous_scale='Oranges'
+    )
+    fig_brand_return.update_layout(yaxis={'categoryorder': 'total ascending'})
+
+    # Return rate distribution
+    if use_sketches:
+        fig_return_dist = digest_histogram(
+            merged_digest(load_product_digests()['return_rate'], min_sales_for_return),
+            30,
+            f'Distribution of Return Rates (Products with ≥{min_sales_for_return} sales)',
+            'Return Rate (%)',
+            '#FF6B6B'
+        )
+    else:
+        fig_return_dist = px.histogram(
+            product_stats[product_stats['total_sales_count'] >= min_sales_for_return],
+            x='return_rate',
+            nbins=30,
+            title=f'Distribution of Return Rates (Products with ≥{min_sales_for_return} sales)',
+            labels={'return_rate': 'Return Rate (%)', 'count': 'Number of Products'},
+            color_discrete_sequence=['#FF6B6B']
+        )
+
+    # Scatter: Sales vs Return Rate
+    scatter_df = product_stats[product_stats['total_sales_count'] >= min_sales_for_return]
+
+    fig_scatter = px.scatter(
+        scatter_df,
+        x='total_sales_count',
+        y='return_rate',
+        color='category',
+        size='total_revenue',
+        hover_data=['name', 'brand'],
+        title='Relationship between Sales Volume and Return Rate',
+        labels={'total_sales_count': 'Total Sales Count', 'return_rate': 'Return Rate (%)'},
+        opacity=0.6
+    )
+
+    return {'df': high_return_df, 'fig_cat_return': fig_cat_return, 'fig_brand_return': fig_brand_return,
+            'fig_return_dist': fig_return_dist, 'fig_scatter': fig_scatter}
+
+def profit_analysis(product_stats, profit_filter, min_sales_profit, use_sketches):
+    """Unprofitable or low-margin products, with their charts"""
+    # Apply filters
+    profit_df = product_stats[product_stats['total_sales_count'] >= min_sales_profit]
+
+    if profit_filter == "Negative Profit":
+        profit_df = profit_df[profit_df['total_profit'] < 0]
+    elif profit_filter == "Profit Margin < 10%":
+        profit_df = profit_df[profit_df['profit_margin'] < 10]
+    elif profit_filter == "Profit Margin < 20%":
+        profit_df = profit_df[profit_df['profit_margin'] < 20]
+
+    profit_df = profit_df.sort_values('total_profit', ascending=True)
+
+    # Worst profit products
+    worst_profit = profit_df.head(20)
+
+    fig_profit = px.bar(
+        worst_profit,
+        x='total_profit',
+        y='name',
+        orientation='h',
+        title='Top 20 Products by Lowest Total Profit',
+        labels={'total_profit': 'Total Profit ($)', 'name': 'Product'},
+        color='total_profit',
+        color_continuous_scale='RdYlGn'
     )
+    fig_profit.update_layout(yaxis={'categoryorder': 'total ascending'}, height=600)
+
+    # Profit margin distribution
+    if use_sketches:
+        fig_margin = digest_histogram(
+            merged_digest(load_product_digests()['profit_margin'], min_sales_profit),
+            40,
+            f'Profit Margin Distribution (Products with ≥{min_sales_profit} sales)',
+            'Profit Margin (%)',
+            '#4ECDC4'
+        )
+    else:
+        fig_margin = px.histogram(
+            product_stats[product_stats['total_sales_count'] >= min_sales_profit],
+            x='profit_margin',
+            nbins=40,
+            title=f'Profit Margin Distribution (Products with ≥{min_sales_profit} sales)',
+            labels={'profit_margin': 'Profit Margin (%)', 'count': 'Number of Products'},
+            color_discrete_sequence=['#4ECDC4']
+        )
 
-    # Merge with orders to get gender info
-    merged_df = merged_df.merge(
-        orders_df[['order_id', 'gender']],
-        on='order_id',
-        how='left'
+    # Category profit
+    category_profit = metrics.profit_by_category(product_stats).head(10)
+
+    fig_cat_profit = px.bar(
+        category_profit,
+        x='total_profit',
+        y='category',
+        orientation='h',
+        title='Bottom 10 Categories by Total Profit',
+        labels={'total_profit': 'Total Profit ($)', 'category': 'Category'},
+        color='total_profit',
+        color_continuous_scale='Reds'
     )
+    fig_cat_profit.update_layout(yaxis={'categoryorder': 'total ascending'})
+
+    return {'df': profit_df, 'fig_profit': fig_profit, 'fig_margin': fig_margin, 'fig_cat_profit': fig_cat_profit}
+
+def sales_trend_analysis(trend_stats, daily_sales, cutoff_date, show, min_sales):
+    """Declining, stalled or slow-moving products over the period, with their charts"""
+    trend_df = trend_stats[trend_stats['sales'] >= min_sales]
+
+    if show == "Declining Sales":
+        trend_df = trend_df[(trend_df['trend'] < 0) & trend_df['change_pct'].notna()]
+        trend_df = trend_df.sort_values(['change_pct', 'trend'], ascending=True)
+    elif show == "Longest Zero-Sale Streak":
+        trend_df = trend_df.sort_values('longest_gap', ascending=False)
+    elif show == "Days Since Last Sale":
+        trend_df = trend_df.sort_values('days_since_sale', ascending=False)
+    else:  # Lowest Velocity
+        trend_df = trend_df.sort_values('velocity', ascending=True)
+
+    # Weekly rolling daily sales of the first products listed, read from the sparse matrix
+    top = trend_df.head(5)
+    fig_daily = None
+    if len(top):
+        daily = daily_sales.daily(top['product_id'].tolist(), start_date=cutoff_date)
+        daily = daily.rolling(7, min_periods=1).mean().rename(columns=dict(zip(top['product_id'], top['name'])))
+        fig_daily = px.line(
+            daily.melt(ignore_index=False, var_name='product', value_name='items').reset_index(),
+            x='date',
+            y='items',
+            color='product',
+            title=f'Daily Sales of the Top 5 Products ({show}, 7-day average)',
+            labels={'items': 'Items Sold per Day', 'date': 'Date', 'product': 'Product'}
+        )
+        fig_daily.update_layout(hovermode='x unified')
 
-    return merged_df, products_df, order_items_df
+    # Days since the last sale
+    fig_idle = px.histogram(
+        trend_stats.dropna(subset=['days_since_sale']),
+        x='days_since_sale',
+        nbins=30,
+        title='Days Since Last Sale (All Products in Filter)',
+        labels={'days_since_sale': 'Days Since Last Sale', 'count': 'Number of Products'},
+        color_discrete_sequence=['#FFA94D']
+    )
+
+    return {'df': trend_df, 'fig_daily': fig_daily, 'fig_idle': fig_idle}
 
 # Load data
-merged_df, products_df, order_items_df = load_data()
+merged_df = load_line_items()
+catalog = load_catalog()
+filter_index = load_line_item_index()
 
 # Sidebar filters
 st.sidebar.header("Filters")
 
 # Date range filter
 st.sidebar.subheader("📅 Analysis Period")
-min_date = merged_df['created_at'].min().date()
-max_date = merged_df['created_at'].max().date()
+min_date, max_date = catalog.date_range('order_items')
 
 period_type = st.sidebar.selectbox(
     "Select Period",
-    ["All Time", "Last 30 Days", "Last 60 Days", "Last 90 Days"],
+    LOOKBACK_PRESETS,
     index=0
 )
 
-if period_type == "All Time":
-    filtered_df = merged_df.copy()
+cutoff_date, _ = get_period_dates(period_type, max_date)
+date_range = None if cutoff_date is None else (cutoff_date, None)
+
+# "Last N Days" covers N days up to the latest date, as on the other pages
+if cutoff_date is None:
+    st.sidebar.info("📊 Analyzing: All available data")
 else:
-    days = int(period_type.split()[1])
-    cutoff_date = max_date - timedelta(days=days)
-    filtered_df = merged_df[merged_df['created_at'].dt.date >= cutoff_date].copy()
+    st.sidebar.info(f"📊 Analyzing: {cutoff_date} to {max_date}")
 
 st.sidebar.divider()
 
 # Category filter
 st.sidebar.subheader("🏷️ Category Filter")
-all_categories = ['All'] + sorted(merged_df['category'].unique().tolist())
-selected_category = st.sidebar.selectbox("Select Category", all_categories)
-
-if selected_category != 'All':
-    filtered_df = filtered_df[filtered_df['category'] == selected_category]
+# Only offer categories that have sales in the selected period
+category_counts = filter_index.option_counts('category', date_range=date_range)
+all_categories = ['All'] + category_counts.index.tolist()
+keep_valid_choice('poor_category', all_categories)
+selected_category = st.sidebar.selectbox(
+    "Select Category",
+    all_categories,
+    format_func=with_counts(category_counts, total=category_counts.sum()),
+    key='poor_category'
+)
 
 st.sidebar.divider()
 
 # Department filter
 st.sidebar.subheader("🏢 Department Filter")
+category_filter = {} if selected_category == 'All' else {'category': selected_category}
+dept_counts = filter_index.option_counts('department', category_filter, date_range)
+dept_options = ["All"] + dept_counts.index.tolist()
+keep_valid_choice('poor_department', dept_options)
 selected_dept = st.sidebar.radio(
     "Select Department",
-    ["All", "Men", "Women"],
-    horizontal=True
+    dept_options,
+    format_func=with_counts(dept_counts, total=dept_counts.sum()),
+    horizontal=True,
+    key='poor_department'
 )
 
-if selected_dept != "All":
-    filtered_df = filtered_df[filtered_df['department'] == selected_dept]
-
-# Calculate product-level metrics
-product_stats = filtered_df.groupby(['product_id', 'name', 'category', 'brand', 'department', 'cost', 'retail_price']).agg({
-    'id_order': 'count',  # Total orders
-    'sale_price': 'sum',   # Total revenue
-    'status': lambda x: (x == 'Returned').sum()  # Return count
-}).reset_index()
-
-product_stats.columns = ['product_id', 'name', 'category', 'brand', 'department', 'cost', 'retail_price', 'total_sales_count', 'total_revenue', 'return_count']
+st.sidebar.divider()
 
-# Calculate additional metrics
-product_stats['return_rate'] = (product_stats['return_count'] / product_stats['total_sales_count'] * 100).round(2)
-product_stats['avg_sale_price'] = (product_stats['total_revenue'] / product_stats['total_sales_count']).round(2)
-product_stats['profit_per_item'] = (product_stats['avg_sale_price'] - product_stats['cost']).round(2)
-product_stats['total_profit'] = (product_stats['profit_per_item'] * product_stats['total_sales_count']).round(2)
-product_stats['profit_margin'] = ((product_stats['profit_per_item'] / product_stats['avg_sale_price']) * 100).round(2)
+# Approximate mode
+st.sidebar.subheader("⚡ Performance")
+approximate_mode = st.sidebar.toggle(
+    "Approximate mode",
+    help="Draw return rate and profit margin distributions from t-digests (unfiltered data only)"
+)
+use_sketches = approximate_mode and period_type == "All Time" and selected_category == 'All' and selected_dept == "All"
+if approximate_mode and not use_sketches:
+    st.sidebar.caption("Filters are active, so exact results are shown.")
 
-# Fill NaN values
-product_stats = product_stats.fillna(0)
+# Product-level metrics: precomputed by the batch job when available
+product_stats = load_materialized_store().read(
+    'product_stats', period=period_type, category=selected_category, department=selected_dept
+)
+if product_stats is None:
+    # Apply all filters in one pass and copy only the columns the analysis uses;
+    # the result is shared with other sessions through the live results cache
+    product_stats = load_live_result(
+        'product_stats',
+        lambda: metrics.product_stats(metrics.filter_line_items(
+            merged_df,
+            filter_index,
+            start_date=cutoff_date,
+            category=selected_category,
+            department=selected_dept
+        )),
+        period=period_type, category=selected_category, department=selected_dept
+    )
+else:
+    st.sidebar.caption("⚡ Served from precomputed results.")
 
 # Overview Section
 st.header("📊 Overview")
@@ -115,10 +391,12 @@ with col1:
     )
 
 with col2:
-    avg_return_rate = (filtered_df['status'] == 'Returned').sum() / len(filtered_df) * 100
+    filter_args = dict(start_date=cutoff_date, category=selected_category, department=selected_dept)
+    line_item_count = metrics.count_line_items(filter_index, **filter_args)
+    returned_count = metrics.count_line_items(filter_index, status='Returned', **filter_args)
     st.metric(
         "Overall Return Rate",
-        f"{avg_return_rate:.2f}%"
+        f"{returned_count / line_item_count * 100:.2f}%" if line_item_count else "N/A"
     )
 
 with col3:
@@ -139,10 +417,36 @@ with col4:
 
 st.divider()
 
-# Tabs for different analyses
-tab1, tab2, tab3 = st.tabs(["📉 Low Sales Analysis", "🔄 Return Rate Analysis", "💰 Profit Analysis"])
+# Analysis views: only the selected view is computed, and its results are kept
+# in session state until the filters or the view's own inputs change
+VIEWS = {
+    'low_sales': "📉 Low Sales Analysis",
+    'return_rate': "🔄 Return Rate Analysis",
+    'profit': "💰 Profit Analysis",
+    'trends': "📈 Sales Trends",
+}
+keep_widget_state({
+    'poor_view': 'low_sales',
+    'poor_sales_threshold': 10,
+    'poor_sort_by': "Lowest Sales Count",
+    'poor_min_sales_for_return': 5,
+    'poor_return_threshold': 15,
+    'poor_profit_filter': "All Products",
+    'poor_min_sales_profit': 5,
+    'poor_trend_show': "Declining Sales",
+    'poor_trend_min_sales': 1,
+})
+active_view = st.radio(
+    "Analysis",
+    list(VIEWS),
+    format_func=VIEWS.get,
+    horizontal=True,
+    label_visibility="collapsed",
+    key='poor_view'
+)
+filter_key = (period_type, selected_category, selected_dept, use_sketches)
 
-with tab1:
+if active_view == 'low_sales':
     st.header("Low Sales Product Dashboard")
     st.markdown("Identify products with poor sales performance")
 
@@ -154,35 +458,26 @@ with tab1:
             "Sales Count Threshold (show products below this number)",
             min_value=1,
             max_value=50,
-            value=10,
-            step=1
+            step=1,
+            key='poor_sales_threshold'
         )
 
     with col2:
         sort_by = st.selectbox(
             "Sort By",
-            ["Lowest Sales Count", "Highest Return Rate", "Lowest Profit", "Lowest Revenue"]
+            ["Lowest Sales Count", "Highest Return Rate", "Lowest Profit", "Lowest Revenue"],
+            key='poor_sort_by'
         )
 
-    # Filter low sales products
-    low_sales_df = product_stats[product_stats['total_sales_count'] <= sales_threshold].copy()
+    results = view_results('low_sales', filter_key, (sales_threshold, sort_by),
+                           lambda: low_sales_analysis(product_stats, sales_threshold, sort_by))
 
-    # Sort based on selection
-    if sort_by == "Lowest Sales Count":
-        low_sales_df = low_sales_df.sort_values('total_sales_count', ascending=True)
-    elif sort_by == "Highest Return Rate":
-        low_sales_df = low_sales_df.sort_values('return_rate', ascending=False)
-    elif sort_by == "Lowest Profit":
-        low_sales_df = low_sales_df.sort_values('total_profit', ascending=True)
-    else:  # Lowest Revenue
-        low_sales_df = low_sales_df.sort_values('total_revenue', ascending=True)
-
-    st.info(f"Found **{len(low_sales_df):,}** products with {sales_threshold} or fewer sales")
+    st.info(f"Found **{len(results['df']):,}** products with {sales_threshold} or fewer sales")
 
     # Display table
     st.subheader(f"Top 100 Poor Performance Products")
 
-    display_df = low_sales_df.head(100)[['name', 'category', 'brand', 'department', 'total_sales_count', 'return_count', 'return_rate', 'total_revenue', 'total_profit', 'profit_margin']]
+    display_df = results['df'].head(100)[['name', 'category', 'brand', 'department', 'total_sales_count', 'return_count', 'return_rate', 'total_revenue', 'total_profit', 'profit_margin']]
 
     st.dataframe(
         display_df.style.format({
@@ -203,53 +498,16 @@ with tab1:
     col1, col2 = st.columns(2)
 
     with col1:
-        # Category breakdown
-        category_low_sales = low_sales_df.groupby('category').size().reset_index(name='count').sort_values('count', ascending=False).head(10)
-
-        fig_cat = px.bar(
-            category_low_sales,
-            x='count',
-            y='category',
-            orientation='h',
-            title='Top 10 Categories with Most Low-Sales Products',
-            labels={'count': 'Number of Products', 'category': 'Category'},
-            color='count',
-            color_continuous_scale='Reds'
-        )
-        fig_cat.update_layout(yaxis={'categoryorder': 'total ascending'})
-        st.plotly_chart(fig_cat, use_container_width=True)
+        st.plotly_chart(results['fig_cat'], use_container_width=True)
 
     with col2:
-        # Brand breakdown
-        brand_low_sales = low_sales_df.groupby('brand').size().reset_index(name='count').sort_values('count', ascending=False).head(10)
-
-        fig_brand = px.bar(
-            brand_low_sales,
-            x='count',
-            y='brand',
-            orientation='h',
-            title='Top 10 Brands with Most Low-Sales Products',
-            labels={'count': 'Number of Products', 'brand': 'Brand'},
-            color='count',
-            color_continuous_scale='Oranges'
-        )
-        fig_brand.update_layout(yaxis={'categoryorder': 'total ascending'})
-        st.plotly_chart(fig_brand, use_container_width=True)
+        st.plotly_chart(results['fig_brand'], use_container_width=True)
 
     # Sales distribution
     st.subheader("Sales Distribution")
+    st.plotly_chart(results['fig_dist'], use_container_width=True)
 
-    fig_dist = px.histogram(
-        low_sales_df,
-        x='total_sales_count',
-        nbins=20,
-        title=f'Distribution of Sales Count (Products with ≤{sales_threshold} sales)',
-        labels={'total_sales_count': 'Sales Count', 'count': 'Number of Products'},
-        color_discrete_sequence=['#FF6B6B']
-    )
-    st.plotly_chart(fig_dist, use_container_width=True)
-
-with tab2:
+elif active_view == 'return_rate':
     st.header("Return Rate Analysis")
     st.markdown("Identify products with quality or satisfaction issues")
 
@@ -261,9 +519,9 @@ with tab2:
             "Minimum Sales (to avoid statistical noise)",
             min_value=1,
             max_value=20,
-            value=5,
             step=1,
-            help="Only analyze products with at least this many sales"
+            help="Only analyze products with at least this many sales",
+            key='poor_min_sales_for_return'
         )
 
     with col2:
@@ -271,24 +529,20 @@ with tab2:
             "Return Rate Threshold (%)",
             min_value=5,
             max_value=50,
-            value=15,
-            step=5
+            step=5,
+            key='poor_return_threshold'
         )
 
-    # Filter products with sufficient sales and high return rate
-    high_return_df = product_stats[
-        (product_stats['total_sales_count'] >= min_sales_for_return) &
-        (product_stats['return_rate'] >= return_threshold)
-    ].copy()
+    results = view_results('return_rate', filter_key, (min_sales_for_return, return_threshold),
+                           lambda: return_rate_analysis(product_stats, min_sales_for_return, return_threshold,
+                                                        use_sketches))
 
-    high_return_df = high_return_df.sort_values('return_rate', ascending=False)
-
-    st.info(f"Found **{len(high_return_df):,}** products with ≥{min_sales_for_return} sales and ≥{return_threshold}% return rate")
+    st.info(f"Found **{len(results['df']):,}** products with ≥{min_sales_for_return} sales and ≥{return_threshold}% return rate")
 
     # Display table
     st.subheader("High Return Rate Products (Top 100)")
 
-    display_df = high_return_df.head(100)[['name', 'category', 'brand', 'department', 'total_sales_count', 'return_count', 'return_rate', 'total_revenue', 'avg_sale_price']]
+    display_df = results['df'].head(100)[['name', 'category', 'brand', 'department', 'total_sales_count', 'return_count', 'return_rate', 'total_revenue', 'avg_sale_price']]
 
     st.dataframe(
         display_df.style.format({
@@ -308,82 +562,20 @@ with tab2:
     col1, col2 = st.columns(2)
 
     with col1:
-        # Category return rate
-        category_returns = product_stats.groupby('category').agg({
-            'return_count': 'sum',
-            'total_sales_count': 'sum'
-        }).reset_index()
-        category_returns['return_rate'] = (category_returns['return_count'] / category_returns['total_sales_count'] * 100).round(2)
-        category_returns = category_returns.sort_values('return_rate', ascending=False).head(10)
-
-        fig_cat_return = px.bar(
-            category_returns,
-            x='return_rate',
-            y='category',
-            orientation='h',
-            title='Top 10 Categories by Return Rate',
-            labels={'return_rate': 'Return Rate (%)', 'category': 'Category'},
-            color='return_rate',
-            color_continuous_scale='Reds'
-        )
-        fig_cat_return.update_layout(yaxis={'categoryorder': 'total ascending'})
-        st.plotly_chart(fig_cat_return, use_container_width=True)
+        st.plotly_chart(results['fig_cat_return'], use_container_width=True)
 
     with col2:
-        # Brand return rate
-        brand_returns = product_stats.groupby('brand').agg({
-            'return_count': 'sum',
-            'total_sales_count': 'sum'
-        }).reset_index()
-        brand_returns['return_rate'] = (brand_returns['return_count'] / brand_returns['total_sales_count'] * 100).round(2)
-        brand_returns = brand_returns[brand_returns['total_sales_count'] >= 20]  # Filter brands with enough sales
-        brand_returns = brand_returns.sort_values('return_rate', ascending=False).head(10)
-
-        fig_brand_return = px.bar(
-            brand_returns,
-            x='return_rate',
-            y='brand',
-            orientation='h',
-            title='Top 10 Brands by Return Rate (min 20 sales)',
-            labels={'return_rate': 'Return Rate (%)', 'brand': 'Brand'},
-            color='return_rate',
-            color_continuous_scale='Oranges'
-        )
-        fig_brand_return.update_layout(yaxis={'categoryorder': 'total ascending'})
-        st.plotly_chart(fig_brand_return, use_container_width=True)
+        st.plotly_chart(results['fig_brand_return'], use_container_width=True)
 
     # Return rate distribution
     st.subheader("Return Rate Distribution")
-
-    fig_return_dist = px.histogram(
-        product_stats[product_stats['total_sales_count'] >= min_sales_for_return],
-        x='return_rate',
-        nbins=30,
-        title=f'Distribution of Return Rates (Products with ≥{min_sales_for_return} sales)',
-        labels={'return_rate': 'Return Rate (%)', 'count': 'Number of Products'},
-        color_discrete_sequence=['#FF6B6B']
-    )
-    st.plotly_chart(fig_return_dist, use_container_width=True)
+    st.plotly_chart(results['fig_return_dist'], use_container_width=True)
 
     # Scatter: Sales vs Return Rate
     st.subheader("Sales Volume vs Return Rate")
+    st.plotly_chart(results['fig_scatter'], use_container_width=True)
 
-    scatter_df = product_stats[product_stats['total_sales_count'] >= min_sales_for_return].copy()
-
-    fig_scatter = px.scatter(
-        scatter_df,
-        x='total_sales_count',
-        y='return_rate',
-        color='category',
-        size='total_revenue',
-        hover_data=['name', 'brand'],
-        title='Relationship between Sales Volume and Return Rate',
-        labels={'total_sales_count': 'Total Sales Count', 'return_rate': 'Return Rate (%)'},
-        opacity=0.6
-    )
-    st.plotly_chart(fig_scatter, use_container_width=True)
-
-with tab3:
+elif active_view == 'profit':
     st.header("Profit Analysis")
     st.markdown("Identify unprofitable or low-margin products")
 
@@ -393,7 +585,8 @@ with tab3:
     with col1:
         profit_filter = st.selectbox(
             "Show Products",
-            ["All Products", "Negative Profit", "Profit Margin < 10%", "Profit Margin < 20%"]
+            ["All Products", "Negative Profit", "Profit Margin < 10%", "Profit Margin < 20%"],
+            key='poor_profit_filter'
         )
 
     with col2:
@@ -401,28 +594,19 @@ with tab3:
             "Minimum Sales for Analysis",
             min_value=1,
             max_value=20,
-            value=5,
-            step=1
+            step=1,
+            key='poor_min_sales_profit'
         )
 
-    # Apply filters
-    profit_df = product_stats[product_stats['total_sales_count'] >= min_sales_profit].copy()
+    results = view_results('profit', filter_key, (profit_filter, min_sales_profit),
+                           lambda: profit_analysis(product_stats, profit_filter, min_sales_profit, use_sketches))
 
-    if profit_filter == "Negative Profit":
-        profit_df = profit_df[profit_df['total_profit'] < 0]
-    elif profit_filter == "Profit Margin < 10%":
-        profit_df = profit_df[profit_df['profit_margin'] < 10]
-    elif profit_filter == "Profit Margin < 20%":
-        profit_df = profit_df[profit_df['profit_margin'] < 20]
-
-    profit_df = profit_df.sort_values('total_profit', ascending=True)
-
-    st.info(f"Found **{len(profit_df):,}** products matching criteria")
+    st.info(f"Found **{len(results['df']):,}** products matching criteria")
 
     # Display table
     st.subheader("Low Profit Products (Top 100)")
 
-    display_df = profit_df.head(100)[['name', 'category', 'brand', 'total_sales_count', 'total_revenue', 'cost', 'avg_sale_price', 'profit_per_item', 'total_profit', 'profit_margin']]
+    display_df = results['df'].head(100)[['name', 'category', 'brand', 'total_sales_count', 'total_revenue', 'cost', 'avg_sale_price', 'profit_per_item', 'total_profit', 'profit_margin']]
 
     st.dataframe(
         display_df.style.format({
@@ -444,85 +628,111 @@ with tab3:
     col1, col2 = st.columns(2)
 
     with col1:
-        # Worst profit products
-        worst_profit = profit_df.head(20)
-
-        fig_profit = px.bar(
-            worst_profit,
-            x='total_profit',
-            y='name',
-            orientation='h',
-            title='Top 20 Products by Lowest Total Profit',
-            labels={'total_profit': 'Total Profit ($)', 'name': 'Product'},
-            color='total_profit',
-            color_continuous_scale='RdYlGn'
-        )
-        fig_profit.update_layout(yaxis={'categoryorder': 'total ascending'}, height=600)
-        st.plotly_chart(fig_profit, use_container_width=True)
+        st.plotly_chart(results['fig_profit'], use_container_width=True)
 
     with col2:
-        # Profit margin distribution
-        fig_margin = px.histogram(
-            product_stats[product_stats['total_sales_count'] >= min_sales_profit],
-            x='profit_margin',
-            nbins=40,
-            title=f'Profit Margin Distribution (Products with ≥{min_sales_profit} sales)',
-            labels={'profit_margin': 'Profit Margin (%)', 'count': 'Number of Products'},
-            color_discrete_sequence=['#4ECDC4']
+        st.plotly_chart(results['fig_margin'], use_container_width=True)
+        st.plotly_chart(results['fig_cat_profit'], use_container_width=True)
+
+else:
+    st.header("Sales Trend Analysis")
+    st.markdown("Identify products whose sales are declining, stalled or slow over the period")
+
+    # Filter options
+    col1, col2 = st.columns(2)
+
+    with col1:
+        trend_show = st.selectbox(
+            "Show Products",
+            ["Declining Sales", "Longest Zero-Sale Streak", "Days Since Last Sale", "Lowest Velocity"],
+            key='poor_trend_show'
         )
-        st.plotly_chart(fig_margin, use_container_width=True)
-
-        # Category profit
-        category_profit = product_stats.groupby('category').agg({
-            'total_profit': 'sum'
-        }).reset_index().sort_values('total_profit', ascending=True).head(10)
-
-        fig_cat_profit = px.bar(
-            category_profit,
-            x='total_profit',
-            y='category',
-            orientation='h',
-            title='Bottom 10 Categories by Total Profit',
-            labels={'total_profit': 'Total Profit ($)', 'category': 'Category'},
-            color='total_profit',
-            color_continuous_scale='Reds'
+
+    with col2:
+        trend_min_sales = st.slider(
+            "Minimum Sales in Period",
+            min_value=0,
+            max_value=20,
+            step=1,
+            help="0 includes products that did not sell at all in the period",
+            key='poor_trend_min_sales'
         )
-        fig_cat_profit.update_layout(yaxis={'categoryorder': 'total ascending'})
-        st.plotly_chart(fig_cat_profit, use_container_width=True)
 
-st.divider()
+    # Per-product window statistics from the cached product x day matrix,
+    # shared with other sessions through the live results cache
+    daily_sales = load_product_daily_sales()
 
-# Export section
-st.header("📥 Export Data")
+    def compute_trend_stats():
+        stats = daily_sales.products.join(daily_sales.window_stats(cutoff_date), on='product_id')
+        if selected_category != 'All':
+            stats = stats[stats['category'] == selected_category]
+        if selected_dept != 'All':
+            stats = stats[stats['department'] == selected_dept]
+        return stats.reset_index(drop=True)
 
-col1, col2, col3 = st.columns(3)
+    trend_stats = load_live_result('product_trends', compute_trend_stats, period=period_type,
+                                   category=selected_category, department=selected_dept)
+    results = view_results('trends', filter_key, (trend_show, trend_min_sales),
+                           lambda: sales_trend_analysis(trend_stats, daily_sales, cutoff_date, trend_show,
+                                                        trend_min_sales))
 
-with col1:
-    if st.button("Download Low Sales Products"):
-        csv = low_sales_df.to_csv(index=False)
-        st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name=f"low_sales_products_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
+    st.info(f"Found **{len(results['df']):,}** products with at least {trend_min_sales} sales in the period")
 
-with col2:
-    if st.button("Download High Return Products"):
-        csv = high_return_df.to_csv(index=False)
-        st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name=f"high_return_products_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
+    # Display table
+    st.subheader(f"{trend_show} (Top 100)")
 
-with col3:
-    if st.button("Download Low Profit Products"):
-        csv = profit_df.to_csv(index=False)
-        st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name=f"low_profit_products_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
+    display_df = results['df'].head(100)[['name', 'category', 'brand', 'department', 'sales', 'velocity', 'trend', 'early_sales', 'late_sales', 'change_pct', 'longest_gap', 'days_since_sale']]
+
+    st.dataframe(
+        display_df.style.format({
+            'sales': '{:,.0f}',
+            'velocity': '{:.3f}',
+            'trend': '{:+.3f}',
+            'early_sales': '{:,.0f}',
+            'late_sales': '{:,.0f}',
+            'change_pct': '{:+.1f}%',
+            'longest_gap': '{:,.0f}',
+            'days_since_sale': '{:,.0f}'
+        }, na_rep='-'),
+        column_config={
+            'velocity': st.column_config.NumberColumn(help="Items sold per day"),
+            'trend': st.column_config.NumberColumn(help="Change in items per day over 30 days (least-squares slope)"),
+            'change_pct': st.column_config.NumberColumn(help="Second half of the period against the first half"),
+            'longest_gap': st.column_config.NumberColumn(help="Longest run of days without a sale"),
+        },
+        use_container_width=True,
+        height=400
+    )
+
+    # Visualizations
+    st.subheader("Sales Trend Visualizations")
+
+    if results['fig_daily'] is not None:
+        st.plotly_chart(results['fig_daily'], use_container_width=True)
+    st.plotly_chart(results['fig_idle'], use_container_width=True)
+
+st.divider()
+
+# Export section: offers the analyses computed for the current filters
+st.header("📥 Export Data")
+
+exports = [
+    ('low_sales', "Download Low Sales Products", "low_sales_products"),
+    ('return_rate', "Download High Return Products", "high_return_products"),
+    ('profit', "Download Low Profit Products", "low_profit_products"),
+    ('trends', "Download Sales Trend Products", "sales_trend_products"),
+]
+
+for col, (view, label, file_prefix) in zip(st.columns(len(exports)), exports):
+    with col:
+        export_results = results if view == active_view else computed_results(view, filter_key)
+        if export_results is None:
+            st.button(label, disabled=True, help=f"Open {VIEWS[view]} to compute this export")
+        elif st.button(label):
+            csv = export_results['df'].to_csv(index=False)
+            st.download_button(
+                label="Download CSV",
+                data=csv,
+                file_name=f"{file_prefix}_{datetime.now().strftime('%Y%m%d')}.csv",
+                mime="text/csv"
+            )
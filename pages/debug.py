@@ -1,6 +1,15 @@
+import time
+
 import streamlit as st
 import pandas as pd
 
+from analytics.memory import cache_report, object_bytes, process_memory
+from analytics.persistent import persistent_cache
+from analytics.snapshot import (
+    load_data_version, load_line_items, load_orders, load_product_daily_sales, load_snapshot_tables
+)
+from analytics.sources import TABLES, SourceError, probe_tables, source_from_url
+
 st.title("データファイル読み込みテスト")
 
 # 存在しないファイルを読み込もうとする
@@ -8,4 +17,65 @@ try:
     df = pd.read_csv("missing_data.csv")
     st.dataframe(df)
 except Exception as e:
-    st.error(f"エラーが発生しました: {e}")
\ No newline at end of file
+    st.error(f"エラーが発生しました: {e}")
+
+# 設定中のデータソースに各テーブルがあるか確認する（テーブル本体はダウンロードしない）
+st.subheader("データソース接続テスト")
+source = source_from_url()
+st.write(f"データソース: `{source.describe()}`")
+
+start = time.perf_counter()
+probes = probe_tables(TABLES, source)
+elapsed = time.perf_counter() - start
+source.close()
+
+for table, result in probes.items():
+    if isinstance(result, (OSError, SourceError)):
+        st.error(f"{table}: 接続に失敗しました: {result}")
+    elif isinstance(result, Exception):
+        raise result
+    else:
+        size = "サイズ不明" if result is None else f"{result / 2**20:,.1f} MiB"
+        st.success(f"{table}: 接続できました ({size})")
+st.caption(f"確認時間: {elapsed:.2f} 秒（全テーブル並行）")
+
+# メモリ使用状況（プロセス全体・共有データ・結果キャッシュ）
+st.subheader("メモリ使用状況")
+
+def mib(value):
+    return "-" if value is None or pd.isna(value) else f"{value / 2**20:,.1f} MiB"
+
+auto_refresh = st.toggle("5秒ごとに自動更新")
+
+# 共有データは読み取り専用なので、サイズはデータのバージョンごとに一度だけ測る
+@st.cache_data(max_entries=1)
+def shared_data_sizes(data_version):
+    shared = {f"tables[{name}]": table for name, table in load_snapshot_tables().items()}
+    shared.update({"line_items": load_line_items(), "orders": load_orders(),
+                   "product_daily_sales": load_product_daily_sales()})
+    return pd.DataFrame({'データ': list(shared), 'サイズ': [mib(object_bytes(df)) for df in shared.values()]})
+
+@st.fragment(run_every=5 if auto_refresh else None)
+def memory_usage():
+    usage = process_memory()
+    col1, col2 = st.columns(2)
+    col1.metric("RSS", mib(usage['rss']))
+    col2.metric("ピーク RSS", mib(usage['peak_rss']))
+
+    # 全セッションで共有しているデータ
+    st.dataframe(shared_data_sizes(load_data_version()), hide_index=True)
+
+    # 結果キャッシュ（session はセッションごとの上限、件数・サイズは全セッションの合計）
+    report = cache_report()
+    for column in ['bytes', 'limit', 'evicted_bytes']:
+        report[column] = report[column].map(mib)
+    st.dataframe(report, hide_index=True, use_container_width=True)
+
+    # ディスクキャッシュ（再起動後も残る結果、件数・サイズは全プロセス共通、カウンタはこのプロセス分）
+    disk = persistent_cache()
+    disk_report = {'cache': str(disk.root), 'kind': 'disk', **disk.usage(), 'limit': disk.max_bytes, **vars(disk.stats)}
+    for column in ['bytes', 'limit', 'evicted_bytes']:
+        disk_report[column] = mib(disk_report[column])
+    st.dataframe(pd.DataFrame([disk_report]), hide_index=True, use_container_width=True)
+
+memory_usage()
@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from synthetic_data import generate_tables, write_tables  # noqa: E402
+
+from analytics.facts import build_line_items, build_orders  # noqa: E402
+from analytics.sources import TABLES, LocalFileSource, load_tables  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def synthetic_dir(tmp_path_factory):
+    """Directory of synthetic source CSVs, shaped like ``sample_data/``"""
+    directory = tmp_path_factory.mktemp("synthetic")
+    write_tables(generate_tables(50_000), directory)
+    return directory
+
+
+@pytest.fixture(scope="session")
+def synthetic_tables(synthetic_dir):
+    """The synthetic tables as the app loads them"""
+    return load_tables(TABLES, LocalFileSource(synthetic_dir))
+
+
+@pytest.fixture(scope="session")
+def line_items(synthetic_tables):
+    """The line item fact table of the synthetic tables"""
+    return build_line_items(synthetic_tables)
+
+
+@pytest.fixture(scope="session")
+def orders(synthetic_tables):
+    """The order fact table of the synthetic tables"""
+    return build_orders(synthetic_tables)
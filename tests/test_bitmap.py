@@ -0,0 +1,122 @@
+"""Bitmaps and bitmap indexes against pandas boolean masks"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.bitmap import Bitmap, BitmapIndex, materialize
+
+SIZES = [0, 1, 63, 64, 65, 127, 128, 1000]
+
+
+def random_mask(rng, size, density=0.3):
+    return rng.random(size) < density
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_from_range(size):
+    for start in range(0, size + 1, max(size // 7, 1)):
+        for stop in sorted({start, start + 1, start + 63, start + 64, start + 65, size}):
+            stop = min(stop, size)
+            expected = np.zeros(size, dtype=bool)
+            expected[start:stop] = True
+            bitmap = Bitmap.from_range(start, stop, size)
+            np.testing.assert_array_equal(bitmap.to_mask(), expected)
+            assert bitmap.count() == expected.sum()
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_positions_mask_and_invert(size):
+    rng = np.random.default_rng(size)
+    mask = random_mask(rng, size)
+    from_positions = Bitmap.from_positions(np.flatnonzero(mask), size)
+    from_mask = Bitmap.from_mask(mask)
+    np.testing.assert_array_equal(from_positions.words, from_mask.words)
+    np.testing.assert_array_equal(from_positions.to_mask(), mask)
+    np.testing.assert_array_equal(from_positions.positions(), np.flatnonzero(mask))
+    assert from_positions.count() == mask.sum()
+
+    # Negation must leave the padding bits of the last word clear
+    inverted = ~from_positions
+    np.testing.assert_array_equal(inverted.to_mask(), ~mask)
+    assert inverted.count() == size - mask.sum()
+    assert (~Bitmap.empty(size)).count() == size
+    assert (~Bitmap.full(size)).count() == 0
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_set_operations(size):
+    rng = np.random.default_rng(size + 1)
+    left, right = random_mask(rng, size), random_mask(rng, size, 0.6)
+    a, b = Bitmap.from_mask(left), Bitmap.from_mask(right)
+    np.testing.assert_array_equal((a & b).to_mask(), left & right)
+    np.testing.assert_array_equal((a | b).to_mask(), left | right)
+    probes = rng.integers(0, size, 50) if size else np.array([], dtype=np.int64)
+    assert a.count_at(probes) == left[probes].sum()
+
+
+def fact_frame(size, seed=0):
+    rng = np.random.default_rng(seed)
+    days = np.sort(rng.integers(0, 90, size))
+    return pd.DataFrame({
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(days, unit="D"),
+        # A skewed dimension so both dense and sparse entries are exercised
+        "status": rng.choice(["Complete", "Shipped", "Returned", "Cancelled"], size, p=[0.5, 0.3, 0.19, 0.01]),
+        "gender": rng.choice(["M", "F"], size),
+        "category": rng.choice([f"c{i:02d}" for i in range(40)], size),
+    })
+
+
+FILTER_CASES = [
+    ({}, None),
+    ({"status": "Returned"}, None),
+    ({"status": ["Complete", "Cancelled"], "gender": "F"}, None),
+    ({"category": ["c01", "c07", "missing"]}, ("2025-01-20", "2025-02-10")),
+    ({"gender": "M", "status": "Cancelled"}, (None, "2025-01-31")),
+    ({"category": "c03"}, ("2025-03-01", None)),
+    ({"status": "Unknown"}, None),
+    ({}, ("2025-05-01", "2025-06-01")),
+]
+
+
+def expected_mask(df, filters, date_range):
+    mask = np.ones(len(df), dtype=bool)
+    for dimension, accepted in filters.items():
+        accepted = accepted if isinstance(accepted, list) else [accepted]
+        mask &= df[dimension].isin(accepted).to_numpy()
+    if date_range:
+        start, end = date_range
+        if start is not None:
+            mask &= (df["date"] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            mask &= (df["date"] <= pd.Timestamp(end)).to_numpy()
+    return mask
+
+
+@pytest.mark.parametrize("size", [0, 63, 64, 65, 5000])
+@pytest.mark.parametrize("filters, date_range", FILTER_CASES)
+def test_index_select(size, filters, date_range):
+    df = fact_frame(size)
+    index = BitmapIndex(df, ["status", "gender", "category"], date_column="date")
+    mask = expected_mask(df, filters, date_range)
+    selection = index.select(filters, date_range)
+    np.testing.assert_array_equal(selection.to_mask(), mask)
+    pd.testing.assert_frame_equal(materialize(df, selection, ["category", "status"]),
+                                  df.loc[mask, ["category", "status"]].reset_index(drop=True))
+
+
+@pytest.mark.parametrize("filters, date_range", FILTER_CASES)
+def test_option_counts(filters, date_range):
+    df = fact_frame(5000, seed=1)
+    index = BitmapIndex(df, ["status", "gender", "category"], date_column="date")
+    for dimension in ["status", "gender", "category"]:
+        others = {k: v for k, v in filters.items() if k != dimension}
+        selected = df[expected_mask(df, others, date_range)]
+        expected = selected[dimension].value_counts().sort_index().rename("count").rename_axis(dimension)
+        pd.testing.assert_series_equal(index.option_counts(dimension, filters, date_range), expected,
+                                       check_dtype=False, check_index_type=False)
+
+
+def test_index_requires_sorted_dates():
+    df = fact_frame(100).iloc[::-1]
+    with pytest.raises(ValueError, match="sorted"):
+        BitmapIndex(df, ["status"], date_column="date")
@@ -0,0 +1,72 @@
+"""Cohort matrix against brute-force pandas over the orders"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.cohorts import CohortMatrix
+
+
+@pytest.fixture(scope="module")
+def cohorts(orders):
+    return CohortMatrix(orders)
+
+
+def brute_force_active(orders, filters):
+    """Cohort x offset counts of distinct active customers, by a group-by per customer"""
+    first = orders.drop_duplicates('user_id').set_index('user_id')
+    for dimension, accepted in filters.items():
+        first = first[first[dimension].isin(accepted)]
+    active = orders.loc[orders['user_id'].isin(first.index), ['user_id', 'year_month']].drop_duplicates()
+    cohort = orders.groupby('user_id')['year_month'].min()
+    active['cohort'] = active['user_id'].map(cohort)
+    active['offset'] = (active['year_month'] - active['cohort']).map(lambda offset: offset.n)
+    return active.groupby(['cohort', 'offset']).size()
+
+
+FILTERS = [{}, {'country': ['Japan']}, {'country': ['China', 'Spain'], 'traffic_source': ['Search', 'Email']}]
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_active_customers(orders, cohorts, filters):
+    active = cohorts.active_customers(filters)
+    expected = brute_force_active(orders, filters)
+    n_months = len(cohorts.months)
+    for i, cohort in enumerate(cohorts.months):
+        for offset in range(n_months):
+            value = active.iloc[i, offset]
+            if i + offset >= n_months:
+                # Past the last month of data
+                assert np.isnan(value)
+            else:
+                assert value == expected.get((cohort, offset), 0), (cohort, offset)
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_retention(orders, cohorts, filters):
+    expected = brute_force_active(orders, filters).unstack('offset', fill_value=0)
+    sizes, retention = cohorts.retention(filters)
+    assert list(sizes.index) == [str(cohort) for cohort in expected.index]
+    np.testing.assert_array_equal(sizes.to_numpy(), expected[0].to_numpy())
+    # Offsets past the last month are NaN, as checked above
+    rates = (expected.div(expected[0], axis=0) * 100).reindex(columns=retention.columns, fill_value=0)
+    rates.index = retention.index
+    pd.testing.assert_frame_equal(retention, rates.where(retention.notna()), check_dtype=False, check_names=False)
+
+    # Each offset of the curve weights the cohorts observed that long by their size
+    curve = cohorts.retention_curve(filters)
+    cohort_months = np.array([cohort.ordinal - cohorts.months[0].ordinal for cohort in expected.index])
+    for offset in range(len(cohorts.months)):
+        observed = cohort_months + offset < len(cohorts.months)
+        observed_sizes = expected[0][observed].sum()
+        active = expected[offset][observed].sum() if offset in expected else 0
+        assert curve[offset] == pytest.approx(active / observed_sizes * 100)
+
+
+def test_segment_counts(orders, cohorts):
+    first = orders.drop_duplicates('user_id')
+    expected = first['country'].value_counts().sort_index()
+    pd.testing.assert_series_equal(cohorts.segment_counts('country'), expected,
+                                   check_names=False, check_dtype=False)
+    japan = first[first['country'] == 'Japan']['traffic_source'].value_counts().sort_index()
+    pd.testing.assert_series_equal(cohorts.segment_counts('traffic_source', {'country': ['Japan']}), japan,
+                                   check_names=False, check_dtype=False)
@@ -0,0 +1,71 @@
+"""Bitmap-indexed filters against chained boolean-mask filtering"""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from analytics import metrics
+from analytics.facts import build_line_item_index, build_order_index
+
+
+@pytest.fixture(scope="module")
+def line_item_index(line_items):
+    return build_line_item_index(line_items)
+
+
+@pytest.fixture(scope="module")
+def order_index(orders):
+    return build_order_index(orders)
+
+
+def mask_filter(df, start_date=None, end_date=None, **filters):
+    """The pages' original filtering: one boolean mask per active filter"""
+    filtered_df = df
+    for column, value in filters.items():
+        if value != 'All':
+            filtered_df = filtered_df[filtered_df[column] == value]
+    if start_date is not None:
+        filtered_df = filtered_df[filtered_df['created_at'].dt.date >= start_date]
+    if end_date is not None:
+        filtered_df = filtered_df[filtered_df['created_at'].dt.date <= end_date]
+    return filtered_df.reset_index(drop=True)
+
+
+LINE_ITEM_CASES = [
+    {},
+    {'status': 'Returned'},
+    {'status': 'Complete', 'gender': 'F'},
+    {'status': 'Shipped', 'gender': 'M', 'start_date': date(2025, 1, 1), 'end_date': date(2025, 3, 31)},
+    {'category': 'Jeans', 'start_date': date(2025, 5, 16)},
+    {'category': 'Jeans', 'department': 'Men', 'end_date': date(2025, 2, 28)},
+    {'status': 'Cancelled', 'gender': 'F', 'category': 'Accessories', 'department': 'Women',
+     'start_date': date(2024, 6, 1), 'end_date': date(2025, 6, 30)},
+    {'category': 'No Such Category'},
+    {'start_date': date(2030, 1, 1)},
+]
+
+
+@pytest.mark.parametrize('filters', LINE_ITEM_CASES)
+def test_filter_line_items(line_items, line_item_index, filters):
+    expected = mask_filter(line_items, **filters)[metrics.LINE_ITEM_COLUMNS]
+    result = metrics.filter_line_items(line_items, line_item_index, **filters)
+    pd.testing.assert_frame_equal(result, expected)
+    assert metrics.count_line_items(line_item_index, **filters) == len(expected)
+
+
+@pytest.mark.parametrize('countries, traffic_sources', [
+    (None, None),
+    (['Japan'], None),
+    (['Japan', 'Spain', 'Brasil'], ['Search', 'Email']),
+    (None, ['Facebook']),
+    ([], None),
+])
+def test_filter_orders(orders, order_index, countries, traffic_sources):
+    expected = orders
+    if countries is not None:
+        expected = expected[expected['country'].isin(countries)]
+    if traffic_sources is not None:
+        expected = expected[expected['traffic_source'].isin(traffic_sources)]
+    expected = expected[metrics.ORDER_COLUMNS].reset_index(drop=True)
+    result = metrics.filter_orders(orders, order_index, countries, traffic_sources)
+    pd.testing.assert_frame_equal(result, expected)
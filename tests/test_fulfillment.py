@@ -0,0 +1,54 @@
+"""Latency histograms against exact percentiles"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.fulfillment import LATENCIES, MAX_BINS, LatencyHistograms
+
+
+@pytest.fixture(scope="module")
+def late_return_orders(orders):
+    """The orders with one return arriving 8,000 hours after delivery"""
+    orders = orders.copy()
+    returned = orders.index[orders['delivered_at'].notna()][0]
+    orders.loc[returned, 'returned_at'] = orders.loc[returned, 'delivered_at'] + pd.Timedelta(hours=8_000)
+    return orders
+
+
+def exact_hours(orders, latency):
+    start, end, _ = LATENCIES[latency]
+    return ((orders[end] - orders[start]).dropna() / pd.Timedelta(hours=1)).to_numpy()
+
+
+def test_bins_are_sized_per_latency(late_return_orders):
+    histograms = LatencyHistograms(late_return_orders)
+    assert histograms.bin_hours['return'] >= 8_000 / MAX_BINS
+    for latency in ['ship', 'delivery']:
+        longest = exact_hours(late_return_orders, latency).max()
+        assert histograms.bin_hours[latency] == max(1, int(np.ceil((longest + 1) / MAX_BINS)))
+        assert histograms.edges[latency][-1] > longest
+
+
+@pytest.mark.parametrize('latency', list(LATENCIES))
+@pytest.mark.parametrize('filters', [{}, {'country': ['China', 'Japan'], 'status': ['Complete', 'Returned']}])
+def test_summary_within_one_bin(late_return_orders, latency, filters):
+    histograms = LatencyHistograms(late_return_orders)
+    orders = late_return_orders
+    for dimension, accepted in filters.items():
+        orders = orders[orders[dimension].isin(accepted)]
+    hours = exact_hours(orders, latency)
+    summary = histograms.summary(latency, filters).iloc[0]
+    assert summary['count'] == len(hours)
+    assert summary['mean'] == pytest.approx(np.maximum(hours, 0).mean())
+    for p in (50, 90, 99):
+        assert abs(summary[f'p{p}'] - np.percentile(hours, p)) <= histograms.bin_hours[latency]
+    assert histograms.histogram(latency, filters).sum() == len(hours)
+
+
+def test_summary_by_segment(late_return_orders):
+    histograms = LatencyHistograms(late_return_orders)
+    by_status = histograms.summary('ship', by='status')
+    expected = late_return_orders.dropna(subset=['shipped_at']).groupby('status').size()
+    # Statuses whose orders never shipped count zero
+    expected = expected.reindex(by_status.index, fill_value=0).rename('count')
+    pd.testing.assert_series_equal(by_status['count'], expected, check_dtype=False)
@@ -0,0 +1,102 @@
+"""Materialized results store and the batch job that fills it"""
+import os
+
+import pandas as pd
+import pytest
+
+from analytics import batch, metrics
+from analytics.facts import build_line_item_index
+from analytics.materialized import MaterializedStore, data_version
+from analytics.periods import get_period_dates
+
+RESULT = pd.DataFrame({"category": ["Jeans", "Tops"], "Total Sales": [120.5, 80.25]})
+
+
+def test_store_round_trip(tmp_path):
+    store = MaterializedStore("v1", root=tmp_path)
+    assert store.read("category_metrics", period="All Time") is None
+    store.write("category_metrics", RESULT, period="All Time")
+    pd.testing.assert_frame_equal(store.read("category_metrics", period="All Time"), RESULT)
+    assert store.read("category_metrics", period="Last Month") is None
+    assert not list(store.path.rglob("*.tmp"))
+
+
+def test_store_ignores_unreadable_result(tmp_path):
+    store = MaterializedStore("v1", root=tmp_path)
+    store.write("category_metrics", RESULT, period="All Time")
+    store._result_path("category_metrics", {"period": "All Time"}).write_bytes(b"not parquet")
+    assert store.read("category_metrics", period="All Time") is None
+
+
+def test_store_is_keyed_by_data_and_code_version(tmp_path):
+    MaterializedStore("v1", root=tmp_path, code="c1").write("category_metrics", RESULT, period="All Time")
+    assert MaterializedStore("v2", root=tmp_path, code="c1").read("category_metrics", period="All Time") is None
+    assert MaterializedStore("v1", root=tmp_path, code="c2").read("category_metrics", period="All Time") is None
+    assert MaterializedStore("v1", root=tmp_path, code="c1").read("category_metrics", period="All Time") is not None
+
+
+def test_prune_keeps_recent_versions(tmp_path):
+    for age, version in enumerate(["v4", "v3", "v2", "v1"]):
+        store = MaterializedStore(version, root=tmp_path, code="c")
+        store.write_manifest({"version": version})
+        os.utime(store.path, (1_000_000 - age, 1_000_000 - age))
+    current = MaterializedStore("v1", root=tmp_path, code="c")
+    assert sorted(current.prune(keep=2)) == ["v2-c", "v3-c"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["v1-c", "v4-c"]
+    assert current.manifest() == {"version": "v1"}
+
+
+@pytest.fixture(scope="module")
+def facts(line_items):
+    return {
+        "line_items": line_items,
+        "index": build_line_item_index(line_items),
+        "max_date": line_items["created_at"].max().date(),
+    }
+
+
+@pytest.fixture
+def few_presets(monkeypatch):
+    monkeypatch.setattr(batch, "LOOKBACK_PRESETS", ["All Time", "Last 30 Days"])
+    monkeypatch.setattr(batch, "PERIOD_PRESETS", ["Last Month"])
+
+
+def test_report_jobs_cover_combinations_with_data(facts, few_presets):
+    jobs = list(batch.report_jobs(facts))
+    line_items, max_date = facts["line_items"], facts["max_date"]
+
+    expected = set()
+    for period in ["All Time", "Last 30 Days"]:
+        start_date, _ = get_period_dates(period, max_date)
+        rows = line_items if start_date is None else line_items[line_items["created_at"].dt.date >= start_date]
+        combos = {("All", "All")}
+        combos |= {(c, "All") for c in rows["category"].dropna()}
+        combos |= {("All", d) for d in rows["department"].dropna()}
+        combos |= set(zip(rows["category"].dropna(), rows["department"].dropna()))
+        expected |= {("poor_performance", period, c, d) for c, d in combos}
+    start_date, end_date = get_period_dates("Last Month", max_date)
+    rows = line_items[line_items["created_at"].dt.date.between(start_date, end_date)]
+    combos = {("All", "All")} | {(s, "All") for s in rows["status"]} | {("All", g) for g in rows["gender"]}
+    combos |= set(zip(rows["status"], rows["gender"]))
+    expected |= {("category_analysis", "Last Month", s, g) for s, g in combos}
+
+    assert {(report, *params.values()) for report, params in jobs} == expected
+    assert len(jobs) == len(expected)
+
+
+def test_run_batch_matches_live_metrics(synthetic_tables, facts, few_presets, tmp_path):
+    manifest = batch.run_batch(synthetic_tables, workers=1, store_root=tmp_path)
+    assert sum(manifest["reports"].values()) == len(list(batch.report_jobs(facts)))
+
+    store = MaterializedStore(data_version(synthetic_tables), root=tmp_path)
+    assert store.manifest()["version"] == manifest["version"]
+    start_date, end_date = get_period_dates("Last Month", facts["max_date"])
+    filtered_df = metrics.filter_line_items(facts["line_items"], facts["index"], start_date, end_date,
+                                            status="Returned", gender="F")
+    stored = store.read("category_metrics", period="Last Month", status="Returned", gender="F")
+    pd.testing.assert_frame_equal(stored, metrics.category_metrics(filtered_df))
+
+    start_date, _ = get_period_dates("Last 30 Days", facts["max_date"])
+    filtered_df = metrics.filter_line_items(facts["line_items"], facts["index"], start_date, category="Jeans")
+    stored = store.read("product_stats", period="Last 30 Days", category="Jeans", department="All")
+    pd.testing.assert_frame_equal(stored, metrics.product_stats(filtered_df))
@@ -0,0 +1,40 @@
+"""Partitioned aggregation against a serial pandas group-by"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import metrics, parallel
+from analytics.parallel import partitioned_agg
+
+
+@pytest.fixture
+def partitioned(monkeypatch):
+    """Split even small tables into several partitions"""
+    monkeypatch.setattr(parallel, 'PARALLEL_MIN_ROWS', 1)
+
+
+@pytest.mark.parametrize('by', ['category', 'department', 'product_id', ['date', 'category'], 'brand'])
+def test_matches_groupby(line_items, partitioned, by):
+    aggregations = {'sale_price': ['sum', 'mean', 'count'], 'id_order': 'count'}
+    expected = line_items.groupby(by).agg(aggregations)
+    for workers in (1, 4):
+        result = partitioned_agg(line_items, by, aggregations, workers=workers)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+
+
+def test_missing_values(partitioned):
+    df = pd.DataFrame({'key': ['b', 'a', None, 'a', 'b', 'c'], 'value': [1.0, np.nan, 5.0, 2.0, 3.0, np.nan]})
+    aggregations = {'value': ['sum', 'count', 'mean']}
+    expected = df.groupby('key').agg(aggregations)
+    pd.testing.assert_frame_equal(partitioned_agg(df, 'key', aggregations, workers=3), expected)
+
+
+def test_parallel_metrics_equal_serial(line_items, partitioned, monkeypatch):
+    monkeypatch.setattr(parallel, 'WORKERS', 4)
+    parallel_results = [metrics.category_metrics(line_items), metrics.department_metrics(line_items),
+                        metrics.daily_category_sales(line_items), metrics.product_stats(line_items)]
+    monkeypatch.setattr(parallel, 'WORKERS', 1)
+    serial_results = [metrics.category_metrics(line_items), metrics.department_metrics(line_items),
+                      metrics.daily_category_sales(line_items), metrics.product_stats(line_items)]
+    for parallel_result, serial_result in zip(parallel_results, serial_results):
+        pd.testing.assert_frame_equal(parallel_result, serial_result)
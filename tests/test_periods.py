@@ -0,0 +1,32 @@
+"""Period presets"""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from analytics.periods import COMPARE_PRESETS, LOOKBACK_PRESETS, get_period_dates, resolve_periods
+
+
+@pytest.mark.parametrize("days", [7, 30, 60, 90])
+def test_last_n_days_cover_n_days(days):
+    start, end = get_period_dates(f"Last {days} Days", date(2025, 7, 14))
+    assert end == date(2025, 7, 14)
+    assert (end - start).days + 1 == days
+
+
+def test_calendar_presets():
+    periods = resolve_periods(date(2025, 5, 20), COMPARE_PRESETS)
+    assert periods.loc['This Month', 'start'].date() == date(2025, 5, 1)
+    assert periods.loc['Last Month', 'end'].date() == date(2025, 4, 30)
+    assert periods.loc['Last Quarter', 'start'].date() == date(2025, 1, 1)
+    assert periods.loc['Last Year', 'end'].date() == date(2024, 12, 31)
+    assert periods.loc['All Time'].isna().all()
+
+
+def test_lookback_presets_match_compare_presets():
+    reference = date(2025, 7, 14)
+    compared = resolve_periods(reference, COMPARE_PRESETS)
+    for preset in LOOKBACK_PRESETS:
+        start, _ = get_period_dates(preset, reference)
+        expected = compared.loc[preset, 'start']
+        assert (start is None and expected is pd.NaT) or start == expected.date()
@@ -0,0 +1,95 @@
+"""Persistent result cache keys, eviction and lock files"""
+import importlib.util
+import threading
+import time
+
+import pytest
+
+from analytics import persistent
+from analytics.persistent import PersistentCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_versions():
+    persistent._file_version.cache_clear()
+
+
+def load_module(path, body):
+    path.write_text(body)
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_key_changes_with_compute_source(tmp_path):
+    cache = PersistentCache(tmp_path / "cache", max_bytes=1 << 20)
+    page = tmp_path / "page.py"
+    first = load_module(page, "def compute():\n    return 1\n")
+    assert cache.get_or_compute("report", "v1", first.compute) == 1
+    # Same name, data and parameters, but the page's code changed
+    second = load_module(page, "def compute():\n    return 2  # fixed\n")
+    assert cache.get_or_compute("report", "v1", second.compute) == 2
+    assert cache.stats.misses == 2
+    assert cache.get_or_compute("report", "v1", second.compute) == 2
+    assert cache.stats.hits == 1
+
+
+def stems(cache, suffix):
+    return {path.stem for path in cache.root.glob(f"*/*{suffix}")}
+
+
+def test_eviction_removes_orphan_lock_files(tmp_path):
+    cache = PersistentCache(tmp_path / "cache", max_bytes=2500)
+    for i in range(5):
+        cache.get_or_compute("report", "v1", lambda: b"x" * 1000, i=i)
+    assert cache.stats.evictions > 0
+    assert cache.usage()["bytes"] <= cache.max_bytes
+    assert stems(cache, ".lock") == stems(cache, ".pkl")
+
+
+@pytest.mark.skipif(persistent.fcntl is None, reason="lock files need fcntl")
+def test_eviction_keeps_held_lock_files(tmp_path):
+    cache = PersistentCache(tmp_path / "cache", max_bytes=2500)
+    cache.get_or_compute("report", "v1", lambda: b"x" * 1000, i=0)
+    held = cache.root / "ab" / "held.lock"
+    orphan = cache.root / "ab" / "orphan.lock"
+    held.parent.mkdir(exist_ok=True)
+    orphan.touch()
+    with persistent._file_lock(held):
+        cache.evict()
+        assert held.exists() and not orphan.exists()
+    assert stems(cache, ".pkl") <= stems(cache, ".lock")
+
+
+@pytest.mark.skipif(persistent.fcntl is None, reason="lock files need fcntl")
+def test_waiter_relocks_deleted_lock_file(tmp_path):
+    path = tmp_path / "entry.lock"
+    held = []
+    with open(path, "a") as lock_file:
+        persistent.fcntl.flock(lock_file, persistent.fcntl.LOCK_EX)
+
+        def wait():
+            with persistent._file_lock(path):
+                # Locked on the file now at the path, so eviction cannot delete it
+                held.append(path.exists() and not persistent._remove_lock(path))
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        time.sleep(0.2)
+        # Deleted by eviction while the waiter is blocked on it
+        path.unlink()
+    waiter.join(timeout=5)
+    assert held == [True]
+
+
+def test_lists_directory_only_when_over_limit(tmp_path, monkeypatch):
+    cache = PersistentCache(tmp_path / "cache", max_bytes=10_000)
+    listings = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: listings.append(1) or entries())
+    for i in range(20):
+        cache.get_or_compute("report", "v1", lambda: b"x" * 1000, i=i)
+    # The first write learns the usage; later ones only list once the total passes the limit
+    assert 1 < len(listings) < 10
+    assert cache.usage()["bytes"] <= cache.max_bytes
@@ -0,0 +1,91 @@
+"""Peak memory allocated per page rerun
+
+Each page runs once to warm the shared caches, then reruns under tracemalloc.
+Before every measured rerun a sidebar filter changes and the result caches
+(live, per-session and on disk) are emptied, so the rerun filters the facts
+and aggregates them again rather than reading a cached result. With the
+cached snapshot shared read-only, a rerun should only allocate its filtered
+rows and results, never a copy of the line-item fact table, so the peak of
+every rerun must stay under ``BUDGET`` times the table's size.
+"""
+import tracemalloc
+
+import pytest
+import streamlit as st
+from app_pages import PAGES, ROOT
+from streamlit.testing.v1 import AppTest
+
+from analytics import memory
+from analytics.facts import build_line_items
+from analytics.persistent import persistent_cache
+
+# Allowed peak per rerun, as a fraction of the fact table
+BUDGET = 0.5
+RERUNS = 2
+
+# Sidebar filter set to a new value before each measured rerun
+FILTER_CHANGES = {
+    'pages/Analytics.py': ('multiselect', 'Select Countries', [['Japan'], ['Spain', 'Brasil']]),
+    'pages/Category_Analysis.py': ('selectbox', 'Select Period', ['Last Month', 'Last 30 Days']),
+    'pages/Cohort_Retention.py': ('multiselect', 'Select Countries', [['Japan'], ['Spain', 'Brasil']]),
+    'pages/Fulfillment.py': ('multiselect', 'Select Countries', [['Japan'], ['Spain', 'Brasil']]),
+    'pages/Poor_Performance_Analysis.py': ('selectbox', 'Select Period', ['Last 60 Days', 'Last 90 Days']),
+}
+
+
+@pytest.fixture(scope="module")
+def table_bytes(synthetic_tables):
+    return int(build_line_items(synthetic_tables).memory_usage(deep=True).sum())
+
+
+@pytest.fixture(scope="module")
+def synthetic_app(synthetic_dir, tmp_path_factory):
+    """Point the app's data source and disk cache at the synthetic data"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DATA_SOURCE_URL", str(synthetic_dir))
+        patch.setenv("DISK_CACHE_DIR", str(tmp_path_factory.mktemp("results")))
+        patch.setenv("MATERIALIZED_DIR", str(tmp_path_factory.mktemp("materialized")))
+        persistent_cache.cache_clear()
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        yield
+        persistent_cache.cache_clear()
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+
+def change_filter(app, page, rerun):
+    if page not in FILTER_CHANGES:
+        return
+    kind, label, values = FILTER_CHANGES[page]
+    widget = next(widget for widget in getattr(app.sidebar, kind) if widget.label == label)
+    widget.set_value(values[rerun % len(values)])
+
+
+def drop_results():
+    """Empty the result caches, keeping the shared snapshot"""
+    memory.shared_cache('live_results').clear()
+    for caches in list(memory._session_caches.values()):
+        for cache in list(caches):
+            cache.clear()
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_rerun_peak_memory(synthetic_app, table_bytes, page, monkeypatch):
+    app = AppTest.from_file(str(ROOT / page), default_timeout=300).run()
+    assert not app.exception, app.exception[0].value
+    # Results are computed, not read back from disk, in the measured reruns
+    monkeypatch.setattr(persistent_cache(), 'max_bytes', 0)
+    peaks = []
+    for rerun in range(RERUNS):
+        change_filter(app, page, rerun)
+        drop_results()
+        tracemalloc.start()
+        app.run()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert not app.exception, app.exception[0].value
+    assert max(peaks) <= table_bytes * BUDGET, (
+        f"{page}: rerun peak {max(peaks) / 2**20:.1f} MiB over {BUDGET:.0%} of the "
+        f"{table_bytes / 2**20:.1f} MiB fact table"
+    )
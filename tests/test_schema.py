@@ -0,0 +1,66 @@
+"""Cents conversion and compact column types against plain Python"""
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic_data import generate_tables
+
+from analytics.schema import MONEY_COLUMNS, TABLE_SCHEMA, apply_schema, dollars, to_cents
+
+
+@pytest.fixture(scope="module")
+def raw_tables():
+    """Source tables before ``apply_schema``, with the sources' float64 dollars and int64 ids"""
+    return generate_tables(2_000)
+
+
+def test_cents_of_float32_prices():
+    # Prices stored as float32 upstream come back as float64 artifacts such as 5.949999809265137
+    cents = np.random.default_rng(0).integers(-100_000, 100_000, 10_000)
+    prices = (cents / 100).astype(np.float32).astype(np.float64)
+    converted = to_cents(prices)
+    assert converted.dtype == np.int32
+    np.testing.assert_array_equal(converted.to_numpy(), cents)
+    assert to_cents([5.949999809265137, 0.125, 0.135]).tolist() == [595, 12, 14]
+
+
+def test_cents_outside_int32():
+    assert to_cents([30_000_000.0, 1.5]).dtype == np.int64
+    assert to_cents([]).dtype == np.int32
+
+
+def test_cents_with_missing_values():
+    converted = to_cents([1.005, np.nan, 5.949999809265137])
+    assert converted.dtype == np.float64
+    np.testing.assert_array_equal(converted.to_numpy(), [100, np.nan, 595])
+
+
+def test_apply_schema(raw_tables):
+    compacted = apply_schema(raw_tables)
+    for name, df in raw_tables.items():
+        for column, kind in TABLE_SCHEMA[name].items():
+            values = compacted[name][column]
+            if kind == 'money':
+                assert column in MONEY_COLUMNS
+                assert values.dtype == np.int32
+                assert values.tolist() == [round(value * 100) for value in df[column]]
+                np.testing.assert_allclose(dollars(values), df[column], atol=0.005)
+            else:
+                assert values.dtype == (np.int32 if kind == 'id' else np.int8)
+                assert values.tolist() == df[column].tolist()
+        # Untyped columns are shared, and the source tables are left as they were
+        untyped = [column for column in df if column not in TABLE_SCHEMA[name]]
+        pd.testing.assert_frame_equal(compacted[name][untyped], df[untyped])
+        assert compacted[name].columns.tolist() == df.columns.tolist()
+    assert raw_tables['order_items']['sale_price'].dtype == np.float64
+
+
+def test_apply_schema_keeps_missing_values():
+    items = pd.DataFrame({'id': [1, 2, 3], 'product_id': [10.0, np.nan, 12.0], 'sale_price': [9.99, np.nan, 0.5]})
+    compacted = apply_schema({'order_items': items, 'other': items})
+    # Tables without a schema are passed through
+    assert compacted['other'] is items
+    compacted = compacted['order_items']
+    assert compacted['id'].dtype == np.int32
+    # Missing ids stay float; missing money stays float, in cents
+    pd.testing.assert_series_equal(compacted['product_id'], items['product_id'])
+    np.testing.assert_array_equal(compacted['sale_price'].to_numpy(), [999, np.nan, 50])
@@ -0,0 +1,67 @@
+"""Metrics HTTP endpoint status codes"""
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from analytics.server import MetricsService, make_handler
+
+
+@pytest.fixture(scope="module")
+def service(synthetic_tables):
+    return MetricsService(synthetic_tables)
+
+
+@pytest.fixture
+def base_url(service):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url):
+    try:
+        with urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_metrics(base_url):
+    status, body = get(f"{base_url}/category_metrics?period=Last%2030%20Days&gender=F")
+    assert status == 200
+    assert "Total Sales" in body["columns"] and body["data"]
+
+
+def test_unknown_endpoint(base_url):
+    status, body = get(f"{base_url}/missing_metrics")
+    assert status == 404
+    assert "Unknown endpoint" in body["error"]
+
+
+def test_invalid_parameter(base_url):
+    status, _ = get(f"{base_url}/product_stats?start_date=not-a-date")
+    assert status == 400
+
+
+def test_unknown_period(base_url):
+    status, body = get(f"{base_url}/category_metrics?period=Last%207%20Dayz")
+    assert status == 400
+    assert "Last 7 Dayz" in body["error"]
+
+
+def test_failure_inside_metric(base_url, service, monkeypatch):
+    def broken(params):
+        raise KeyError('missing_column')
+
+    monkeypatch.setitem(service.endpoints, 'department_metrics', broken)
+    status, body = get(f"{base_url}/department_metrics")
+    assert status == 500
+    assert "department_metrics" in body["error"]
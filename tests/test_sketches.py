@@ -0,0 +1,52 @@
+"""Sketches against exact counts"""
+import numpy as np
+import pandas as pd
+
+from analytics import metrics
+from analytics.sketches import SpaceSaving, build_sales_sketches
+
+
+def zipf_stream(seed, size=20_000, keys=500):
+    rng = np.random.default_rng(seed)
+    return rng.zipf(1.3, size) % keys
+
+
+def check_overestimates(sketch, stream):
+    exact = pd.Series(stream).value_counts()
+    for key, count in sketch.counts.items():
+        true = exact.get(key, 0)
+        assert count - sketch.errors[key] <= true <= count
+        assert sketch.errors[key] <= sketch.error_bound()
+    # Keys the sketch dropped weigh no more than the lightest key it kept
+    untracked = exact.drop(list(sketch.counts))
+    assert untracked.empty or untracked.max() <= min(sketch.counts.values())
+
+
+def test_space_saving_overestimates():
+    stream = zipf_stream(0)
+    sketch = SpaceSaving(50)
+    for start in range(0, len(stream), 1000):
+        sketch.update(stream[start:start + 1000])
+    check_overestimates(sketch, stream)
+
+
+def test_space_saving_merge_keeps_guarantee():
+    left, right = zipf_stream(1), zipf_stream(2) + 7
+    merged = SpaceSaving(50)
+    merged.update(left)
+    other = SpaceSaving(50)
+    other.update(right)
+    merged.merge(other)
+    assert merged.total == len(left) + len(right)
+    check_overestimates(merged, np.concatenate([left, right]))
+
+
+def test_sales_summary_matches_exact_metrics(line_items):
+    sketches = build_sales_sketches(line_items, chunk_size=10_000)
+    # Fewer categories and departments than the sketches' capacity, so the answers are exact
+    exact = metrics.category_metrics(line_items)
+    summary = sketches.summary('category')
+    pd.testing.assert_frame_equal(summary, exact.rename_axis('category'), check_dtype=False, check_like=True)
+    exact = metrics.department_metrics(line_items)
+    summary = sketches.summary('department')[['Total Sales', 'Order Count']]
+    pd.testing.assert_frame_equal(summary, exact, check_dtype=False)
@@ -0,0 +1,199 @@
+"""Data sources against a local HTTP server and SQLite"""
+import asyncio
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from analytics.sources import ObjectStoreSource, SourceError, SQLSource, TransientSourceError, probe_tables
+
+ORDERS = pd.DataFrame({"order_id": [1, 2, 3], "status": ["Complete", "Returned", "Shipped"]})
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    """Serves ``server.objects`` with ETags, failing the first ``server.failures`` requests"""
+
+    def do_HEAD(self):
+        body = self.server.objects.get(self.path)
+        self.send_response(404 if body is None else 200)
+        self.send_header("Content-Length", str(0 if body is None else len(body)))
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        if server.failures:
+            server.failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = server.objects.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{hash(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def store():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StoreHandler)
+    server.objects = {"/bucket/orders.csv": ORDERS.to_csv(index=False).encode()}
+    server.requests = []
+    server.failures = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def http_source(server, tmp_path, **kwargs):
+    host, port = server.server_address
+    return ObjectStoreSource(f"http://{host}:{port}/bucket", backoff=0, cache_dir=tmp_path / "cache", **kwargs)
+
+
+def test_http_fetch(store, tmp_path):
+    source = http_source(store, tmp_path)
+    pd.testing.assert_frame_equal(asyncio.run(source.fetch("orders")), ORDERS)
+    source.close()
+
+
+def test_http_retries_server_errors(store, tmp_path):
+    store.failures = 2
+    source = http_source(store, tmp_path, retries=3)
+    pd.testing.assert_frame_equal(asyncio.run(source.fetch("orders")), ORDERS)
+    assert len(store.requests) == 3
+    source.close()
+
+
+def test_http_gives_up_after_retries(store, tmp_path):
+    store.failures = 10
+    source = http_source(store, tmp_path, retries=2)
+    with pytest.raises(TransientSourceError):
+        asyncio.run(source.fetch("orders"))
+    assert len(store.requests) == 3
+    source.close()
+
+
+def test_http_missing_object_is_not_retried(store, tmp_path):
+    source = http_source(store, tmp_path, retries=3)
+    with pytest.raises(SourceError):
+        asyncio.run(source.fetch("users"))
+    assert len(store.requests) == 1
+    source.close()
+
+
+def test_http_revalidates_cached_copy(store, tmp_path):
+    source = http_source(store, tmp_path)
+    asyncio.run(source.fetch("orders"))
+    cached, etag = source._cache_paths("orders")
+    assert cached.read_bytes() == store.objects["/bucket/orders.csv"]
+    # A 304 answer is served from the cached copy
+    pd.testing.assert_frame_equal(asyncio.run(source.fetch("orders")), ORDERS)
+    assert etag.exists()
+    source.close()
+
+
+def test_http_serves_cached_copy_when_unreachable(store, tmp_path):
+    source = http_source(store, tmp_path, retries=1)
+    asyncio.run(source.fetch("orders"))
+    store.failures = 10
+    pd.testing.assert_frame_equal(asyncio.run(source.fetch("orders")), ORDERS)
+    source.close()
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "shop.db"
+    with sqlite3.connect(path) as conn:
+        ORDERS.to_sql("orders", conn, index=False)
+    return path
+
+
+class Connector:
+    """Counts the connections a source opens"""
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+
+
+def test_sql_fetch(database):
+    source = SQLSource(Connector(database), cache_dir=None)
+    pd.testing.assert_frame_equal(asyncio.run(source.fetch("orders")), ORDERS)
+    source.close()
+
+
+def test_sql_missing_table_is_not_retried(database):
+    connect = Connector(database)
+    source = SQLSource(connect, retries=3, backoff=0, cache_dir=None)
+    with pytest.raises(SourceError, match="no such table"):
+        asyncio.run(source.fetch("users"))
+    assert connect.opened == 1
+    source.close()
+
+
+def test_sql_retries_locked_database(database):
+    connect = Connector(database, timeout=0)
+    source = SQLSource(connect, retries=2, backoff=0, cache_dir=None)
+    writer = sqlite3.connect(database)
+    writer.execute("BEGIN EXCLUSIVE")
+    try:
+        with pytest.raises(TransientSourceError, match="locked"):
+            asyncio.run(source.fetch("orders"))
+    finally:
+        writer.rollback()
+        writer.close()
+    # Every attempt replaces the failed connection
+    assert connect.opened == 3
+    pd.testing.assert_frame_equal(asyncio.run(source.fetch("orders")), ORDERS)
+    source.close()
+
+
+def test_sql_disk_cache(database, tmp_path):
+    source = SQLSource(Connector(database), cache_dir=tmp_path / "cache", cache_ttl=3600)
+    asyncio.run(source.fetch("orders"))
+    assert source._cache_path("orders").exists()
+    with sqlite3.connect(database) as conn:
+        conn.execute("DROP TABLE orders")
+    # Within the TTL the table is read back from disk without querying
+    pd.testing.assert_frame_equal(asyncio.run(source.fetch("orders")), ORDERS)
+    source.close()
+
+
+def test_probe_reads_no_rows(store, database, tmp_path):
+    source = http_source(store, tmp_path, retries=0)
+    probes = probe_tables(["orders", "users"], source)
+    assert probes["orders"] == len(store.objects["/bucket/orders.csv"])
+    assert isinstance(probes["users"], SourceError)
+    assert not source._cache_paths("orders")[0].exists()
+    source.close()
+
+    source = SQLSource(Connector(database), cache_dir=None)
+    probes = probe_tables(["orders", "users"], source)
+    assert probes["orders"] is None
+    assert isinstance(probes["users"], SourceError)
+    source.close()
@@ -0,0 +1,92 @@
+"""Daily cube totals and series against group-by sums over the line items"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.schema import dollars
+from analytics.timeseries import DailyCube, percent_change, previous_period
+
+
+@pytest.fixture(scope="module")
+def cube(line_items):
+    return DailyCube(line_items)
+
+
+def matching(line_items, filters):
+    mask = np.ones(len(line_items), dtype=bool)
+    for dimension, accepted in filters.items():
+        accepted = accepted if isinstance(accepted, list) else [accepted]
+        mask &= line_items[dimension].isin(accepted).to_numpy()
+    return line_items[mask]
+
+
+def daily_sales(line_items, filters, by):
+    """Dollar sales per day (and ``by`` value) over every day of the data, zeros included"""
+    days = pd.date_range(line_items['date'].min(), line_items['date'].max(), name='date')
+    rows = matching(line_items, filters)
+    sales = rows.groupby(['date', by])['sale_price'].sum().unstack(by)
+    return dollars(sales.reindex(days).fillna(0))
+
+
+WINDOWS = [
+    (None, None),
+    (date(2025, 3, 1), date(2025, 3, 31)),
+    (date(2024, 12, 1), date(2025, 1, 15)),
+    (date(2025, 7, 10), date(2025, 8, 10)),
+]
+FILTERS = [{}, {'status': 'Returned'}, {'status': ['Complete', 'Shipped'], 'gender': 'F'}]
+
+
+@pytest.mark.parametrize('start_date, end_date', WINDOWS)
+@pytest.mark.parametrize('filters', FILTERS)
+@pytest.mark.parametrize('by', [None, 'category', 'department'])
+def test_totals(line_items, cube, start_date, end_date, filters, by):
+    rows = matching(line_items, filters)
+    if start_date is not None:
+        rows = rows[rows['created_at'].dt.date.between(start_date, end_date)]
+    totals = cube.totals(start_date, end_date, filters, by)
+    if by is None:
+        assert totals['sales'] == pytest.approx(dollars(rows['sale_price'].sum()))
+        assert totals['items'] == rows['id_order'].count()
+        return
+    expected = rows.groupby(by).agg(sales=('sale_price', 'sum'), items=('id_order', 'count'))
+    expected = expected.reindex(totals.index, fill_value=0)
+    pd.testing.assert_series_equal(totals['sales'], dollars(expected['sales']), check_dtype=False)
+    pd.testing.assert_series_equal(totals['items'], expected['items'], check_dtype=False)
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+@pytest.mark.parametrize('window', [1, 7, 30])
+def test_rolling_series(line_items, cube, filters, window):
+    start_date, end_date = date(2025, 3, 1), date(2025, 4, 15)
+    daily = daily_sales(line_items, filters, 'category')
+    # Rolling sums reach back before the start of the window
+    expected = daily.rolling(window, min_periods=1).sum().loc[str(start_date):str(end_date)]
+    series = cube.series('sales', start_date, end_date, filters, by='category', window=window)
+    pd.testing.assert_frame_equal(series, expected.reindex(columns=series.columns, fill_value=0),
+                                  check_names=False, check_freq=False, check_index_type=False)
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_cumulative_series(line_items, cube, filters):
+    start_date, end_date = date(2025, 2, 10), date(2025, 5, 20)
+    daily = daily_sales(line_items, filters, 'department').loc[str(start_date):str(end_date)]
+    series = cube.series('sales', start_date, end_date, filters, by='department', cumulative=True)
+    pd.testing.assert_frame_equal(series, daily.cumsum().reindex(columns=series.columns, fill_value=0),
+                                  check_names=False, check_freq=False, check_index_type=False)
+    total = cube.series('sales', start_date, end_date, filters, cumulative=True)
+    assert total['sales'].iloc[-1] == pytest.approx(daily.to_numpy().sum())
+
+
+def test_covers_and_previous_period(line_items, cube):
+    first_day = line_items['date'].min().date()
+    assert cube.covers(first_day)
+    assert not cube.covers(date(first_day.year - 1, 12, 31))
+    assert previous_period(date(2025, 3, 1), date(2025, 3, 31)) == (date(2025, 1, 29), date(2025, 2, 28))
+
+
+def test_percent_change():
+    assert percent_change(110, 100) == "+10.0%"
+    assert percent_change(5, 0) is None
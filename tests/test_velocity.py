@@ -0,0 +1,71 @@
+"""Product window stats against brute-force pandas over dense daily counts"""
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.velocity import ProductDailySales
+
+
+@pytest.fixture(scope="module")
+def daily_sales(line_items):
+    return ProductDailySales(line_items)
+
+
+@pytest.fixture(scope="module")
+def dense(line_items, daily_sales):
+    """Product x day item counts, including the days without sales"""
+    sold = line_items[line_items['id_order'].notna() & line_items['product_id'].notna()]
+    counts = sold.groupby(['product_id', 'date']).size().unstack(fill_value=0)
+    days = pd.date_range(sold['date'].min(), sold['date'].max(), name='date')
+    return counts.reindex(index=daily_sales.products['product_id'], columns=days, fill_value=0)
+
+
+def longest_zero_run(counts):
+    return max((len(list(run)) for sold, run in groupby(counts > 0) if not sold), default=0)
+
+
+def brute_force_stats(dense, start_date, end_date):
+    window = dense.loc[:, start_date:end_date]
+    length = window.shape[1]
+    half = length // 2
+    early = window.iloc[:, :half].sum(axis=1)
+    late = window.iloc[:, length - half:].sum(axis=1)
+    # Last sale on or before the window end, also before the window start
+    up_to_end = dense.loc[:, :window.columns[-1]].to_numpy()
+    last_sale = np.where(up_to_end.any(axis=1),
+                         up_to_end.shape[1] - 1 - np.argmax(up_to_end[:, ::-1] > 0, axis=1), -1)
+    return pd.DataFrame({
+        'sales': window.sum(axis=1),
+        'velocity': window.sum(axis=1) / length,
+        'trend': np.polyfit(np.arange(length), window.to_numpy().T, 1)[0] * 30,
+        'early_sales': early,
+        'late_sales': late,
+        'change_pct': ((late - early) / early * 100).where(early > 0),
+        'longest_gap': [longest_zero_run(row) for row in window.to_numpy()],
+        'days_since_sale': np.where(last_sale >= 0, up_to_end.shape[1] - 1 - last_sale, np.nan),
+    }, index=window.index)
+
+
+WINDOWS = [
+    (None, None),
+    ('2025-05-15', None),
+    ('2025-03-01', '2025-04-10'),
+    ('2024-12-01', '2025-01-20'),
+]
+
+
+@pytest.mark.parametrize('start_date, end_date', WINDOWS)
+def test_window_stats(daily_sales, dense, start_date, end_date):
+    stats = daily_sales.window_stats(start_date, end_date)
+    expected = brute_force_stats(dense, start_date, end_date)
+    pd.testing.assert_frame_equal(stats, expected, check_dtype=False, check_names=False)
+
+
+def test_daily(daily_sales, dense):
+    products = list(dense.index[[0, 7, len(dense) // 2]])
+    daily = daily_sales.daily(products, '2025-03-01', '2025-04-10')
+    expected = dense.loc[products, '2025-03-01':'2025-04-10'].T
+    pd.testing.assert_frame_equal(daily, expected, check_dtype=False, check_names=False,
+                                  check_index_type=False, check_column_type=False)